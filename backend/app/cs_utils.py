@@ -4,12 +4,17 @@ import pandas as pd
 import numpy as np
 import json
 import pickle
+import shutil
+import threading
 from datetime import datetime, timedelta, timezone, time as dtime
 from typing import List, Dict, Optional, Tuple
 import asyncio
 import re
 from dotenv import load_dotenv
 
+from app.db.partition_index import PartitionIndex
+from app.executor import run_blocking, map_partitions
+
 # CSAT 빌더 중복 실행 방지 락
 csat_build_lock = asyncio.Lock()
 
@@ -85,6 +90,64 @@ def _to_kst_naive(dt):
         return dt.tz_convert(BIZ_TZ).tz_localize(None)
     return dt
 
+# === 표준 프레임 스키마 ===
+# 캐시 파티션의 타임스탬프 컬럼은 save_data에서 한 번만 KST naive datetime64로 정규화해 저장한다.
+# 읽는 쪽은 _series_kst_naive의 dtype 검사만 거치고 재파싱하지 않는다.
+# (schema 메타가 없는 이전 파티션은 읽을 때 같은 함수가 변환해 준다)
+FRAME_SCHEMA_VERSION = "kst-naive-1"
+TIMESTAMP_COLUMNS = ["createdAt", "firstAskedAt", "openedAt", "closedAt", "csatDate"]
+
+# 문자열 끝의 UTC 오프셋 (Z, +09:00, +0900)
+_TZ_SUFFIX = re.compile(r"(?:[zZ]|[+-]\d{2}:?\d{2})$")
+
+def _is_tz_aware(v) -> bool:
+    if isinstance(v, str):
+        return bool(_TZ_SUFFIX.search(v.strip()))
+    return getattr(v, "tzinfo", None) is not None
+
+def _aware_kst_naive(s: pd.Series) -> pd.Series:
+    return pd.to_datetime(s, errors="coerce", utc=True).dt.tz_convert(BIZ_TZ).dt.tz_localize(None)
+
+def _series_kst_naive(s) -> pd.Series:
+    """
+    문자열/epoch/tz-aware 섞인 시리즈를 KST naive datetime64로 정규화 (이미 정규화된 경우 그대로 반환).
+    naive 값(이미 KST)과 tz-aware 값(오프셋 문자열, tz 있는 Timestamp)이 섞여 있으면 나눠서 변환한다
+    — 한꺼번에 파싱하면 Mixed timezones 오류가 나거나 한쪽이 NaT가 된다.
+    """
+    if s is None:
+        return pd.Series(dtype="datetime64[ns]")
+    if not isinstance(s, pd.Series):
+        s = pd.Series(s)
+    if pd.api.types.is_datetime64_dtype(s.dtype):
+        return s
+    if isinstance(s.dtype, pd.DatetimeTZDtype):
+        return s.dt.tz_convert(BIZ_TZ).dt.tz_localize(None)
+    aware = np.fromiter((_is_tz_aware(v) for v in s.to_numpy(dtype=object)), dtype=bool, count=len(s))
+    if aware.all():
+        return _aware_kst_naive(s)
+    naive = pd.to_datetime(s[~aware], errors="coerce")
+    if not aware.any():
+        return naive
+    out = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    out[~aware] = naive.astype("datetime64[ns]")
+    out[aware] = _aware_kst_naive(s[aware]).astype("datetime64[ns]")
+    return out
+
+def normalize_frame_timestamps(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    TIMESTAMP_COLUMNS를 KST naive datetime64로 맞춘다 (제자리 변경).
+    값이 있었는데 변환 후 NaT가 된 건수는 경고로 남긴다.
+    """
+    for col in TIMESTAMP_COLUMNS:
+        if col not in df.columns or pd.api.types.is_datetime64_dtype(df[col].dtype):
+            continue
+        before = df[col].notna().sum()
+        df[col] = _series_kst_naive(df[col])
+        lost = int(before - df[col].notna().sum())
+        if lost:
+            print(f"[SCHEMA] {col}: 파싱 불가 값 {lost}건 → NaT")
+    return df
+
 def business_seconds_between(start, end,
                              windows=_BIZ_WINDOWS,
                              weekdays=WEEKDAYS,
@@ -122,6 +185,37 @@ def seconds_to_hms(sec: int) -> str:
     s = sec % 60
     return f"{h:02}:{m:02}:{s:02}"
 
+# === 소요시간 컬럼 (문자열 H:M:S) ===
+DURATION_COLUMNS = [
+    "operationWaitingTime", "operationAvgReplyTime",
+    "operationTotalReplyTime", "operationResolutionTime",
+]
+
+def duration_minutes(s: pd.Series) -> pd.Series:
+    """
+    "HH:MM:SS" / "MM:SS" / 숫자(분) → 분 단위 float 시리즈 (벡터화).
+    프론트 timeToSec과 같은 규칙이며, 0 이하/파싱 불가 값은 NaN.
+    """
+    if s is None:
+        return pd.Series(dtype="float64")
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        out = s.astype("float64")
+    else:
+        text = s.astype("string").str.strip()
+        parts = text.str.split(":", n=2, expand=True)
+        if parts.shape[1] == 0:
+            return pd.Series(np.nan, index=s.index, dtype="float64")
+        nums = parts.apply(lambda c: pd.to_numeric(c.str.strip(), errors="coerce")).astype("float64")
+        nparts = text.str.count(":").add(1).astype("float64")
+        p0 = nums[0]
+        p1 = nums[1] if 1 in nums.columns else pd.Series(np.nan, index=s.index)
+        p2 = nums[2] if 2 in nums.columns else pd.Series(np.nan, index=s.index)
+        out = pd.Series(np.where(nparts == 3, p0.fillna(0) * 60 + p1.fillna(0) + p2.fillna(0) / 60,
+                        np.where(nparts == 2, p0.fillna(0) + p1.fillna(0) / 60, p0)),
+                        index=s.index, dtype="float64")
+        out[text.isna()] = np.nan
+    return out.where(out > 0)
+
 # === [NEW] 영업시간 계산 유틸 ==============================
 WORK_BLOCKS = [(dtime(10,0), dtime(12,0)), (dtime(13,0), dtime(18,0))]  # 평일 10-12, 13-18
 WORKWEEK = set(range(0,5))  # 월(0)~금(4)
@@ -317,6 +411,28 @@ class ChannelTalkAPI:
         print(f"[API] openedAt/closedAt 보강 완료 후 반환: {len(all_userchats)} chats")
         return all_userchats
 
+    async def get_managers(self, limit: int = 500) -> List[Dict]:
+        """채널 상담원(매니저) 목록 전체 (담당자 디렉터리 갱신용)"""
+        await self._ensure_keys()
+        url = f"{self.base_url}/open/v5/managers"
+        managers, since, page_count = [], None, 0
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            while page_count < 20:
+                page_count += 1
+                params = {"limit": limit}
+                if since:
+                    params["since"] = since
+                r = await client.get(url, headers=self.headers, params=params)
+                r.raise_for_status()
+                data = r.json()
+                page = data.get("managers", [])
+                managers.extend(page)
+                since = data.get("next")
+                if not page or not since or not str(since).strip():
+                    break
+        print(f"[API] 매니저 {len(managers)}명 수신")
+        return managers
+
     async def get_userchat_by_id(self, userchat_id: str) -> Dict:
         await self._ensure_keys()
         url = f"{self.base_url}/open/v5/user-chats/{userchat_id}"
@@ -858,20 +974,29 @@ class ServerCache:
     
     def get_metadata_path(self, cache_key: str) -> str:
         return os.path.join(self.cache_dir, f"{cache_key}_metadata.json")
+
+    def get_derived_path(self, name: str) -> str:
+        """파티션 인덱스 등 파생 파일 경로 (캐시 전체 삭제 시 함께 삭제됨)"""
+        return os.path.join(self.cache_dir, "_derived", name)
     
     def save_data(self, cache_key: str, data: pd.DataFrame, metadata: Dict):
         try:
             self.ensure_cache_dir()
+            # 타임스탬프는 저장 시점에 한 번만 정규화 (읽기 경로는 재파싱하지 않음)
+            normalize_frame_timestamps(data)
+            # generation: 같은 키로 저장될 때마다 1씩 증가 (파생 아티팩트 무효화 기준)
+            prev_meta = self.load_metadata(cache_key) or {}
             metadata.update({
                 "saved_at": datetime.now().isoformat(),
                 "data_count": len(data),
-                "cache_version": "1.1"
+                "cache_version": "1.1",
+                "schema": FRAME_SCHEMA_VERSION,
+                "generation": int(prev_meta.get("generation") or 0) + 1,
             })
             # first_asked_start/end가 metadata에 이미 있으면 그대로 사용 (CSAT 캐시 등)
             # 없으면 실제 데이터의 firstAskedAt min/max 사용
             if "first_asked_start" not in metadata or "first_asked_end" not in metadata:
                 if "firstAskedAt" in data.columns and not data.empty:
-                    data["firstAskedAt"] = pd.to_datetime(data["firstAskedAt"], errors="coerce")
                     valid = data["firstAskedAt"].dropna()
                     def safe_iso(x):
                         if isinstance(x, (pd.Timestamp, datetime)):
@@ -888,11 +1013,22 @@ class ServerCache:
             with open(meta_path, "w", encoding="utf-8") as f:
                 json.dump(metadata, f, ensure_ascii=False, indent=2)
             print(f"[CACHE] 저장 완료: {cache_key} ({len(data)} rows)")
+            build_derived_artifacts(cache_key, data, metadata)
             return True
         except Exception as e:
             print(f"[CACHE] save_data 실패: {e}")
             return False
     
+    def load_metadata(self, cache_key: str) -> Optional[Dict]:
+        meta_path = self.get_metadata_path(cache_key)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
     def load_data(self, cache_key: str):
         data_path = self.get_cache_path(cache_key)
         meta_path = self.get_metadata_path(cache_key)
@@ -908,6 +1044,13 @@ class ServerCache:
             for fn in os.listdir(self.cache_dir):
                 if fn.endswith(".pkl") or fn.endswith("_metadata.json"):
                     os.remove(os.path.join(self.cache_dir, fn))
+            derived_dir = os.path.join(self.cache_dir, "_derived")
+            if os.path.isdir(derived_dir):
+                shutil.rmtree(derived_dir, ignore_errors=True)
+            for idx in _partition_indexes.values():
+                idx.reset()
+            with _derived_lock:
+                _derived_memo.clear()
             return True
         except Exception as e:
             print(f"[CACHE] 전체 삭제 실패: {e}")
@@ -929,13 +1072,8 @@ class ServerCache:
             return pd.DataFrame()
         try:
             # firstAskedAt이 없으면 createdAt 사용 (OB 데이터 처리)
-            first = pd.to_datetime(df.get('firstAskedAt'), errors='coerce')
-            created = pd.to_datetime(df.get('createdAt'), errors='coerce')
-            
-            if getattr(first.dt, "tz", None) is not None:
-                first = first.dt.tz_convert('Asia/Seoul').dt.tz_localize(None)
-            if getattr(created.dt, "tz", None) is not None:
-                created = created.dt.tz_convert('Asia/Seoul').dt.tz_localize(None)
+            first = _series_kst_naive(df.get('firstAskedAt'))
+            created = _series_kst_naive(df.get('createdAt'))
             
             # firstAskedAt이 NaN이면 createdAt 사용
             date_for_filter = first.fillna(created)
@@ -952,18 +1090,434 @@ class ServerCache:
 # 전역 캐시 인스턴스
 server_cache = ServerCache()
 
+# === 파생 아티팩트 (파티션 저장 시 함께 생성) ===
+# 월 파티션(userchats_YYYY-MM, csat_YYYY-MM)에서 만든 요약 구조(롤업 큐브, 인덱스 등)를
+# _derived/<name>/<파티션 키>.pkl에 파티션 generation과 함께 저장한다.
+# 저장 시 생성에 실패했거나 다른 경로로 파티션이 바뀌어 generation이 다르면 읽을 때 다시 만든다.
+_PARTITION_KEY_RE = re.compile(r"^(userchats|csat)_(\d{4}-\d{2})$")
+_derived_builders: Dict[str, Dict] = {}
+_derived_memo: Dict[Tuple[str, str], Tuple] = {}  # (name, key) -> (generation, deps, artifact)
+_derived_lock = threading.Lock()
+
+def register_derived(name: str, kind: str, builder, depends=None) -> None:
+    """
+    kind 파티션이 저장될 때마다 builder(df) 결과를 name 아티팩트로 저장하도록 등록.
+    depends(df) -> [파티션 키]: builder가 다른 파티션도 읽는 경우, 그 파티션 버전이 바뀌면
+    (자기 파티션 generation이 그대로여도) 읽을 때 다시 만든다.
+    """
+    _derived_builders[name] = {"kind": kind, "builder": builder, "depends": depends}
+
+def _deps_current(deps: Optional[Dict[str, Optional[str]]]) -> bool:
+    return all(partition_version(k) == v for k, v in (deps or {}).items())
+
+def _derived_file(name: str, cache_key: str) -> str:
+    return server_cache.get_derived_path(os.path.join(name, f"{cache_key}.pkl"))
+
+def _store_derived(name: str, cache_key: str, df: pd.DataFrame, generation) -> object:
+    spec = _derived_builders[name]
+    # 의존 파티션 버전은 만들기 전에 기록 (도중에 저장이 끼어들면 다음 읽기에서 다시 만든다)
+    deps = ({k: partition_version(k) for k in spec["depends"](df)}
+            if spec.get("depends") and df is not None else {})
+    artifact = spec["builder"](df)
+    path = _derived_file(name, cache_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"generation": generation, "deps": deps, "artifact": artifact}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    with _derived_lock:
+        _derived_memo[(name, cache_key)] = (generation, deps, artifact)
+    return artifact
+
+def build_derived_artifacts(cache_key: str, df: pd.DataFrame, metadata: Dict) -> None:
+    """save_data 직후 호출: 이 파티션 kind에 등록된 아티팩트를 모두 다시 만든다 (실패해도 저장은 유지)"""
+    m = _PARTITION_KEY_RE.match(cache_key)
+    if not m:
+        return
+    for name, spec in _derived_builders.items():
+        if spec["kind"] != m.group(1):
+            continue
+        try:
+            _store_derived(name, cache_key, df, metadata.get("generation"))
+        except Exception as e:
+            print(f"[DERIVED] {name}/{cache_key} 생성 실패: {type(e).__name__}: {e}")
+
+def load_derived(name: str, month: str):
+    """
+    name 아티팩트의 month 분을 반환 (파티션이 없으면 None).
+    메모리 → 디스크 순으로 찾고, generation(또는 의존 파티션 버전)이 다르면 파티션을 읽어 다시 만든다.
+    """
+    kind = _derived_builders[name]["kind"]
+    cache_key = f"{kind}_{month}"
+    meta = server_cache.load_metadata(cache_key)
+    if meta is None:
+        return None
+    generation = meta.get("generation")
+    with _derived_lock:
+        hit = _derived_memo.get((name, cache_key))
+    if hit is not None and hit[0] == generation and _deps_current(hit[1]):
+        return hit[2]
+    path = _derived_file(name, cache_key)
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                stored = pickle.load(f)
+            deps = stored.get("deps") or {}
+            if stored.get("generation") == generation and _deps_current(deps):
+                with _derived_lock:
+                    _derived_memo[(name, cache_key)] = (generation, deps, stored["artifact"])
+                return stored["artifact"]
+        except Exception as e:
+            print(f"[DERIVED] {name}/{cache_key} 읽기 실패, 재생성: {e}")
+    df, _ = server_cache.load_data(cache_key)
+    if df is None:
+        return None
+    return _store_derived(name, cache_key, df, generation)
+
+def load_derived_months(name: str, months: List[str]) -> Dict[str, object]:
+    """여러 월의 아티팩트를 파티션 로드 풀에서 병렬로 가져온다 (없는 월은 제외)"""
+    loaded = map_partitions(lambda m: load_derived(name, m), months)
+    return {m: a for m, a in zip(months, loaded) if a is not None}
+
+def derived_dependency_versions(name: str, months: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+    """
+    name 아티팩트(months, None이면 캐시된 전체 월)가 기록한 의존 파티션의 현재 버전 — 응답 캐시 키/ETag용.
+    기간 밖 월 파티션(예: 9월 CSAT가 참조하는 8월 상담)이 바뀌어도 키가 달라진다.
+    아직 없는 파티션도 None으로 남겨, 나중에 생기면 키가 바뀌게 한다.
+    """
+    kind = _derived_builders[name]["kind"]
+    if months is None:
+        months = cached_partition_months(kind)
+    keys = set()
+    for month in load_derived_months(name, months):
+        with _derived_lock:
+            hit = _derived_memo.get((name, f"{kind}_{month}"))
+        if hit is not None:
+            keys.update(hit[1] or {})
+    return {k: partition_version(k) for k in sorted(keys)}
+
+# === 파티션 버전 (HTTP ETag 등 응답 캐시 무효화 기준) ===
+# 버전 = generation:saved_at. 캐시를 비우면 generation이 1로 돌아가므로 saved_at까지 포함한다.
+# 메타데이터 파일 stat이 바뀌지 않았으면 JSON을 다시 읽지 않는다.
+_version_memo: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+def partition_version(cache_key: str) -> Optional[str]:
+    try:
+        st = os.stat(server_cache.get_metadata_path(cache_key))
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _version_memo.get(cache_key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    meta = server_cache.load_metadata(cache_key) or {}
+    version = f"{meta.get('generation') or 0}:{meta.get('saved_at') or ''}"
+    _version_memo[cache_key] = (stamp, version)
+    return version
+
+def partition_versions(kind: str, months: Optional[List[str]] = None) -> Dict[str, str]:
+    """kind 파티션별 버전 {파티션 키: 버전}. months가 있으면 해당 월만"""
+    keys = _list_partition_keys(kind)
+    if months is not None:
+        wanted = {f"{kind}_{m}" for m in months}
+        keys = [k for k in keys if k in wanted]
+    versions = {k: partition_version(k) for k in keys}
+    return {k: v for k, v in versions.items() if v is not None}
+
 # === 캐시 병합 유틸 ===
 def get_cached_data_month(month: str) -> Optional[pd.DataFrame]:
     cache_key = f"userchats_{month}"
     df, _ = server_cache.load_data(cache_key)
     return df
 
-async def get_cached_data(start_date: str, end_date: str, refresh_mode: str = "cache") -> pd.DataFrame:
+def load_month_partitions(kind: str, months: List[str]) -> Dict[str, pd.DataFrame]:
+    """
+    {kind}_YYYY-MM 파티션들을 파티션 로드 풀에서 병렬로 읽는다.
+    비어 있거나 없는 월은 결과에서 빠지며, 반환 dict는 months 순서를 유지한다.
+    """
+    def _load(month):
+        df, _ = server_cache.load_data(f"{kind}_{month}")
+        return df
+
+    loaded = map_partitions(_load, months)
+    return {m: df for m, df in zip(months, loaded) if df is not None and not df.empty}
+
+# === 업서트 엔진 (userChatId 기준) ===
+# kind별 파티션 규칙
+# - bucket: 월 버킷을 정하는 날짜 컬럼 (앞에서부터 우선, 비어 있으면 다음 컬럼)
+# - version: last-write-wins 비교 기준 컬럼 (값이 더 큰 쪽이 최신)
+PARTITION_SPECS = {
+    "userchats": {"bucket": ["firstAskedAt", "createdAt"], "version": "closedAt"},
+    "csat": {"bucket": ["csatDate", "firstAskedAt"], "version": "csatDate"},
+}
+
+_partition_indexes = {
+    kind: PartitionIndex(server_cache.get_derived_path(f"{kind}_index.json"))
+    for kind in PARTITION_SPECS
+}
+_upsert_lock = threading.RLock()  # get_partition_index의 최초 정리와 업서트가 같은 락을 사용
+
+def _month_meta(month: str) -> Dict:
+    """각 월의 첫날 00:00:00부터 마지막 날 23:59:59.999999까지"""
+    month_period = pd.Period(month)
+    month_start = month_period.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_end = month_period.end_time.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return {
+        "month": month,
+        "first_asked_start": month_start.isoformat(),
+        "first_asked_end": month_end.isoformat(),
+    }
+
+def _bucket_months(df: pd.DataFrame, bucket_cols: List[str]) -> pd.Series:
+    bucket = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    for c in bucket_cols:
+        if c in df.columns:
+            bucket = bucket.fillna(_series_kst_naive(df[c]))
+    out = bucket.dt.to_period("M").astype(str)
+    return out.where(bucket.notna(), None)
+
+def get_partition_index(kind: str) -> PartitionIndex:
+    """
+    kind의 userChatId 인덱스. 파일이 없으면 기존 파티션을 스캔해 만든다.
+    이 때 파티션 간 중복/잘못된 버킷도 함께 정리하므로, 이후 저장소 전체에서 userChatId가 유일하다.
+    """
+    index = _partition_indexes[kind]
+    if not index.exists() and index._entries is None:
+        with _upsert_lock:
+            if not index.exists() and index._entries is None:
+                repair_partitions(kind)
+                rebuild_partition_index(kind)
+    return index
+
+def _list_partition_keys(kind: str) -> List[str]:
+    prefix = f"{kind}_"
+    if not os.path.isdir(server_cache.cache_dir):
+        return []
+    return [fn[:-len(".pkl")] for fn in sorted(os.listdir(server_cache.cache_dir))
+            if fn.startswith(prefix) and fn.endswith(".pkl")
+            and os.path.exists(server_cache.get_metadata_path(fn[:-len(".pkl")]))]
+
+def cached_partition_months(kind: str) -> List[str]:
+    """캐시에 있는 kind 파티션의 월 목록 (오름차순)"""
+    return [k[len(kind) + 1:] for k in _list_partition_keys(kind)]
+
+def _scan_partitions(kind: str) -> pd.DataFrame:
+    """
+    kind의 모든 파티션을 한 프레임으로 읽는다.
+    _key(원래 파티션), _row(파티션 내 위치), _target(버킷 월 기준 올바른 파티션) 컬럼을 붙인다.
+    """
+    keys = _list_partition_keys(kind)
+    months = [k[len(kind) + 1:] for k in keys]
+    loaded = load_month_partitions(kind, months)
+    frames = []
+    for month, df in loaded.items():
+        frames.append(df.assign(_key=f"{kind}_{month}", _row=np.arange(len(df))))
+    if not frames:
+        return pd.DataFrame(columns=["userChatId", "_key", "_row", "_target"])
+    all_df = pd.concat(frames, ignore_index=True)
+    bucket = _bucket_months(all_df, PARTITION_SPECS[kind]["bucket"])
+    all_df["_target"] = (kind + "_" + bucket).where(bucket.notna(), all_df["_key"])
+    return all_df
+
+def verify_partitions(kind: str) -> Dict:
+    """
+    저장소 불변식 점검 (읽기 전용).
+    - userChatId가 파티션 내/파티션 간 유일한지
+    - 각 행이 버킷 월에 맞는 파티션에 있는지
+    - 인덱스가 실제 파티션 위치와 일치하는지
+    """
+    all_df = _scan_partitions(kind)
+    ids = all_df["userChatId"].astype("string")
+    has_id = ids.notna()
+    dup = ids[has_id].duplicated(keep=False)
+    dup_rows = all_df[has_id][dup]
+    cross = dup_rows.groupby("userChatId")["_key"].nunique()
+
+    # 인덱스 파일이 아직 없으면 첫 업서트/조회 때 만들어지므로 불일치로 보지 않는다
+    index_present = _partition_indexes[kind].exists()
+    index_mismatch = index_stale = 0
+    if index_present:
+        entries = _partition_indexes[kind].load()
+        actual = {str(i): [k, int(r)] for i, k, r in
+                  zip(ids[has_id], all_df.loc[has_id, "_key"], all_df.loc[has_id, "_row"])}
+        index_mismatch = sum(1 for i, v in actual.items() if entries.get(i) != v)
+        index_stale = sum(1 for i in entries if i not in actual)
+
+    return {
+        "kind": kind,
+        "partitions": int(all_df["_key"].nunique()),
+        "rows": int(len(all_df)),
+        "null_ids": int((~has_id).sum()),
+        "duplicate_ids": int(dup_rows["userChatId"].nunique()),
+        "duplicate_ids_cross_partition": int((cross > 1).sum()),
+        "duplicate_extra_rows": int(len(dup_rows) - dup_rows["userChatId"].nunique()),
+        "misbucketed_rows": int((all_df["_key"] != all_df["_target"]).sum()),
+        "index_present": bool(index_present),
+        "index_mismatch": int(index_mismatch),
+        "index_stale": int(index_stale),
+        "ok": bool(len(dup_rows) == 0 and (all_df["_key"] == all_df["_target"]).all()
+                   and index_mismatch == 0 and index_stale == 0),
+    }
+
+def repair_partitions(kind: str) -> Dict[str, int]:
+    """
+    중복 userChatId는 version 컬럼 기준 최신 1건만 남기고(last-write-wins),
+    버킷 월이 틀린 행은 올바른 파티션으로 옮긴다. 바뀐 파티션만 다시 저장한다.
+    반환: {파티션 키: 저장된 행 수}
+    """
+    spec = PARTITION_SPECS[kind]
+    all_df = _scan_partitions(kind)
+    if all_df.empty:
+        return {}
+    has_id = all_df["userChatId"].notna()
+    version_col = spec["version"]
+    all_df["_version"] = _series_kst_naive(all_df[version_col]) if version_col in all_df.columns else pd.NaT
+    with_id = (all_df[has_id]
+               .assign(userChatId=lambda d: d["userChatId"].astype(str))
+               .sort_values("_version", na_position="first", kind="stable")
+               .drop_duplicates(subset=["userChatId"], keep="last"))
+    kept = pd.concat([with_id, all_df[~has_id]]).sort_values(["_key", "_row"], kind="stable")
+
+    changed = set(kept.loc[kept["_key"] != kept["_target"], ["_key", "_target"]].to_numpy().ravel())
+    before = all_df["_key"].value_counts()
+    after = kept["_target"].value_counts()
+    changed |= {k for k in before.index if after.get(k, 0) != before[k]}
+    if not changed:
+        return {}
+
+    saved = {}
+    for key in sorted(changed):
+        month = key[len(kind) + 1:]
+        out = (kept[kept["_target"] == key]
+               .sort_values(["_key", "_row"], kind="stable")
+               .drop(columns=["_key", "_row", "_target", "_version"])
+               .reset_index(drop=True))
+        _, old_meta = server_cache.load_data(key) if key in before.index else (None, None)
+        meta = {**{k: v for k, v in (old_meta or {}).items() if k not in ("saved_at", "data_count")},
+                **_month_meta(month), "repaired": True}
+        if not server_cache.save_data(key, out, meta):
+            # 인덱스는 만들지 않는다 (get_partition_index가 다음 호출에서 다시 정리를 시도)
+            raise RuntimeError(f"{key} 파티션 저장 실패 (정리 중단, 저장된 파티션: {sorted(saved)})")
+        saved[key] = len(out)
+    print(f"[REPAIR] {kind}: 중복 {len(all_df) - len(kept)}건 제거, 재저장 파티션 {sorted(saved)}")
+    return saved
+
+def rebuild_partition_index(kind: str) -> PartitionIndex:
+    index = _partition_indexes[kind]
+    index._entries = {}
+    for key in _list_partition_keys(kind):
+        df, _ = server_cache.load_data(key)
+        if df is None or df.empty or "userChatId" not in df.columns:
+            continue
+        index.replace_partition(key, df["userChatId"].astype(str).tolist())
+    index.save()
+    print(f"[INDEX] {kind} 인덱스 재구성: {len(index.load())} ids")
+    return index
+
+def upsert_partitions(kind: str, df: pd.DataFrame, replace_months: Optional[set] = None,
+                      extra_meta: Optional[Dict] = None) -> Dict[str, pd.DataFrame]:
+    """
+    새로 받아온 행들을 userChatId 기준으로 월별 파티션에 업서트한다.
+    - 같은 userChatId가 이미 있으면 version 컬럼 기준 last-write-wins로 교체
+      (기존 값이 더 최신일 때만 기존 행 유지, 비교 불가하면 새 행 우선)
+    - 버킷 월이 바뀐 행은 이전 파티션에서 빼고 새 파티션으로 이동
+    - 영향을 받는 파티션(새 행의 월 + 이동 전 월)만 다시 저장
+    - replace_months에 포함된 월은 기존 행을 버리고 새 행으로 통째로 교체 (refresh)
+    반환: {month: 저장된 파티션 DataFrame}
+    """
+    spec = PARTITION_SPECS[kind]
+    if df is None or df.empty or "userChatId" not in df.columns:
+        return {}
+    replace_months = set(replace_months or [])
+    version_col = spec["version"]
+
+    incoming = df[df["userChatId"].notna()].copy()
+    incoming["userChatId"] = incoming["userChatId"].astype(str)
+    # 저장된 파티션과 같은 dtype으로 맞춘 뒤 합친다 (tz-aware csatDate 등)
+    normalize_frame_timestamps(incoming)
+    incoming["_month"] = _bucket_months(incoming, spec["bucket"])
+    incoming = incoming[incoming["_month"].notna()]
+    if version_col in incoming.columns:
+        incoming["_version"] = _series_kst_naive(incoming[version_col])
+    else:
+        incoming["_version"] = pd.NaT
+    # 같은 배치 안의 중복은 최신 버전 1건만
+    incoming = (incoming.sort_values("_version", na_position="first", kind="stable")
+                        .drop_duplicates(subset=["userChatId"], keep="last"))
+    if incoming.empty:
+        return {}
+
+    with _upsert_lock:
+        index = get_partition_index(kind)
+        prior = index.lookup(incoming["userChatId"])
+        affected = {f"{kind}_{m}" for m in incoming["_month"].unique()}
+        affected |= {p for p, _ in prior.values()}
+
+        existing = {}
+        for key in sorted(affected):
+            edf, _ = server_cache.load_data(key)
+            existing[key] = edf if edf is not None else pd.DataFrame()
+
+        # last-write-wins: 기존 행이 더 최신이면 새 행을 버린다
+        stale_ids = set()
+        if version_col in incoming.columns:
+            inc_version = incoming.set_index("userChatId")["_version"]
+            for key, edf in existing.items():
+                if edf.empty or version_col not in edf.columns:
+                    continue
+                ids = edf["userChatId"].astype(str)
+                hit = ids.isin(inc_version.index)
+                if not hit.any():
+                    continue
+                old_v = _series_kst_naive(edf.loc[hit, version_col]).to_numpy()
+                new_v = inc_version.reindex(ids[hit]).to_numpy()
+                newer_old = pd.notna(old_v) & pd.notna(new_v) & (old_v > new_v)
+                stale_ids.update(ids[hit][newer_old].tolist())
+        winners = incoming[~incoming["userChatId"].isin(stale_ids)]
+        winner_ids = set(winners["userChatId"])
+
+        saved = {}
+        for key in sorted(affected):
+            month = key[len(kind) + 1:]
+            edf = existing[key]
+            if not edf.empty and "userChatId" in edf.columns:
+                ids = edf["userChatId"].astype(str)
+                keep = ~ids.isin(winner_ids)
+                if month in replace_months:
+                    keep &= ids.isin(stale_ids)
+                edf = edf[keep]
+            add = winners[winners["_month"] == month].drop(columns=["_month", "_version"])
+            frames = [f for f in (edf, add) if not f.empty]
+            out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=add.columns)
+            meta = {**(extra_meta or {}), **_month_meta(month)}
+            if kind == "csat":
+                meta.setdefault("kind", "csat")
+            if not server_cache.save_data(key, out, meta):
+                # 이미 저장된 파티션까지만 인덱스에 반영하고 중단 (저장 안 된 행을 가리키지 않도록)
+                index.save()
+                raise RuntimeError(f"{key} 파티션 저장 실패 (업서트 중단, 저장된 파티션: {sorted(saved)})")
+            index.replace_partition(key, out["userChatId"].astype(str).tolist() if "userChatId" in out.columns else [])
+            saved[month] = out
+        index.save()
+
+    month_by_id = winners.set_index("userChatId")["_month"]
+    moved = sum(1 for i, (p, _) in prior.items()
+                if i in month_by_id.index and p != f"{kind}_{month_by_id[i]}")
+    print(f"[UPSERT] {kind}: 입력 {len(incoming)}건 → 교체/추가 {len(winner_ids)}건, "
+          f"기존 유지 {len(stale_ids)}건, 월 이동 {moved}건, 저장 파티션 {sorted(saved)}")
+    return saved
+
+async def get_cached_data(start_date: str, end_date: str, refresh_mode: str = "cache",
+                          partition_filter=None) -> pd.DataFrame:
     """
     refresh_mode:
     - "cache": 기존 캐시만 사용 (기본값)
     - "update": 기존 캐시 유지 + 누락된 기간만 API 호출
     - "refresh": 기존 캐시 완전 삭제 + 전체 새로 수집
+
+    partition_filter(month, df) -> df: cache 모드에서 월 파티션마다 concat 전에 적용
+    (예: 태그 인덱스 유형 필터). 다른 모드에서는 무시되므로 호출 측에서 다시 걸러야 한다.
     """
     def _months(s, e):
         sm = pd.to_datetime(s).to_period('M')
@@ -977,6 +1531,9 @@ async def get_cached_data(start_date: str, end_date: str, refresh_mode: str = "c
 
     months = _months(start_date, end_date)
     all_data = []
+
+    # 인덱스가 없으면(최초 기동/캐시 삭제 후) 파티션 중복 정리 + 인덱스 구성을 먼저 한 번 수행
+    await run_blocking(get_partition_index, "userchats")
     
     if refresh_mode == "refresh":
         # 전체 갱신: 전체 기간에 대해 한 번만 API 호출 (ChannelTalk API는 날짜 필터링 미지원)
@@ -986,127 +1543,67 @@ async def get_cached_data(start_date: str, end_date: str, refresh_mode: str = "c
             userchats = await channel_api.get_userchats(start_date, end_date)
             if userchats:
                 df = await channel_api.process_userchat_data(userchats)
-                df = attach_resolution_fallback(df)
-                # firstAskedAt 기준으로 월별로 재분류 (CSAT 캐시와 동일 정책)
-                if "firstAskedAt" in df.columns and not df.empty:
-                    df["firstAskedAt"] = pd.to_datetime(df["firstAskedAt"], errors="coerce")
-                    if getattr(df["firstAskedAt"].dt, "tz", None) is not None:
-                        df["firstAskedAt"] = df["firstAskedAt"].dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-                    # createdAt이 있으면 firstAskedAt이 없을 때 사용
-                    if "createdAt" in df.columns:
-                        df["createdAt"] = pd.to_datetime(df["createdAt"], errors="coerce")
-                        if getattr(df["createdAt"].dt, "tz", None) is not None:
-                            df["createdAt"] = df["createdAt"].dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-                        df["bucketDate"] = df["firstAskedAt"].fillna(df["createdAt"])
-                    else:
-                        df["bucketDate"] = df["firstAskedAt"]
-                    df = df[df["bucketDate"].notna()].copy()
-                    
-                    # 요청된 기간(start_date ~ end_date) 내의 데이터만 필터링
-                    start_dt = pd.to_datetime(start_date)
-                    end_dt = pd.to_datetime(end_date)
-                    df = df[(df["bucketDate"] >= start_dt) & (df["bucketDate"] <= end_dt)].copy()
-                    
-                    df["month"] = df["bucketDate"].dt.to_period("M").astype(str)
-                    # 요청된 기간 내의 월만 필터링
-                    requested_months = set(months)
-                    # 월별로 저장
-                    for m, mdf in df.groupby("month"):
-                        if m in requested_months:  # 요청된 기간 내의 월만 저장
-                            mdf = mdf.drop(columns=["month", "bucketDate"])
-                            key = f"userchats_{m}"
-                            month_period = pd.Period(m)
-                            month_start = month_period.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
-                            month_end = month_period.end_time.replace(hour=23, minute=59, second=59, microsecond=999999)
-                            meta = {
-                                "month": m,
-                                "range": [start_date, end_date],
-                                "api_fetch": True,
-                                "first_asked_start": month_start.isoformat(),
-                                "first_asked_end": month_end.isoformat()
-                            }
-                            server_cache.save_data(key, mdf, meta)
-                            all_data.append(mdf)
-                            print(f"[REFRESH] {m} 캐시 저장 완료: {len(mdf)} rows")
-                else:
-                    # firstAskedAt이 없으면 기존 방식으로 저장 (요청된 기간의 첫 월에만)
-                    if months:
-                        meta = {"month": months[0], "range": [start_date, end_date], "api_fetch": True}
-                        server_cache.save_data(f"userchats_{months[0]}", df, meta)
-                        all_data.append(df)
+                df = await run_blocking(attach_resolution_fallback, df)
+                # 요청된 기간(start_date ~ end_date) 내의 데이터만 firstAskedAt(없으면 createdAt) 기준 월별 업서트
+                # 요청된 기간 내의 월은 새로 받은 데이터로 교체, 버킷 월이 바뀐 행은 이전 파티션에서 이동
+                bucket = _series_kst_naive(df["firstAskedAt"]).fillna(_series_kst_naive(df.get("createdAt")))
+                start_dt = pd.to_datetime(start_date)
+                end_dt = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+                df = df[(bucket >= start_dt) & (bucket <= end_dt)].copy()
+                saved = await run_blocking(
+                    upsert_partitions, "userchats", df,
+                    replace_months=set(months),
+                    extra_meta={"range": [start_date, end_date], "api_fetch": True},
+                )
+                for m in months:
+                    if m in saved:
+                        all_data.append(saved[m])
+                        print(f"[REFRESH] {m} 캐시 저장 완료: {len(saved[m])} rows")
         except Exception as e:
             print(f"[REFRESH] 전체 기간 실패: {e}")
     
+    # cache/update 모드: 요청 기간의 월 파티션을 먼저 병렬 로드
+    cached_months = {}
+    if refresh_mode != "refresh":
+        cached_months = await run_blocking(load_month_partitions, "userchats", months)
+        if partition_filter is not None and refresh_mode == "cache":
+            cached_months = await run_blocking(
+                lambda: {m: partition_filter(m, d) for m, d in cached_months.items()}
+            )
+
     for month in months:
         if refresh_mode == "refresh":
             # refresh_mode="refresh"는 위에서 이미 처리했으므로 skip
             continue
         elif refresh_mode == "update":
             # 최신화: 기존 캐시 우선, 없으면 API 호출
-            df = get_cached_data_month(month)
+            df = cached_months.get(month)
             year, m = map(int, month.split('-'))
             current_year = datetime.now().year
             current_month = datetime.now().month
+            start = datetime(year, m, 1).strftime("%Y-%m-%d")
+            if m == 12:
+                end = datetime(year+1, 1, 1) - timedelta(days=1)
+            else:
+                end = datetime(year, m+1, 1) - timedelta(days=1)
+            end = end.strftime("%Y-%m-%d")
             
             if df is not None and not df.empty:
                 if year == current_year and m == current_month:
-                    # 현재 달(8월): 기존 캐시 + 새로운 데이터 추가
-                    print(f"[UPDATE] {month} 현재 달 → 기존 캐시({len(df)} rows) + 새로운 데이터 추가")
-                    start = datetime(year, m, 1).strftime("%Y-%m-%d")
-                    if m == 12:
-                        end = datetime(year+1, 1, 1) - timedelta(days=1)
-                    else:
-                        end = datetime(year, m+1, 1) - timedelta(days=1)
-                    end = end.strftime("%Y-%m-%d")
+                    # 현재 달: 새로 받은 데이터를 userChatId 기준으로 업서트 (재오픈/재태깅된 건은 최신 행으로 교체)
+                    print(f"[UPDATE] {month} 현재 달 → 기존 캐시({len(df)} rows)에 새로운 데이터 업서트")
                     try:
                         userchats = await channel_api.get_userchats(start, end)
                         if userchats:
                             new_df = await channel_api.process_userchat_data(userchats)
-                            # 기존 데이터 + 새로운 데이터 합치기
-                            combined_df = pd.concat([df, new_df], ignore_index=True)
-                            # 중복 제거 (userChatId 기준 - 각 문의마다 고유)
-                            combined_df = combined_df.drop_duplicates(subset=['userChatId'], keep='first')
-                            combined_df = attach_resolution_fallback(combined_df)
-                            # firstAskedAt 기준으로 월별로 재분류하여 저장
-                            if "firstAskedAt" in combined_df.columns and not combined_df.empty:
-                                combined_df["firstAskedAt"] = pd.to_datetime(combined_df["firstAskedAt"], errors="coerce")
-                                if getattr(combined_df["firstAskedAt"].dt, "tz", None) is not None:
-                                    combined_df["firstAskedAt"] = combined_df["firstAskedAt"].dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-                                if "createdAt" in combined_df.columns:
-                                    combined_df["createdAt"] = pd.to_datetime(combined_df["createdAt"], errors="coerce")
-                                    if getattr(combined_df["createdAt"].dt, "tz", None) is not None:
-                                        combined_df["createdAt"] = combined_df["createdAt"].dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-                                    combined_df["bucketDate"] = combined_df["firstAskedAt"].fillna(combined_df["createdAt"])
-                                else:
-                                    combined_df["bucketDate"] = combined_df["firstAskedAt"]
-                                combined_df = combined_df[combined_df["bucketDate"].notna()].copy()
-                                combined_df["month"] = combined_df["bucketDate"].dt.to_period("M").astype(str)
-                                # 월별로 저장
-                                for m, mdf in combined_df.groupby("month"):
-                                    mdf = mdf.drop(columns=["month", "bucketDate"])
-                                    key = f"userchats_{m}"
-                                    month_period = pd.Period(m)
-                                    month_start = month_period.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
-                                    month_end = month_period.end_time.replace(hour=23, minute=59, second=59, microsecond=999999)
-                                    meta = {
-                                        "month": m,
-                                        "range": [start, end],
-                                        "api_fetch": True,
-                                        "updated": True,
-                                        "first_asked_start": month_start.isoformat(),
-                                        "first_asked_end": month_end.isoformat()
-                                    }
-                                    server_cache.save_data(key, mdf, meta)
-                                    # 현재 요청한 월이면 all_data에 추가
-                                    if m == month:
-                                        print(f"[UPDATE] {month} 캐시 업데이트 완료: {len(df)} → {len(mdf)} rows")
-                                        all_data.append(mdf)
-                            else:
-                                # firstAskedAt이 없으면 기존 방식으로 저장
-                                meta = {"month": month, "range": [start, end], "api_fetch": True, "updated": True}
-                                server_cache.save_data(f"userchats_{month}", combined_df, meta)
-                                print(f"[UPDATE] {month} 캐시 업데이트 완료: {len(df)} → {len(combined_df)} rows")
-                                all_data.append(combined_df)
+                            new_df = await run_blocking(attach_resolution_fallback, new_df)
+                            saved = await run_blocking(
+                                upsert_partitions, "userchats", new_df,
+                                extra_meta={"range": [start, end], "api_fetch": True, "updated": True},
+                            )
+                            mdf = saved.get(month, df)
+                            print(f"[UPDATE] {month} 캐시 업데이트 완료: {len(df)} → {len(mdf)} rows")
+                            all_data.append(mdf)
                         else:
                             print(f"[UPDATE] {month} 새로운 데이터 없음, 기존 캐시 사용")
                             all_data.append(df)
@@ -1120,59 +1617,23 @@ async def get_cached_data(start_date: str, end_date: str, refresh_mode: str = "c
             else:
                 # 캐시가 없는 경우: API 호출
                 print(f"[UPDATE] {month} 캐시 없음 → API 호출")
-                start = datetime(year, m, 1).strftime("%Y-%m-%d")
-                if m == 12:
-                    end = datetime(year+1, 1, 1) - timedelta(days=1)
-                else:
-                    end = datetime(year, m+1, 1) - timedelta(days=1)
-                end = end.strftime("%Y-%m-%d")
                 try:
                     userchats = await channel_api.get_userchats(start, end)
                     if userchats:
                         df = await channel_api.process_userchat_data(userchats)
-                        df = attach_resolution_fallback(df)
-                        # firstAskedAt 기준으로 월별로 재분류 (CSAT 캐시와 동일 정책)
-                        if "firstAskedAt" in df.columns and not df.empty:
-                            df["firstAskedAt"] = pd.to_datetime(df["firstAskedAt"], errors="coerce")
-                            if getattr(df["firstAskedAt"].dt, "tz", None) is not None:
-                                df["firstAskedAt"] = df["firstAskedAt"].dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-                            if "createdAt" in df.columns:
-                                df["createdAt"] = pd.to_datetime(df["createdAt"], errors="coerce")
-                                if getattr(df["createdAt"].dt, "tz", None) is not None:
-                                    df["createdAt"] = df["createdAt"].dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-                                df["bucketDate"] = df["firstAskedAt"].fillna(df["createdAt"])
-                            else:
-                                df["bucketDate"] = df["firstAskedAt"]
-                            df = df[df["bucketDate"].notna()].copy()
-                            df["month"] = df["bucketDate"].dt.to_period("M").astype(str)
-                            # 월별로 저장
-                            for m, mdf in df.groupby("month"):
-                                mdf = mdf.drop(columns=["month", "bucketDate"])
-                                key = f"userchats_{m}"
-                                month_period = pd.Period(m)
-                                month_start = month_period.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
-                                month_end = month_period.end_time.replace(hour=23, minute=59, second=59, microsecond=999999)
-                                meta = {
-                                    "month": m,
-                                    "range": [start, end],
-                                    "api_fetch": True,
-                                    "first_asked_start": month_start.isoformat(),
-                                    "first_asked_end": month_end.isoformat()
-                                }
-                                server_cache.save_data(key, mdf, meta)
-                                # 현재 요청한 월이면 all_data에 추가
-                                if m == month:
-                                    all_data.append(mdf)
-                        else:
-                            # firstAskedAt이 없으면 기존 방식으로 저장
-                            meta = {"month": month, "range": [start, end], "api_fetch": True}
-                            server_cache.save_data(f"userchats_{month}", df, meta)
-                            all_data.append(df)
+                        df = await run_blocking(attach_resolution_fallback, df)
+                        saved = await run_blocking(
+                            upsert_partitions, "userchats", df,
+                            extra_meta={"range": [start, end], "api_fetch": True},
+                        )
+                        # 현재 요청한 월이면 all_data에 추가
+                        if month in saved:
+                            all_data.append(saved[month])
                 except Exception as e:
                     print(f"[UPDATE] {month} API 호출 실패: {e}")
         else:  # refresh_mode == "cache"
             # 캐시만 사용: API 호출 안 함
-            df = get_cached_data_month(month)
+            df = cached_months.get(month)
             if df is not None and not df.empty:
                 print(f"[CACHE] {month} 로드 ({len(df)} rows)")
                 all_data.append(df)
@@ -1185,7 +1646,12 @@ async def get_cached_data(start_date: str, end_date: str, refresh_mode: str = "c
     if not all_data:
         print(f"[DEBUG] all_data가 비어있음 - 빈 DataFrame 반환")
         return pd.DataFrame()
-    
+
+    # concat/날짜 필터는 블로킹 풀에서 실행
+    return await run_blocking(_combine_and_filter, all_data, start_date, end_date)
+
+def _combine_and_filter(all_data: List[pd.DataFrame], start_date: str, end_date: str) -> pd.DataFrame:
+    """월별 파티션을 합치고 firstAskedAt(없으면 createdAt) 기준 기간 필터"""
     print(f"[DEBUG] pd.concat 시작 - 총 {sum(len(df) if df is not None else 0 for df in all_data)} rows)")
     try:
         combined = pd.concat(all_data, ignore_index=True)
@@ -1194,51 +1660,19 @@ async def get_cached_data(start_date: str, end_date: str, refresh_mode: str = "c
         print(f"[ERROR] pd.concat 실패: {type(e).__name__}: {e}")
         return pd.DataFrame()
     
-    print(f"[DEBUG] firstAskedAt 컬럼 변환 시작")
-    try:
-        combined['firstAskedAt'] = pd.to_datetime(combined['firstAskedAt'], errors='coerce')
-        print(f"[DEBUG] firstAskedAt 변환 완료: {combined['firstAskedAt'].notna().sum()}개 유효, {combined['firstAskedAt'].isna().sum()}개 NaN")
-    except Exception as e:
-        print(f"[ERROR] firstAskedAt 변환 실패: {type(e).__name__}: {e}")
-        return pd.DataFrame()
-    
-    # firstAskedAt 처리 아래에 이어서
-    for col in ["createdAt","openedAt","closedAt"]:
-        if col in combined.columns:
-            try:
-                combined[col] = pd.to_datetime(combined[col], errors='coerce')
-            except Exception:
-                pass
+    # 타임스탬프는 save_data에서 KST naive로 저장됨 → dtype만 확인 (이전 파티션만 변환)
+    normalize_frame_timestamps(combined)
     
-    print(f"[DEBUG] 중복 제거 시작")
-    try:
-        before_dedup = len(combined)
-        if 'userChatId' in combined.columns:
-            combined = combined.drop_duplicates(subset=['userChatId'], keep='first')
-        else:
-            combined = combined.drop_duplicates(subset=['userId', 'firstAskedAt', 'createdAt'], keep='first')
-        after_dedup = len(combined)
-        print(f"[DEBUG] 중복 제거 완료: {before_dedup} → {after_dedup} rows")
-    except Exception as e:
-        print(f"[ERROR] 중복 제거 실패: {type(e).__name__}: {e}")
-        return pd.DataFrame()
+    # 중복 제거 없음: 업서트/파티션 정리가 저장소 전체에서 userChatId 유일성을 보장 (verify_partitions로 점검)
 
     print(f"[DEBUG] 날짜 필터링 시작")
     try:
         # 1) firstAskedAt이 없으면 createdAt 사용 (OB 데이터 처리)
-        # firstAskedAt과 createdAt 모두 KST naive로 정규화
-        fa = pd.to_datetime(combined['firstAskedAt'], errors='coerce')
-        ca = pd.to_datetime(combined.get('createdAt'), errors='coerce')
-        
-        # tz-aware인 경우만 Asia/Seoul로 변환 후 tz 제거
-        if getattr(fa.dt, "tz", None) is not None:
-            fa = fa.dt.tz_convert('Asia/Seoul').dt.tz_localize(None)
-        if getattr(ca.dt, "tz", None) is not None:
-            ca = ca.dt.tz_convert('Asia/Seoul').dt.tz_localize(None)
+        fa = _series_kst_naive(combined['firstAskedAt'])
+        ca = _series_kst_naive(combined.get('createdAt'))
         
         # firstAskedAt이 NaN이면 createdAt 사용
         date_for_filter = fa.fillna(ca)
-        combined['firstAskedAt'] = fa  # 원본은 유지
         combined['_date_for_filter'] = date_for_filter  # 필터링용 날짜
 
         # 2) 비교 범위 (KST naive)
@@ -1293,7 +1727,7 @@ async def build_and_cache_csat_rows(start_date: str, end_date: str) -> int:
     
     async with csat_build_lock:
         # 0) 기존 CSAT 캐시 불러오기 (증분 업데이트용)
-        existing_csat = load_csat_rows_from_cache(start_date, end_date)
+        existing_csat = await run_blocking(load_csat_rows_from_cache, start_date, end_date)
         existing_ids = set()
         
         # 디버깅: 캐시 로드 결과 확인
@@ -1325,12 +1759,7 @@ async def build_and_cache_csat_rows(start_date: str, end_date: str) -> int:
             return out
         
         months = _months(start_date, end_date)
-        all_data = []
-        
-        for month in months:
-            df = get_cached_data_month(month)
-            if df is not None and not df.empty:
-                all_data.append(df)
+        all_data = list((await run_blocking(load_month_partitions, "userchats", months)).values())
         
         if not all_data:
             # 캐시가 없으면 refresh로 전체 수집
@@ -1339,18 +1768,12 @@ async def build_and_cache_csat_rows(start_date: str, end_date: str) -> int:
                 return 0
             # refresh 후에도 날짜 필터링이 적용되어 있으므로
             # 월별 캐시에서 다시 가져오기
-            all_data = []
-            for month in months:
-                df = get_cached_data_month(month)
-                if df is not None and not df.empty:
-                    all_data.append(df)
+            all_data = list((await run_blocking(load_month_partitions, "userchats", months)).values())
             if not all_data:
                 return 0
         
         # 날짜 필터링 전의 전체 데이터 합치기
-        user_df = pd.concat(all_data, ignore_index=True)
-        if 'userChatId' in user_df.columns:
-            user_df = user_df.drop_duplicates(subset=['userChatId'], keep='first')
+        user_df = await run_blocking(pd.concat, all_data, ignore_index=True)
         
         print(f"[CSAT] 전체 userChat 수 (날짜 필터링 전): {len(user_df)}")
 
@@ -1364,13 +1787,9 @@ async def build_and_cache_csat_rows(start_date: str, end_date: str) -> int:
 
         # 3) firstAskedAt을 확실하게 datetime으로 변환 (정렬 전 필수)
         # 문자열 상태로 정렬하면 날짜 순서가 뒤죽박죽이 됨
+        # userchats 파티션은 이미 KST naive → utc=True로 다시 파싱하면 +9시간 밀리므로 dtype만 확인
         if "firstAskedAt" in csat_df.columns:
-            # utc=True로 파싱 후 KST로 변환하여 일관성 보장
-            csat_df["firstAskedAt"] = pd.to_datetime(
-                csat_df["firstAskedAt"], 
-                errors="coerce", 
-                utc=True
-            ).dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
+            csat_df["firstAskedAt"] = _series_kst_naive(csat_df["firstAskedAt"])
             print(f"[CSAT] firstAskedAt datetime 변환 완료: {csat_df['firstAskedAt'].notna().sum()}개 유효")
         
         # 4) 최신순 정렬 (내림차순) - datetime 변환 후 반드시 필요
@@ -1470,45 +1889,15 @@ async def build_and_cache_csat_rows(start_date: str, end_date: str) -> int:
 
         print(f"[CSAT] 신규 CSAT {len(rows)}개 파싱 완료")
 
-        # 6) 월별로 쪼개서 저장 (userchats 캐시와 동일 정책)
+        # 6) 월별 파티션에 업서트 (제출일 우선, 없으면 firstAskedAt 기준 월 버킷)
+        # 기존 월 파티션의 행은 유지하고 userChatId 기준으로 교체/추가만 한다
         csat_df = pd.DataFrame(rows)
-
-        # === 기존 buggy 블록 지우고 아래로 교체 ===
-        # 1) 두 날짜 컬럼을 각각 KST naive로 정규화
-        first_dt = pd.to_datetime(csat_df["firstAskedAt"], errors="coerce")
-        if getattr(first_dt.dt, "tz", None) is not None:
-            first_dt = first_dt.dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-
-        # csatSubmittedAt에서 만든 csatDate는 KST(+09:00) tz-aware 문자열일 수 있음
-        # → utc=True로 파싱 후 KST로 변환, tz 제거
-        csat_dt = pd.to_datetime(csat_df["csatDate"], errors="coerce", utc=True)
-        csat_dt = csat_dt.dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-
-        # 2) 제출일 우선, 없으면 firstAskedAt
-        csat_df["bucketDate"] = csat_dt.fillna(first_dt)
-
-        # 3) 버킷 없는 행 제외 후 month 생성
-        csat_df = csat_df[csat_df["bucketDate"].notna()].copy()
-        csat_df["month"] = csat_df["bucketDate"].dt.to_period("M").astype(str)
-        total_saved = 0
-        for month, mdf in csat_df.groupby("month"):
-            mdf = mdf.drop(columns=["month", "bucketDate"])
-            key = f"csat_{month}"
-            # 각 월의 첫날 00:00:00부터 마지막 날 23:59:59.999999까지
-            month_period = pd.Period(month)
-            month_start = month_period.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
-            month_end = month_period.end_time.replace(hour=23, minute=59, second=59, microsecond=999999)
-            meta = {
-                "month": month, 
-                "range": [start_date, end_date], 
-                "api_fetch": True, 
-                "kind": "csat",
-                "first_asked_start": month_start.isoformat(),
-                "first_asked_end": month_end.isoformat()
-            }
-            server_cache.save_data(key, mdf, meta)
-            total_saved += len(mdf)   # ✅ 누적 저장 수 반영
-        print(f"[CSAT] 총 {total_saved} rows 저장 완료")
+        saved = await run_blocking(
+            upsert_partitions, "csat", csat_df,
+            extra_meta={"range": [start_date, end_date], "api_fetch": True, "kind": "csat"},
+        )
+        total_saved = len(csat_df) if saved else 0
+        print(f"[CSAT] 총 {total_saved} rows 저장 완료 (파티션: {sorted(saved)})")
         return total_saved
 
 # === 신규: csat_raw.pkl에서 직접 로드 (triggerId 필터링) ===
@@ -1554,12 +1943,7 @@ def load_csat_rows_from_cache(start_date: str, end_date: str) -> pd.DataFrame:
 
     # 1단계: 월별 캐시 파일들에서 로드 시도
     months = _months(start_date, end_date)
-    frames = []
-    for month in months:
-        key = f"csat_{month}"
-        df, _ = server_cache.load_data(key)
-        if df is not None and not df.empty:
-            frames.append(df)
+    frames = list(load_month_partitions("csat", months).values())
     
     if frames:
         # 월별 캐시가 있으면 그것을 사용
@@ -1594,31 +1978,29 @@ def load_csat_rows_from_cache(start_date: str, end_date: str) -> pd.DataFrame:
             print(f"[CSAT] 날짜 필터링 실패: {e}")
             return pd.DataFrame()
     
-    # ✅ 기간 필터: 제출일(우선) → 제출일이 없으면 firstAskedAt
-    # ✅ tz-aware(예: +09:00) → Asia/Seoul로 변환 후 naive 비교
-    date_candidates = [c for c in ["csatDate", "csatSubmittedAt", "submittedAt", "firstAskedAt"] if c in out.columns]
-    date_key = date_candidates[0] if date_candidates else None
+    return filter_csat_period(out, start_date, end_date)
 
-    def _to_kst_naive_series(s):
-        dt = pd.to_datetime(s, errors="coerce")
-        # tz-aware면 KST로 변환 후 tz 제거
-        try:
-            if getattr(dt.dt, "tz", None) is not None:
-                dt = dt.dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-        except Exception:
-            # 일부 케이스는 tz_localize로만 들어오는 경우가 있어 보조 처리
-            try:
-                dt = pd.to_datetime(s, errors="coerce", utc=True).dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
-            except Exception:
-                pass
-        return dt
+def csat_period_dates(out: pd.DataFrame) -> Optional[pd.Series]:
+    """
+    CSAT 행의 기간 기준 시각 (KST naive). 날짜 컬럼이 전혀 없으면 None.
+    ✅ 제출일(우선) → 제출일이 없으면 firstAskedAt
+    ✅ tz-aware(예: +09:00) → Asia/Seoul로 변환 후 naive 비교
+    """
+    date_candidates = [c for c in ["csatDate", "csatSubmittedAt", "submittedAt", "firstAskedAt"] if c in out.columns]
+    if not date_candidates:
+        return None
+    dates = _series_kst_naive(out[date_candidates[0]])
+    # 모든 값이 NaT면 firstAskedAt로 폴백 시도
+    if dates.notna().sum() == 0 and "firstAskedAt" in out.columns:
+        dates = _series_kst_naive(out["firstAskedAt"])
+    return dates
 
-    if date_key is not None:
-        out["_csat_dt"] = _to_kst_naive_series(out[date_key])
+def filter_csat_period(out: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+    """CSAT 행 기간 필터 (load_csat_rows_from_cache와 보강 CSAT 파티션 공용)"""
+    dates = csat_period_dates(out)
 
-        # 모든 값이 NaT면 firstAskedAt로 폴백 시도
-        if out["_csat_dt"].notna().sum() == 0 and "firstAskedAt" in out.columns:
-            out["_csat_dt"] = _to_kst_naive_series(out["firstAskedAt"])
+    if dates is not None:
+        out["_csat_dt"] = dates
 
         s = pd.to_datetime(start_date)
         e = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
@@ -1756,92 +2138,19 @@ def build_csat_type_scores(enriched_df: pd.DataFrame):
       "문의유형": { "A-1": [ { "문의유형": "...", "평균점수": 4.7, "응답자수": 12, "userIds": [...] }, ... ], ... },
       "고객유형": { ... }
     }
+    집계는 app/csat_stats.aggregate_scores (라벨 × 문항 전체를 한 번에)
     """
-    import pandas as pd
-    import numpy as np
-    
+    from app.csat_stats import build_type_scores
+
     if enriched_df is None or enriched_df.empty:
         print(f"[CSAT] enriched_df가 비어있습니다.")
         return {}
 
     print(f"[CSAT] 유형별 집계 시작: {len(enriched_df)}건")
-    
-    csat_cols = [c for c in enriched_df.columns if c.startswith("A-")]
-    print(f"  - CSAT 문항 컬럼: {csat_cols}")
-    
-    result = {}
-
-    def _group_payload(df, label_col, score_col):
-        # --- 1) wf_768201_started를 견고한 bool 시리즈로 정규화 ---
-        raw = df["wf_768201_started"] if "wf_768201_started" in df.columns else pd.Series(False, index=df.index)
-        elig = pd.Series(raw, index=df.index)  # 인덱스 정렬
-        elig = (elig
-                .replace({True: True, False: False,
-                          'True': True, 'False': False,
-                          'true': True, 'false': False,
-                          '1': True, '0': False, 1: True, 0: False})
-                .fillna(False)
-                .astype(bool))
-
-        # 이 문항 값만 숫자화 (응답 유무 판단용)
-        tmp = pd.to_numeric(df[score_col], errors="coerce")
-
-        records = []
-        # dropna=False 로 그룹핑해야 NaN 라벨(빈 값)도 따로 집계 가능
-        for label_val, sub in df.groupby(label_col, dropna=False):
-            # 빈 값이나 NaN은 "미분류"로 표시
-            if pd.isna(label_val) or str(label_val).strip() == "":
-                label_val = "미분류"
-            sub_idx = sub.index
-
-            # --- 2) 공통 분모: 설문 시작자 수 (해당 그룹 범위로 인덱스 맞춰 합산) ---
-            denom = int(elig.reindex(sub_idx).sum())
-
-            # --- 3) 문항별 응답자수: 이 문항에 실제 값이 있는 사람 수 ---
-            answered_this = int(tmp.reindex(sub_idx).notna().sum())
-
-            # --- 4) 문항별 미응답자수 ---
-            non_responded = max(0, denom - answered_this)
-
-            # 디버그 로그
-            print(f"[CSAT_GRP] {label_col}={label_val} denom={denom} answered_this({score_col})={answered_this}")
-
-            # 평균점수(문항별) 계산
-            series = pd.to_numeric(sub[score_col], errors='coerce').dropna()
-            avg = float(series.mean()) if len(series) else 0.0
-            if not np.isfinite(avg):
-                avg = 0.0
-
-            user_ids = sub.get("userId")
-            user_ids = sorted(set(user_ids.dropna().astype(str).tolist()))[:50] if user_ids is not None else []
-
-            records.append({
-                label_col: label_val,
-                "평균점수": avg,
-                "userIds": user_ids,
-
-                # ✅ 공통 분모 + 문항별 응답/미응답
-                "대상자수": denom,
-                "응답자수": answered_this,
-                "미응답자수": non_responded,
-                "막대값": answered_this,  # 차트 막대 길이 = 문항별 응답자수
-            })
-
-        # 안전장치
-        for r in records:
-            r["평균점수"] = float(np.nan_to_num(r["평균점수"], nan=0.0, posinf=0.0, neginf=0.0))
-            r["응답자수"] = int(np.nan_to_num(r["응답자수"], nan=0, posinf=0, neginf=0))
-            r["미응답자수"] = int(np.nan_to_num(r["미응답자수"], nan=0, posinf=0, neginf=0))
-            r["대상자수"] = int(np.nan_to_num(r["대상자수"], nan=0, posinf=0, neginf=0))
-            r["막대값"]   = int(np.nan_to_num(r["막대값"],   nan=0, posinf=0, neginf=0))
-
-        return sorted(records, key=lambda r: r["응답자수"], reverse=True)
-
-    for label in ["문의유형", "고객유형", "서비스유형"]:
-        result[label] = {}
-        for a in csat_cols:
-            result[label][a] = _group_payload(enriched_df, label, a)
-            print(f"  - {label}별 {a}: {len(result[label][a])}개 그룹")
+    result = build_type_scores(enriched_df)
+    for label, by_col in result.items():
+        for a, groups in by_col.items():
+            print(f"  - {label}별 {a}: {len(groups)}개 그룹")
 
     print(f"[CSAT] 유형별 집계 완료: {len(result)}개 유형")
     return result
\ No newline at end of file
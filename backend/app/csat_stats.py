@@ -0,0 +1,191 @@
+# app/csat_stats.py
+"""
+CSAT 집계 엔진.
+
+- aggregate_scores: (차원 × 문항) 평균점수 / 응답자수 / 대상자수 / 미응답자수를 한 번에 계산.
+  전체(요약)와 차원별 그룹을 하나의 그룹 번호 공간으로 쌓은 뒤 문항마다 np.bincount 한 번씩만 돈다
+  (기존처럼 라벨 × 문항마다 groupby + reindex를 반복하지 않음).
+- build_type_scores / build_summary: 기존 build_csat_type_scores / 요약 리스트와 같은 형태로 변환.
+- comment_frame: 코멘트 목록을 컬럼 단위 필터 + 정렬로 만든다 (iterrows 없음).
+
+규칙은 기존 코드와 같다.
+- 대상자 = wf_768201_started 정규화 결과 (True/"true"/"1"/1 등)
+- 그룹 순서는 groupby(dropna=False)와 같이 정렬 후 결측 그룹이 마지막, 빈 값/결측 라벨은 "미분류"
+- 그룹 목록은 응답자수 내림차순 (같으면 그룹 순서 유지)
+- 코멘트는 값이 있고 공백 제거 후 비어 있지 않은 행만, firstAskedAt 최신순 (같으면 원래 순서)
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ELIGIBLE_COLUMN = "wf_768201_started"
+
+TYPE_LABELS = ["문의유형", "고객유형", "서비스유형"]
+
+# 그룹별 userIds 최대 개수
+MAX_GROUP_USER_IDS = 50
+
+_ELIGIBLE_MAP = {
+    True: True, False: False,
+    "True": True, "False": False,
+    "true": True, "false": False,
+    "1": True, "0": False, 1: True, 0: False,
+}
+
+
+def eligible_mask(df: pd.DataFrame) -> np.ndarray:
+    """설문 대상자(워크플로우 시작자) 여부"""
+    raw = df[ELIGIBLE_COLUMN] if ELIGIBLE_COLUMN in df.columns else pd.Series(False, index=df.index)
+    elig = pd.Series(raw, index=df.index).replace(_ELIGIBLE_MAP).fillna(False).astype(bool)
+    return elig.to_numpy()
+
+
+def score_columns(df: pd.DataFrame) -> List[str]:
+    return [c for c in df.columns if str(c).startswith("A-")]
+
+
+def aggregate_scores(df: pd.DataFrame, score_cols: List[str], dims: List[str]) -> dict:
+    """
+    반환: {
+      "total": {"대상자수", "문항": {문항: (응답자수, 평균)}},
+      "dims":  {차원: {"labels": [그룹 값...], "codes": 행별 그룹 번호,
+                       "대상자수": [...], "문항": {문항: (응답자수 배열, 평균 배열)}}}
+    }
+    그룹 번호 0은 전체, 이후 차원마다 구간을 나눠 쓴다.
+    """
+    n = len(df)
+    elig = eligible_mask(df).astype(np.float64)
+    scores = {c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64) for c in score_cols}
+
+    key_parts = [np.zeros(n, dtype=np.int64)]
+    spans = {}
+    offset = 1
+    for dim in dims:
+        codes, uniques = pd.factorize(df[dim], sort=True)
+        size = len(uniques)
+        labels = list(uniques)
+        if (codes < 0).any():
+            # 결측 그룹은 groupby(dropna=False)처럼 맨 뒤
+            codes = np.where(codes < 0, size, codes)
+            labels.append(np.nan)
+            size += 1
+        key_parts.append(codes.astype(np.int64) + offset)
+        spans[dim] = (offset, size, labels, codes)
+        offset += size
+
+    keys = np.concatenate(key_parts)
+    rows = np.tile(np.arange(n), len(key_parts))
+    elig_sum = np.bincount(keys, weights=elig[rows], minlength=offset)
+    answered, means = {}, {}
+    for c, values in scores.items():
+        v = values[rows]
+        has = ~np.isnan(v)
+        cnt = np.bincount(keys, weights=has, minlength=offset)
+        tot = np.bincount(keys, weights=np.where(has, v, 0.0), minlength=offset)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = np.where(cnt > 0, tot / np.maximum(cnt, 1), 0.0)
+        avg[~np.isfinite(avg)] = 0.0
+        answered[c], means[c] = cnt.astype(np.int64), avg
+
+    out = {
+        "total": {
+            "대상자수": int(elig_sum[0]),
+            "문항": {c: (int(answered[c][0]), float(means[c][0])) for c in score_cols},
+        },
+        "dims": {},
+    }
+    for dim, (start, size, labels, codes) in spans.items():
+        sl = slice(start, start + size)
+        out["dims"][dim] = {
+            "labels": labels,
+            "codes": codes,
+            "대상자수": elig_sum[sl].astype(np.int64),
+            "문항": {c: (answered[c][sl], means[c][sl]) for c in score_cols},
+        }
+    return out
+
+
+def _group_user_ids(df: pd.DataFrame, codes: np.ndarray, size: int) -> List[list]:
+    """그룹별 정렬된 고유 userId(str) 앞 MAX_GROUP_USER_IDS개"""
+    ids: List[list] = [[] for _ in range(size)]
+    if "userId" not in df.columns:
+        return ids
+    uid = df["userId"]
+    keep = uid.notna().to_numpy()
+    pairs = (pd.DataFrame({"g": codes[keep], "u": uid[keep].astype(str).to_numpy()})
+             .drop_duplicates()
+             .sort_values(["g", "u"], kind="stable"))
+    pairs = pairs[pairs.groupby("g").cumcount() < MAX_GROUP_USER_IDS]
+    for g, sub in pairs.groupby("g", sort=False)["u"]:
+        ids[int(g)] = sub.tolist()
+    return ids
+
+
+def _label_text(v):
+    if pd.isna(v) or str(v).strip() == "":
+        return "미분류"
+    return v
+
+
+def build_type_scores(df: pd.DataFrame, labels: Optional[List[str]] = None) -> Dict[str, dict]:
+    """{라벨: {문항: [{라벨, 평균점수, userIds, 대상자수, 응답자수, 미응답자수, 막대값}, ...]}}"""
+    labels = labels or TYPE_LABELS
+    cols = score_columns(df)
+    agg = aggregate_scores(df, cols, labels)
+    result: Dict[str, dict] = {}
+    for label in labels:
+        part = agg["dims"][label]
+        names = [_label_text(v) for v in part["labels"]]
+        user_ids = _group_user_ids(df, part["codes"], len(names))
+        denom = part["대상자수"]
+        result[label] = {}
+        for c in cols:
+            answered, avg = part["문항"][c]
+            order = np.argsort(-answered, kind="stable")
+            result[label][c] = [{
+                label: names[i],
+                "평균점수": float(avg[i]),
+                "userIds": list(user_ids[i]),
+                "대상자수": int(denom[i]),
+                "응답자수": int(answered[i]),
+                "미응답자수": max(0, int(denom[i]) - int(answered[i])),
+                "막대값": int(answered[i]),  # 차트 막대 길이 = 문항별 응답자수
+            } for i in order]
+    return result
+
+
+def build_summary(df: pd.DataFrame, score_cols: List[str]) -> dict:
+    """기본 요약 (A-1/2/4/5) — {"총응답수": 대상자수, "요약": [...]}"""
+    total = aggregate_scores(df, score_cols, [])["total"]
+    elig_count = total["대상자수"]
+    summary = []
+    for c in score_cols:
+        answered, avg = total["문항"][c]
+        summary.append({
+            "항목": c,
+            "평균점수": round(avg, 2),
+            "응답자수": answered,
+            "대상자수": elig_count,
+            "미응답자수": max(0, elig_count - answered),
+            "라벨": f"{c} ({round(avg, 2)}점)",
+        })
+    return {"총응답수": elig_count, "요약": summary}
+
+
+def comment_frame(df: pd.DataFrame, text_col: str) -> pd.DataFrame:
+    """text_col 코멘트가 있는 행만 firstAskedAt 최신순으로 (text 컬럼은 공백 제거한 문자열)"""
+    if text_col not in df.columns:
+        return df.iloc[0:0].assign(text=pd.Series(dtype=object))
+    raw = df[text_col]
+    text = raw.astype(str).str.strip()
+    keep = (raw.notna() & (text != "")).to_numpy()
+    out = df[keep].assign(text=text[keep].to_numpy(dtype=object))
+    if "firstAskedAt" in out.columns:
+        ts = pd.to_datetime(out["firstAskedAt"], errors="coerce")
+        # 최신순, 값이 없으면 맨 뒤. 같은 시각은 원래 순서 유지
+        key = ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        desc = np.where(ts.isna().to_numpy(), np.iinfo(np.int64).max, -key)
+        out = out.iloc[np.argsort(desc, kind="stable")]
+    return out
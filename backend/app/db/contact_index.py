@@ -0,0 +1,249 @@
+# app/db/contact_index.py
+"""
+고객(userId)별 문의 인덱스.
+
+userchats 월 파티션이 저장될 때 (userId, 문의 시각, userChatId, 매체/방향/문의유형)만 추려
+userId → 시각 순으로 정렬해 둔다. 월 파티션이 바뀌면 그 월만 다시 만들어진다.
+재문의/재문의 간격/코호트 집계는 여러 월의 인덱스를 이어 붙인 뒤
+(사용자 코드, 상대 시각) 합성 키에 np.searchsorted를 적용해 계산한다 (원본 행을 읽지 않음).
+
+- 문의 시각: firstAskedAt(없으면 createdAt) — 롤업 큐브/기간 필터와 같은 기준
+- userId가 비어 있는 행은 제외
+- 유선(phone)은 /api/manager-stats와 같이 같은 날짜·같은 userId를 1건으로 셀 수 있다 (dedup_phone)
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import register_derived, load_derived_months, cached_partition_months
+
+CONTACT_INDEX_NAME = "contact_index"
+
+CONTACT_COLUMNS = ["userId", "at", "userChatId", "mediumType", "direction", "문의유형_1차"]
+
+# 재문의 간격 구간 (일). 마지막 구간은 30일 이상
+INTERVAL_EDGES_DAYS = [0, 1, 3, 7, 14, 30]
+
+# 기간 내 문의 횟수 분포 (마지막은 이상)
+CONTACT_COUNT_BUCKETS = [1, 2, 3, 4, 5]
+
+_MS_PER_DAY = 86_400_000
+
+
+def _text(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].astype("string").fillna("").str.strip().astype(object)
+
+
+def build_contact_index(df: pd.DataFrame) -> pd.DataFrame:
+    """월 파티션 → userId, 시각 순 문의 목록"""
+    if df is None or df.empty or "userId" not in df.columns:
+        return pd.DataFrame({c: pd.Series(dtype="datetime64[ns]" if c == "at" else object) for c in CONTACT_COLUMNS})
+    when = df["firstAskedAt"] if "firstAskedAt" in df.columns else pd.Series(pd.NaT, index=df.index)
+    if "createdAt" in df.columns:
+        when = when.fillna(df["createdAt"])
+    out = pd.DataFrame({
+        "userId": _text(df, "userId"),
+        "at": when.astype("datetime64[ns]"),
+        "userChatId": _text(df, "userChatId"),
+        "mediumType": _text(df, "mediumType"),
+        "direction": _text(df, "direction"),
+        "문의유형_1차": _text(df, "문의유형_1차"),
+    })
+    out = out[(out["userId"] != "") & out["at"].notna()]
+    return out.sort_values(["userId", "at", "userChatId"], kind="stable").reset_index(drop=True)
+
+
+register_derived(CONTACT_INDEX_NAME, "userchats", build_contact_index)
+
+
+def load_contacts(start: Optional[str], end: str, directions: Optional[List[str]] = None,
+                  dedup_phone: bool = True) -> pd.DataFrame:
+    """
+    start~end(포함) 문의를 userId, 시각 순으로. start=None이면 캐시에 있는 가장 이른 월부터.
+    directions: 남길 direction 값 (None이면 전부)
+    """
+    end_ts = pd.to_datetime(end).normalize() + pd.Timedelta(days=1)
+    end_month = str(pd.to_datetime(end).to_period("M"))
+    if start is None:
+        months = [m for m in cached_partition_months("userchats") if m <= end_month]
+        start_ts = None
+    else:
+        months = [str(p) for p in pd.period_range(pd.to_datetime(start), pd.to_datetime(end), freq="M")]
+        start_ts = pd.to_datetime(start).normalize()
+    parts = [p for p in load_derived_months(CONTACT_INDEX_NAME, months).values() if not p.empty]
+    if not parts:
+        return build_contact_index(None)
+    frame = pd.concat(parts, ignore_index=True)
+    keep = (frame["at"] < end_ts).to_numpy(copy=True)
+    if start_ts is not None:
+        keep &= (frame["at"] >= start_ts).to_numpy()
+    if directions:
+        keep &= frame["direction"].isin(directions).to_numpy()
+    frame = frame[keep]
+    # 월 인덱스는 각각 정렬돼 있고 월은 시각 순이므로 userId 기준 안정 정렬이면 전체가 (userId, 시각) 순
+    frame = frame.sort_values("userId", kind="stable").reset_index(drop=True)
+    if dedup_phone:
+        frame = frame[~_phone_day_dup(frame)].reset_index(drop=True)
+    return frame
+
+
+def _phone_day_dup(frame: pd.DataFrame) -> np.ndarray:
+    """유선 문의끼리만 같은 날짜·같은 userId 중복 여부 (채팅 문의는 중복 판단에 쓰지 않음)"""
+    phone = (frame["mediumType"] == "phone").to_numpy()
+    out = np.zeros(len(frame), dtype=bool)
+    if phone.any():
+        sub = frame.loc[phone, ["userId"]].assign(_day=frame.loc[phone, "at"].dt.normalize())
+        out[phone] = sub.duplicated(keep="first").to_numpy()
+    return out
+
+
+class ContactKeys:
+    """(userId, 시각) 정렬 프레임의 합성 키: code × span + 상대 시각(ms) — 사용자 경계를 넘지 않는 searchsorted용"""
+
+    def __init__(self, frame: pd.DataFrame, pad_ms: int = 0):
+        self.codes, self.users = pd.factorize(frame["userId"], sort=True)
+        ms = frame["at"].to_numpy(dtype="datetime64[ms]").astype(np.int64)
+        self.base = int(ms.min()) if len(ms) else 0
+        self.rel = ms - self.base
+        self.span = int(self.rel.max() if len(ms) else 0) + int(pad_ms) + 1
+        self.keys = self.codes.astype(np.int64) * self.span + self.rel
+
+    def count_within(self, window_ms: int) -> np.ndarray:
+        """문의마다 같은 사용자의 [시각, 시각 + window) 문의 수 (자기 자신 포함)"""
+        upper = np.searchsorted(self.keys, self.keys + window_ms, side="left")
+        first = np.searchsorted(self.keys, self.keys, side="left")
+        return upper - first
+
+    def next_gap_ms(self) -> np.ndarray:
+        """문의마다 같은 사용자의 다음 문의까지 간격(ms). 마지막 문의는 -1"""
+        gap = np.full(len(self.keys), -1, dtype=np.int64)
+        if len(self.keys) > 1:
+            same = self.codes[1:] == self.codes[:-1]
+            gap[:-1] = np.where(same, self.rel[1:] - self.rel[:-1], -1)
+        return gap
+
+
+def _pct(num: int, den: int) -> Optional[float]:
+    return round(num / den * 100, 2) if den else None
+
+
+def repeat_summary(frame: pd.DataFrame, window_days: int, min_contacts: int) -> Dict[str, object]:
+    """고객 수, 재문의 고객(2회 이상), window_days일 안에 min_contacts회 이상 문의한 고객, 문의 횟수 분포"""
+    window_ms = window_days * _MS_PER_DAY
+    keys = ContactKeys(frame, pad_ms=window_ms)
+    per_user = np.bincount(keys.codes, minlength=len(keys.users)) if len(frame) else np.zeros(0, dtype=np.int64)
+    burst = np.zeros(len(keys.users), dtype=np.int64)
+    if len(frame):
+        np.maximum.at(burst, keys.codes, keys.count_within(window_ms))
+    customers = int(len(keys.users))
+    repeat = int((per_user >= 2).sum())
+    bursting = int((burst >= min_contacts).sum())
+
+    dist = []
+    for i, k in enumerate(CONTACT_COUNT_BUCKETS):
+        last = i == len(CONTACT_COUNT_BUCKETS) - 1
+        n = int((per_user >= k).sum() if last else (per_user == k).sum())
+        dist.append({"contacts": f"{k}+" if last else str(k), "customers": n, "p": _pct(n, customers)})
+    return {
+        "contacts": int(len(frame)),
+        "customers": customers,
+        "repeatCustomers": repeat,
+        "repeatRate": _pct(repeat, customers),
+        "windowDays": window_days,
+        "minContacts": min_contacts,
+        "burstCustomers": bursting,
+        "burstRate": _pct(bursting, customers),
+        "contactsPerCustomer": round(len(frame) / customers, 3) if customers else None,
+        "distribution": dist,
+    }
+
+
+def interval_labels() -> List[str]:
+    e = INTERVAL_EDGES_DAYS
+    return [f"{e[i]}-{e[i + 1]}d" for i in range(len(e) - 1)] + [f"{e[-1]}d+"]
+
+
+def recontact_intervals(frame: pd.DataFrame, within_days: int, quantiles: List[float],
+                        group_by: Optional[str] = None) -> Dict[str, object]:
+    """
+    같은 고객의 연속 문의 간격(시간 단위) 분포와 within_days일 안 재문의율.
+    재문의율 = 다음 문의가 within_days일 안에 있는 문의 비율. group_by: 앞 문의의 컬럼 값별 재문의율
+    """
+    keys = ContactKeys(frame)
+    gap = keys.next_gap_ms()
+    has_next = gap >= 0
+    hours = gap[has_next] / 3_600_000
+    within = has_next & (gap < within_days * _MS_PER_DAY)
+
+    bins = np.searchsorted(np.asarray(INTERVAL_EDGES_DAYS, dtype="float64") * 24, hours, side="right") - 1
+    counts = np.bincount(bins, minlength=len(INTERVAL_EDGES_DAYS))
+    out: Dict[str, object] = {
+        "unit": "hours",
+        "contacts": int(len(frame)),
+        "intervals": int(has_next.sum()),
+        "withinDays": within_days,
+        "recontacts": int(within.sum()),
+        "recontactRate": _pct(int(within.sum()), int(len(frame))),
+        "mean": round(float(hours.mean()), 2) if len(hours) else None,
+        "quantiles": dict(zip(
+            [f"p{q * 100:g}" for q in quantiles],
+            [round(float(v), 2) for v in np.quantile(hours, quantiles)] if len(hours) else [None] * len(quantiles),
+        )),
+        "histogram": [{"label": lab, "count": int(c)} for lab, c in zip(interval_labels(), counts)],
+    }
+    if group_by:
+        labels = frame[group_by].replace("", "미분류").to_numpy(dtype=object)
+        g = pd.DataFrame({"g": labels, "within": within, "one": 1}).groupby("g", sort=True)[["one", "within"]].sum()
+        g = g.sort_values("one", ascending=False, kind="stable")
+        out["groupBy"] = group_by
+        out["groups"] = [
+            {"key": str(k), "contacts": int(r["one"]), "recontacts": int(r["within"]),
+             "recontactRate": _pct(int(r["within"]), int(r["one"]))}
+            for k, r in g.iterrows()
+        ]
+    return out
+
+
+def cohort_retention(frame: pd.DataFrame, start: str, end: str, periods: int) -> Dict[str, object]:
+    """
+    첫 문의 월 코호트 × 경과 월 재방문 고객 수.
+    frame: 캐시 전체(~end) 문의 (첫 문의 월을 정하려면 start 이전 이력도 필요)
+    cohorts: start~end에 첫 문의가 있는 월. retention[k] = k개월 뒤 다시 문의한 고객 비율(%)
+    """
+    cohort_months = pd.period_range(pd.to_datetime(start), pd.to_datetime(end), freq="M")
+    end_period = pd.to_datetime(end).to_period("M")
+    end_ordinal = end_period.year * 12 + end_period.month - 1
+    empty = {"cohorts": [], "periods": periods}
+    if frame.empty or not len(cohort_months):
+        return empty
+    codes, users = pd.factorize(frame["userId"], sort=True)
+    # 월 번호 = 연 × 12 + (월 - 1)
+    ordinal = frame["at"].dt.year.to_numpy(dtype=np.int64) * 12 + frame["at"].dt.month.to_numpy(dtype=np.int64) - 1
+    first = np.full(len(users), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, codes, ordinal)
+    offset = ordinal - first[codes]
+    c0 = cohort_months[0].year * 12 + cohort_months[0].month - 1
+    n_cohorts = len(cohort_months)
+    keep = (first[codes] >= c0) & (first[codes] < c0 + n_cohorts) & (offset <= periods)
+    # (사용자, 경과 월) 중복 제거 후 코호트 × 경과 월 고객 수
+    active = np.unique(np.stack([codes[keep], offset[keep]], axis=1), axis=0) if keep.any() else np.zeros((0, 2), np.int64)
+    matrix = np.zeros((n_cohorts, periods + 1), dtype=np.int64)
+    if len(active):
+        np.add.at(matrix, (first[active[:, 0]] - c0, active[:, 1]), 1)
+
+    cohorts = []
+    for i, p in enumerate(cohort_months):
+        size = int(matrix[i, 0])
+        # end 이후 경과 월은 아직 관측되지 않음 → None
+        observable = end_ordinal - (c0 + i)
+        cohorts.append({
+            "cohort": str(p),
+            "customers": size,
+            "active": [int(v) if k <= observable else None for k, v in enumerate(matrix[i])],
+            "retention": [(_pct(int(v), size) if k <= observable else None) for k, v in enumerate(matrix[i])],
+        })
+    return {"cohorts": cohorts, "periods": periods}
@@ -0,0 +1,101 @@
+# app/db/csat_enriched.py
+"""
+유형 정보가 붙은 CSAT 파티션.
+
+- chat_types: userchats 월 파티션 저장 시 (userChatId, 유형 컬럼)만 추린 표.
+- csat_enriched: csat 월 파티션 저장 시 행마다 자기 상담(userChatId)의 유형 컬럼을 붙여 둔 것.
+  userChatId가 들어 있는 userchats 파티션은 파티션 인덱스로 찾고,
+  그 파티션들의 버전을 의존성으로 기록해 상담 쪽이 바뀌면 해당 CSAT 월만 읽을 때 다시 붙인다.
+  상담을 찾지 못한 행도 남기고 chatMatched=False로 표시한다.
+
+기존 /api/csat-analysis는 요청마다 userchats 전체 월을 읽어 userId로 조인했는데,
+한 사용자의 여러 상담 중 마지막 상담 유형이 모든 CSAT 응답에 붙는 문제가 있었다.
+"""
+
+from typing import List, Optional
+
+import pandas as pd
+
+from app.cs_utils import (
+    register_derived, load_derived, load_derived_months, get_partition_index,
+    filter_csat_period, _series_kst_naive,
+)
+
+CHAT_TYPES_NAME = "chat_types"
+CSAT_ENRICHED_NAME = "csat_enriched"
+
+ENRICH_COLUMNS = [
+    "고객유형", "고객유형_2차",
+    "문의유형", "문의유형_2차",
+    "서비스유형", "서비스유형_2차",
+]
+
+MATCHED_COLUMN = "chatMatched"
+
+
+def build_chat_types(df: pd.DataFrame) -> pd.DataFrame:
+    """userchats 월 파티션 → userChatId + 유형 컬럼 (userChatId당 1행)"""
+    if df is None or df.empty or "userChatId" not in df.columns:
+        return pd.DataFrame({c: pd.Series(dtype=object) for c in ["userChatId"] + ENRICH_COLUMNS})
+    out = pd.DataFrame({"userChatId": df["userChatId"].astype(str).to_numpy()})
+    for c in ENRICH_COLUMNS:
+        out[c] = df[c].to_numpy() if c in df.columns else None
+    return out.drop_duplicates(subset=["userChatId"], keep="last").reset_index(drop=True)
+
+
+register_derived(CHAT_TYPES_NAME, "userchats", build_chat_types)
+
+
+def _chat_partitions(df: pd.DataFrame) -> List[str]:
+    """CSAT 행들의 상담이 들어 있는(또는 들어갈) userchats 파티션 키"""
+    ids = df["userChatId"].dropna().astype(str)
+    found = get_partition_index("userchats").lookup(ids)
+    keys = {key for key, _ in found.values()}
+    # 아직 상담이 없는 행은 firstAskedAt 월 파티션에 들어올 것이므로 그 파티션도 지켜본다
+    if "firstAskedAt" in df.columns:
+        missing = ~df["userChatId"].astype(str).isin(found.keys())
+        months = _series_kst_naive(df.loc[missing, "firstAskedAt"]).dropna().dt.to_period("M").astype(str)
+        keys |= {f"userchats_{m}" for m in months.unique()}
+    return sorted(keys)
+
+
+def _depends(df: pd.DataFrame) -> List[str]:
+    if df is None or df.empty or "userChatId" not in df.columns:
+        return []
+    return _chat_partitions(df)
+
+
+def build_enriched_csat(df: pd.DataFrame) -> pd.DataFrame:
+    """csat 월 파티션 → 같은 행 순서에 유형 컬럼 + chatMatched"""
+    if df is None or df.empty or "userChatId" not in df.columns:
+        base = df if df is not None else pd.DataFrame()
+        return base.assign(**{c: None for c in ENRICH_COLUMNS}, **{MATCHED_COLUMN: False})
+    months = [k.split("_", 1)[1] for k in _chat_partitions(df)]
+    parts = [t for t in (load_derived(CHAT_TYPES_NAME, m) for m in months) if t is not None and not t.empty]
+    types = (pd.concat(parts, ignore_index=True).drop_duplicates(subset=["userChatId"], keep="last")
+             if parts else build_chat_types(None))
+    base = df.drop(columns=[c for c in ENRICH_COLUMNS + [MATCHED_COLUMN] if c in df.columns])
+    keys = base["userChatId"].astype(str)
+    lookup = types.set_index("userChatId")
+    out = base.copy()
+    for c in ENRICH_COLUMNS:
+        out[c] = keys.map(lookup[c]).to_numpy()
+    out[MATCHED_COLUMN] = keys.isin(lookup.index).to_numpy()
+    return out
+
+
+register_derived(CSAT_ENRICHED_NAME, "csat", build_enriched_csat, depends=_depends)
+
+
+def load_enriched_csat_rows(start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+    """
+    기간의 유형 보강 CSAT 행 (load_csat_rows_from_cache와 같은 기간 필터).
+    csat 월 파티션이 하나도 없으면 None → 호출 측에서 기존 로더로 대체.
+    """
+    months = [str(p) for p in pd.period_range(pd.to_datetime(start_date).to_period("M"),
+                                              pd.to_datetime(end_date).to_period("M"), freq="M")]
+    parts = load_derived_months(CSAT_ENRICHED_NAME, months)
+    if not parts:
+        return None
+    out = pd.concat([parts[m] for m in months if m in parts], ignore_index=True)
+    return filter_csat_period(out, start_date, end_date)
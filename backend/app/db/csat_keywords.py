@@ -0,0 +1,223 @@
+# app/db/csat_keywords.py
+"""
+CSAT 코멘트 키워드/구 빈도표.
+
+csat 월 파티션이 저장될 때 comment_3/comment_6 코멘트를 단어로 나누고
+단어(n=1)와 이웃한 두 단어 구(n=2)가 몇 개의 코멘트에 나왔는지를
+일 × 코멘트 종류 × 문의유형 × 서비스유형 × 점수대 별로 세어 둔다 (문서 빈도).
+표끼리는 더하기만 하면 되므로 임의 기간은 일 단위로 잘라 합산한다.
+형태소 분석기 없이 정규식 토큰화 + 흔한 조사 제거 + 불용어만 쓴다.
+
+- 유형: 코멘트가 달린 상담(userChatId)의 유형 — csat_enriched와 같은 보강 규칙/의존성 (상담 쪽이 바뀌면 다시 만든다)
+- 점수대: 코멘트에 딸린 점수(comment_3 → A-2, comment_6 → A-5) 기준 SCORE_BANDS
+- day: CSAT 기간 필터와 같은 기준 (csat_period_dates)
+"""
+
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import register_derived, load_derived_months, csat_period_dates
+from app.db.csat_enriched import build_enriched_csat, _depends as _enrich_depends
+from app.db.csat_search import TEXT_FIELDS, normalize_text
+
+CSAT_KEYWORDS_NAME = "csat_keywords"
+
+UNCLASSIFIED = "미분류"
+NO_SCORE = "없음"
+
+# 점수대 (이상, 이하)
+SCORE_BANDS = {"낮음": (1, 2), "보통": (3, 3), "높음": (4, 5)}
+
+GROUP_COLUMNS = ["day", "field", "문의유형", "서비스유형", "band"]
+TERM_COLUMNS = GROUP_COLUMNS + ["n", "term", "docs"]
+
+_TOKEN = re.compile(r"[0-9a-z가-힣]+")
+
+# 3글자 이상 단어 끝에서 떼는 조사 (긴 것부터)
+PARTICLES = ("에서", "으로", "에게", "까지", "부터", "은", "는", "이", "가", "을", "를", "에", "의", "와", "과", "도", "로")
+
+STOPWORDS = {
+    "너무", "정말", "진짜", "그리고", "그냥", "그래서", "하지만", "그런데", "조금", "많이",
+    "것", "수", "좀", "더", "잘", "및", "등", "저", "제", "이", "그", "또", "안", "못",
+    "있습니다", "없습니다", "합니다", "입니다", "했습니다", "같습니다", "있는", "없는", "하는",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """코멘트 → 단어 목록 (정규화, 조사 제거, 불용어/1글자 제외, 순서 유지)"""
+    out = []
+    for tok in _TOKEN.findall(normalize_text(text)):
+        if len(tok) >= 3:
+            p = next((p for p in PARTICLES if tok.endswith(p)), None)
+            if p and len(tok) - len(p) >= 2:
+                tok = tok[:-len(p)]
+        if len(tok) >= 2 and tok not in STOPWORDS:
+            out.append(tok)
+    return out
+
+
+def comment_terms(text: str) -> set:
+    """코멘트 하나의 (n, 단어/구) 집합 — 같은 코멘트 안 반복은 1번"""
+    words = tokenize(text)
+    terms = {(1, w) for w in words}
+    terms.update((2, f"{a} {b}") for a, b in zip(words, words[1:]))
+    return terms
+
+
+def score_bands(scores: pd.Series) -> pd.Series:
+    vals = pd.to_numeric(scores, errors="coerce")
+    band = pd.Series(NO_SCORE, index=scores.index, dtype=object)
+    for name, (lo, hi) in SCORE_BANDS.items():
+        band[(vals >= lo) & (vals <= hi)] = name
+    return band
+
+
+def _label(s: pd.Series) -> pd.Series:
+    return s.astype("string").fillna("").str.strip().replace("", UNCLASSIFIED).astype(object)
+
+
+def _empty_tables() -> Dict[str, pd.DataFrame]:
+    return {"terms": pd.DataFrame(columns=TERM_COLUMNS), "docs": pd.DataFrame(columns=GROUP_COLUMNS + ["docs"])}
+
+
+def build_keyword_tables(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """csat 월 파티션 → {"terms": 그룹 × (n, term)별 코멘트 수, "docs": 그룹별 코멘트 수}"""
+    if df is None or df.empty:
+        return _empty_tables()
+    enriched = build_enriched_csat(df)
+    dates = csat_period_dates(df)
+    day = dates.dt.normalize() if dates is not None else pd.Series(pd.NaT, index=df.index)
+    parts = []
+    for field, score_col in TEXT_FIELDS.items():
+        if field not in df.columns:
+            continue
+        raw = df[field]
+        text = raw.astype(str).str.strip()
+        keep = (raw.notna() & (text != "") & day.notna()).to_numpy()
+        if not keep.any():
+            continue
+        scores = df[score_col] if score_col in df.columns else pd.Series(np.nan, index=df.index)
+        parts.append(pd.DataFrame({
+            "day": day[keep].to_numpy(),
+            "field": field,
+            "문의유형": _label(enriched["문의유형"])[keep].to_numpy(),
+            "서비스유형": _label(enriched["서비스유형"])[keep].to_numpy(),
+            "band": score_bands(scores)[keep].to_numpy(),
+            "text": text[keep].to_numpy(dtype=object),
+        }))
+    if not parts:
+        return _empty_tables()
+    comments = pd.concat(parts, ignore_index=True)
+
+    # (코멘트, n, term) 긴 표 → 그룹별 문서 빈도
+    pairs = [(i, n, t) for i, text in enumerate(comments["text"]) for n, t in comment_terms(text)]
+    long = pd.DataFrame(pairs, columns=["_doc", "n", "term"])
+    long = comments.drop(columns=["text"]).iloc[long["_doc"].to_numpy()].reset_index(drop=True).join(
+        long.drop(columns=["_doc"]))
+    terms = long.groupby(GROUP_COLUMNS + ["n", "term"], sort=True).size().rename("docs").reset_index()
+    docs = comments.groupby(GROUP_COLUMNS, sort=True).size().rename("docs").reset_index()
+    terms["n"] = terms["n"].astype(np.int8)
+    terms["docs"] = terms["docs"].astype(np.int64)
+    docs["docs"] = docs["docs"].astype(np.int64)
+    return {"terms": terms[TERM_COLUMNS], "docs": docs}
+
+
+register_derived(CSAT_KEYWORDS_NAME, "csat", build_keyword_tables, depends=_enrich_depends)
+
+
+def load_keyword_tables(start: str, end: str) -> Dict[str, pd.DataFrame]:
+    """start~end(포함) 날짜의 빈도표 합본 (캐시가 없는 월은 빠진다)"""
+    months = [str(p) for p in pd.period_range(pd.to_datetime(start), pd.to_datetime(end), freq="M")]
+    loaded = [t for t in load_derived_months(CSAT_KEYWORDS_NAME, months).values() if not t["docs"].empty]
+    if not loaded:
+        return _empty_tables()
+    s = pd.to_datetime(start).normalize()
+    e = pd.to_datetime(end).normalize()
+    out = {}
+    for key in ("terms", "docs"):
+        frame = pd.concat([t[key] for t in loaded], ignore_index=True)
+        out[key] = frame[(frame["day"] >= s) & (frame["day"] <= e)]
+    return out
+
+
+def filter_tables(tables: Dict[str, pd.DataFrame], fields: List[str], bands: List[str],
+                  ngrams: List[int]) -> Dict[str, pd.DataFrame]:
+    terms, docs = tables["terms"], tables["docs"]
+    if fields:
+        terms, docs = terms[terms["field"].isin(fields)], docs[docs["field"].isin(fields)]
+    if bands:
+        terms, docs = terms[terms["band"].isin(bands)], docs[docs["band"].isin(bands)]
+    if ngrams:
+        terms = terms[terms["n"].isin(ngrams)]
+    return {"terms": terms, "docs": docs}
+
+
+def _share(count: np.ndarray, total: np.ndarray) -> np.ndarray:
+    return np.where(total > 0, count / np.where(total > 0, total, 1) * 100, np.nan)
+
+
+def top_terms(current: Dict[str, pd.DataFrame], top_k: int, min_count: int, by: Optional[str] = None,
+              previous: Optional[Dict[str, pd.DataFrame]] = None, sort: str = "count") -> Dict[str, List[dict]]:
+    """
+    그룹(by: 문의유형 | 서비스유형 | band, None이면 전체 "전체")별 상위 top_k 단어/구.
+    share: 그룹 코멘트 중 비율(%). previous가 있으면 같은 그룹의 이전 기간 값과 change(%p)를 붙인다.
+    sort: count(코멘트 수) | change(비율 증가폭)
+    """
+    def _grouped(tables):
+        terms, docs = tables["terms"], tables["docs"]
+        g_terms = terms[by] if by else pd.Series("전체", index=terms.index)
+        g_docs = docs[by] if by else pd.Series("전체", index=docs.index)
+        counts = terms.groupby([g_terms.rename("_g"), terms["n"], terms["term"]], sort=False)["docs"].sum()
+        totals = docs.groupby(g_docs.rename("_g"), sort=False)["docs"].sum()
+        return counts, totals
+
+    counts, totals = _grouped(current)
+    if counts.empty:
+        return {}
+    frame = counts.rename("count").reset_index()
+    frame["total"] = frame["_g"].map(totals).fillna(0).to_numpy(dtype=np.int64)
+    frame["share"] = _share(frame["count"].to_numpy(dtype="float64"), frame["total"].to_numpy())
+    if previous is not None:
+        p_counts, p_totals = _grouped(previous)
+        frame["prevCount"] = (p_counts.reindex(pd.MultiIndex.from_frame(frame[["_g", "n", "term"]]))
+                              .fillna(0).to_numpy(dtype=np.int64))
+        p_total = frame["_g"].map(p_totals).fillna(0).to_numpy(dtype=np.int64)
+        frame["prevShare"] = _share(frame["prevCount"].to_numpy(dtype="float64"), p_total)
+        frame["change"] = frame["share"] - np.nan_to_num(frame["prevShare"].to_numpy(), nan=0.0)
+    frame = frame[frame["count"] >= min_count]
+    key = "change" if sort == "change" and "change" in frame.columns else "count"
+    frame = frame.sort_values(["_g", key, "count", "term"], ascending=[True, False, False, True], kind="stable")
+    frame = frame[frame.groupby("_g", sort=False).cumcount() < top_k]
+
+    value_cols = ["term", "n", "count", "share"] + (["prevCount", "prevShare", "change"] if previous is not None else [])
+    out: Dict[str, List[dict]] = {}
+    group_sizes = frame.groupby("_g", sort=False).size()
+    for g in sorted(group_sizes.index, key=lambda k: (-int(totals.get(k, 0)), str(k))):
+        part = frame[frame["_g"] == g]
+        rows = []
+        for rec in part[value_cols].itertuples(index=False):
+            item = dict(zip(value_cols, rec))
+            item["n"] = int(item["n"])
+            item["count"] = int(item["count"])
+            for c in ("share", "prevShare", "change"):
+                if c in item:
+                    v = float(item[c])
+                    item[c] = round(v, 2) if np.isfinite(v) else None
+            if "prevCount" in item:
+                item["prevCount"] = int(item["prevCount"])
+            rows.append(item)
+        out[str(g)] = rows
+    return out
+
+
+def group_totals(tables: Dict[str, pd.DataFrame], by: Optional[str] = None) -> Dict[str, int]:
+    docs = tables["docs"]
+    if docs.empty:
+        return {}
+    if not by:
+        return {"전체": int(docs["docs"].sum())}
+    totals = docs.groupby(by, sort=False)["docs"].sum()
+    return {str(k): int(v) for k, v in sorted(totals.items(), key=lambda kv: (-int(kv[1]), str(kv[0])))}
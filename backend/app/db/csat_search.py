@@ -0,0 +1,197 @@
+# app/db/csat_search.py
+"""
+CSAT 코멘트 검색 인덱스 (문자 n-gram 역색인).
+
+csat 월 파티션이 저장될 때 comment_3/comment_6 코멘트를 문서로 만들고
+정규화한 텍스트의 문자 1-gram/2-gram → 문서 번호 목록(CSR: grams, offsets, postings)을 만들어 둔다.
+형태소 분석기(konlpy/JVM) 없이 한국어 부분 문자열 검색이 된다.
+
+검색: 질의를 공백으로 나눈 단어마다 n-gram 목록을 교집합해 후보를 좁히고,
+실제 부분 문자열 포함 여부로 확인한 뒤(모든 단어 포함 = AND) BM25로 점수를 매긴다.
+
+- 정규화: NFKC + 소문자 + 연속 공백 하나로 (공백이 낀 2-gram은 만들지 않음)
+- 문서의 row는 csat 파티션 안 행 위치 → 유형 보강 CSAT(csat_enriched)과 같은 순서라 유형을 그대로 붙인다
+- date: CSAT 기간 필터와 같은 기준 (csat_period_dates)
+"""
+
+import re
+import unicodedata
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import register_derived, load_derived_months, csat_period_dates
+from app.db.csat_enriched import CSAT_ENRICHED_NAME, ENRICH_COLUMNS
+
+CSAT_SEARCH_NAME = "csat_search"
+
+# 코멘트 컬럼 → 같이 내려줄 점수 컬럼 (/api/csat-analysis comments와 같음)
+TEXT_FIELDS = {"comment_3": "A-2", "comment_6": "A-5"}
+
+DOC_COLUMNS = ["row", "field", "text", "norm", "length", "date",
+               "firstAskedAt", "userId", "userChatId", "score"]
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", text).lower()).strip()
+
+
+def query_terms(q: str) -> List[str]:
+    """질의 → 중복 없는 단어 목록 (입력 순서 유지)"""
+    return list(dict.fromkeys(t for t in normalize_text(q or "").split(" ") if t))
+
+
+def text_grams(norm: str) -> set:
+    """1-gram + 공백 없는 2-gram"""
+    grams = {c for c in norm if c != " "}
+    grams.update(norm[i:i + 2] for i in range(len(norm) - 1) if " " not in norm[i:i + 2])
+    return grams
+
+
+def term_grams(term: str) -> List[str]:
+    """단어의 후보 조회용 n-gram (2글자 이상이면 2-gram, 1글자면 1-gram)"""
+    if len(term) == 1:
+        return [term]
+    return sorted({term[i:i + 2] for i in range(len(term) - 1)})
+
+
+def _empty_index() -> Dict[str, object]:
+    return {
+        "docs": pd.DataFrame({c: pd.Series(dtype=object) for c in DOC_COLUMNS}),
+        "grams": np.array([], dtype=object),
+        "offsets": np.zeros(1, dtype=np.int64),
+        "postings": np.array([], dtype=np.int32),
+    }
+
+
+def build_search_index(df: pd.DataFrame) -> Dict[str, object]:
+    """csat 월 파티션 → {"docs": 문서 표, "grams"/"offsets"/"postings": 역색인}"""
+    if df is None or df.empty:
+        return _empty_index()
+    dates = csat_period_dates(df)
+    parts = []
+    for field, score_col in TEXT_FIELDS.items():
+        if field not in df.columns:
+            continue
+        raw = df[field]
+        text = raw.astype(str).str.strip()
+        keep = (raw.notna() & (text != "")).to_numpy()
+        if not keep.any():
+            continue
+        rows = np.flatnonzero(keep)
+        part = pd.DataFrame({
+            "row": rows,
+            "field": field,
+            "text": text.to_numpy(dtype=object)[rows],
+            "date": (dates.to_numpy()[rows] if dates is not None else pd.NaT),
+        })
+        for c in ("firstAskedAt", "userId", "userChatId"):
+            part[c] = df[c].to_numpy()[rows] if c in df.columns else None
+        part["score"] = (pd.to_numeric(df[score_col], errors="coerce").to_numpy()[rows]
+                         if score_col in df.columns else np.nan)
+        parts.append(part)
+    if not parts:
+        return _empty_index()
+    docs = pd.concat(parts, ignore_index=True)
+    docs["norm"] = [normalize_text(t) for t in docs["text"]]
+    docs["length"] = docs["norm"].str.len().astype(np.int64)
+
+    # (gram, 문서) 쌍 → gram 순 정렬 후 CSR
+    pairs = [(g, i) for i, norm in enumerate(docs["norm"]) for g in text_grams(norm)]
+    gram_col = np.array([g for g, _ in pairs], dtype=object)
+    doc_col = np.array([i for _, i in pairs], dtype=np.int32)
+    grams, codes = np.unique(gram_col, return_inverse=True)
+    order = np.lexsort((doc_col, codes))
+    offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(grams)), out=offsets[1:])
+    return {"docs": docs[DOC_COLUMNS], "grams": grams, "offsets": offsets, "postings": doc_col[order]}
+
+
+register_derived(CSAT_SEARCH_NAME, "csat", build_search_index)
+
+
+def postings(index: Dict[str, object], gram: str) -> np.ndarray:
+    grams = index["grams"]
+    pos = int(np.searchsorted(grams, gram))
+    if pos >= len(grams) or grams[pos] != gram:
+        return np.array([], dtype=np.int32)
+    return index["postings"][index["offsets"][pos]:index["offsets"][pos + 1]]
+
+
+def candidate_docs(index: Dict[str, object], term: str) -> np.ndarray:
+    """term의 n-gram을 모두 가진 문서 번호 (부분 문자열 포함 여부는 아직 확인 전)"""
+    out = None
+    for gram in term_grams(term):
+        hits = postings(index, gram)
+        out = hits if out is None else np.intersect1d(out, hits, assume_unique=True)
+        if not len(out):
+            break
+    return out if out is not None else np.array([], dtype=np.int32)
+
+
+def load_corpus(months: List[str]) -> tuple:
+    """
+    월 인덱스들 → (문서 표, {월: 인덱스}, {월: 전역 번호 시작값}).
+    문서 표에는 month, gid(전역 번호)와 유형 보강 컬럼(고객유형 … 서비스유형_2차)이 붙는다
+    """
+    indexes = {m: ix for m, ix in load_derived_months(CSAT_SEARCH_NAME, months).items() if len(ix["docs"])}
+    enriched = load_derived_months(CSAT_ENRICHED_NAME, list(indexes))
+    frames, starts, base = [], {}, 0
+    for month, ix in indexes.items():
+        docs = ix["docs"].assign(month=month, gid=np.arange(base, base + len(ix["docs"])))
+        types = enriched.get(month)
+        for c in ENRICH_COLUMNS:
+            docs[c] = (types[c].to_numpy(dtype=object)[docs["row"].to_numpy()]
+                       if types is not None and c in types.columns else None)
+        starts[month] = base
+        base += len(docs)
+        frames.append(docs)
+    if not frames:
+        return pd.DataFrame(columns=DOC_COLUMNS + ["month", "gid"] + ENRICH_COLUMNS), {}, {}
+    return pd.concat(frames, ignore_index=True), indexes, starts
+
+
+def search(corpus: pd.DataFrame, indexes: Dict[str, object], starts: Dict[str, int],
+           terms: List[str]) -> pd.DataFrame:
+    """
+    corpus(기간/유형 필터가 적용된 문서)에서 모든 단어를 포함한 문서를 BM25 점수순으로.
+    반환: 일치 문서 + relevance 컬럼 (점수 내림차순 → 최신순)
+    """
+    if corpus.empty or not terms:
+        return corpus.iloc[0:0].assign(relevance=pd.Series(dtype="float64"))
+    gids = corpus["gid"].to_numpy()
+    n_docs = len(corpus)
+    avg_len = float(corpus["length"].mean()) or 1.0
+    length = corpus["length"].to_numpy(dtype="float64")
+    norm = corpus["norm"]
+
+    matched = np.ones(n_docs, dtype=bool)
+    relevance = np.zeros(n_docs, dtype="float64")
+    for term in terms:
+        cand = np.concatenate([starts[m] + candidate_docs(ix, term) for m, ix in indexes.items()] or
+                              [np.array([], dtype=np.int64)])
+        in_cand = np.isin(gids, cand)
+        # n-gram 후보 중 실제로 부분 문자열로 들어 있는 문서만
+        tf = np.zeros(n_docs, dtype="float64")
+        if in_cand.any():
+            tf[in_cand] = norm[in_cand].str.count(re.escape(term)).to_numpy(dtype="float64")
+        df_term = int((tf > 0).sum())
+        matched &= tf > 0
+        if not df_term:
+            break
+        idf = np.log(1 + (n_docs - df_term + 0.5) / (df_term + 0.5))
+        relevance += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+
+    out = corpus[matched].assign(relevance=relevance[matched])
+    when = pd.to_datetime(out["date"], errors="coerce")
+    key = when.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    newest = np.where(when.isna().to_numpy(), np.iinfo(np.int64).max, -key)
+    order = np.lexsort((newest, -out["relevance"].to_numpy()))
+    return out.iloc[order]
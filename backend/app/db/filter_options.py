@@ -0,0 +1,89 @@
+# app/db/filter_options.py
+"""
+필터 옵션 / subtype_maps 파티션별 사전 계산.
+
+userchats 월 파티션이 저장될 때 유형별 1차·2차 고유값과 1차 → 2차 매핑을 집합으로 만들어 두고,
+/api/filter-options는 요청한 월들의 집합을 합쳐 정렬만 한다 (카테고리 수에 비례하는 비용).
+
+- 값 정규화는 기존 옵션 생성과 같다: str → strip, "None"/"nan"은 "" (대소문자 유지)
+- 1차/2차 옵션은 빈 값 제외, subtype_maps는 1차 값(빈 값 포함)마다 비어 있지 않은 2차 값
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from app.cs_utils import register_derived, load_derived_months
+
+FILTER_OPTIONS_NAME = "filter_options"
+
+# 실제 사용할 컬럼 매핑 (cs_utils.process_userchat_data에서 생성됨)
+OPTION_COLUMNS = {
+    "고객유형": ("고객유형_1차", "고객유형_2차"),
+    "문의유형": ("문의유형_1차", "문의유형_2차"),
+    "서비스유형": ("서비스유형_1차", "서비스유형_2차"),
+}
+
+# subtype_maps 키 → 유형
+SUBTYPE_MAP_KEYS = {"inquiry": "문의유형", "service": "서비스유형", "customer": "고객유형"}
+
+
+def _norm_option_series(s: pd.Series) -> pd.Series:
+    return s.astype(str).str.strip().replace({"None": "", "nan": ""})
+
+
+def build_partition_options(df: pd.DataFrame) -> dict:
+    """월 파티션 → {"values": {컬럼: 값 집합}, "pairs": {유형: {1차: 2차 집합}}}"""
+    values: Dict[str, set] = {}
+    pairs: Dict[str, Dict[str, set]] = {}
+    for kind, (c1, c2) in OPTION_COLUMNS.items():
+        if df is None or df.empty:
+            values[c1], values[c2], pairs[kind] = set(), set(), {}
+            continue
+        s1 = _norm_option_series(df[c1]) if c1 in df.columns else pd.Series("", index=df.index)
+        s2 = _norm_option_series(df[c2]) if c2 in df.columns else pd.Series("", index=df.index)
+        # 결측(NaN)은 옵션/매핑 모두에서 제외 (기존 dropna 동작)
+        values[c1] = {v for v in s1.dropna().unique() if v}
+        values[c2] = {v for v in s2.dropna().unique() if v}
+        combos = pd.DataFrame({"p": s1, "c": s2}).dropna().drop_duplicates()
+        kind_pairs: Dict[str, set] = {p: set() for p in combos["p"].unique()}
+        for p, c in combos[combos["c"] != ""].itertuples(index=False):
+            kind_pairs[p].add(c)
+        pairs[kind] = kind_pairs
+    return {"values": values, "pairs": pairs}
+
+
+register_derived(FILTER_OPTIONS_NAME, "userchats", build_partition_options)
+
+
+def merge_options(parts: Iterable[dict]) -> dict:
+    """파티션별 옵션 집합 → /api/filter-options 응답 형태"""
+    values: Dict[str, set] = {}
+    pairs: Dict[str, Dict[str, set]] = {kind: {} for kind in OPTION_COLUMNS}
+    for part in parts:
+        for col, vals in part["values"].items():
+            values.setdefault(col, set()).update(vals)
+        for kind, kind_pairs in part["pairs"].items():
+            merged = pairs.setdefault(kind, {})
+            for p, cs in kind_pairs.items():
+                merged.setdefault(p, set()).update(cs)
+
+    def _opts(col: str) -> List[str]:
+        return ["전체"] + sorted(values.get(col, set()))
+
+    result = {kind: _opts(c1) for kind, (c1, _) in OPTION_COLUMNS.items()}
+    # 2차 풀리스트도 유지
+    result.update({f"{kind}_2차": _opts(c2) for kind, (_, c2) in OPTION_COLUMNS.items()})
+    result["subtype_maps"] = {
+        key: {p: ["전체"] + sorted(cs) for p, cs in sorted(pairs[kind].items())}
+        for key, kind in SUBTYPE_MAP_KEYS.items()
+    }
+    return result
+
+
+def load_filter_options(months: List[str]) -> Optional[dict]:
+    """months 파티션의 옵션을 합쳐 반환 (캐시된 월이 하나도 없으면 None)"""
+    parts = load_derived_months(FILTER_OPTIONS_NAME, months)
+    if not parts:
+        return None
+    return merge_options(parts[m] for m in months if m in parts)
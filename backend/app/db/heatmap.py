@@ -0,0 +1,107 @@
+# app/db/heatmap.py
+"""
+요일 × 시간대 문의량 큐브.
+
+userchats 월 파티션이 저장될 때 행마다 요일(0=일 ~ 6=토, JS getDay와 같음)과 시(0~23)를
+정수로 계산해 두고, 일 × 유형 차원 × 요일 × 시 조합별 건수로 합산한다.
+/api/heatmap은 이 큐브를 더해 7×24 행렬만 내려준다.
+
+- 요일/시 기준 시각: createdAt(없으면 firstAskedAt) — DayOfWeekTimeDistributionChart.jsx와 같음
+- 기간(day) 기준은 롤업 큐브와 같다 (firstAskedAt, 없으면 createdAt) → 다른 집계와 같은 행이 잡힌다
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import register_derived
+from app.db.rollup import ROLLUP_DIMENSIONS, rollup_keys, load_day_frames
+
+HEATMAP_NAME = "heatmap"
+
+WEEKDAY_NAMES = ["일", "월", "화", "수", "목", "금", "토"]
+HOURS = list(range(24))
+
+HEATMAP_COLUMNS = ["day", *ROLLUP_DIMENSIONS, "weekday", "hour", "count"]
+
+# split 이름 → 큐브 컬럼
+SPLITS = {
+    "direction": "direction",
+    "medium": "mediumType",
+    "문의유형": "문의유형_1차",
+}
+
+
+def build_heatmap(df: pd.DataFrame) -> pd.DataFrame:
+    """월 파티션 → (day, 차원..., weekday, hour)별 건수"""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=HEATMAP_COLUMNS)
+    when = df["createdAt"] if "createdAt" in df.columns else pd.Series(pd.NaT, index=df.index)
+    if "firstAskedAt" in df.columns:
+        when = when.fillna(df["firstAskedAt"])
+    work = pd.DataFrame(rollup_keys(df), index=df.index)
+    work["weekday"] = ((when.dt.dayofweek + 1) % 7).astype("Int8")
+    work["hour"] = when.dt.hour.astype("Int8")
+    work = work[work["day"].notna() & work["weekday"].notna()]
+    work["weekday"] = work["weekday"].astype(np.int8)
+    work["hour"] = work["hour"].astype(np.int8)
+    cube = (work.groupby(["day", *ROLLUP_DIMENSIONS, "weekday", "hour"], sort=True, observed=True)
+                .size().rename("count").reset_index())
+    for dim in ROLLUP_DIMENSIONS:
+        cube[dim] = cube[dim].astype(object)
+    cube["count"] = cube["count"].astype(np.int64)
+    return cube[HEATMAP_COLUMNS]
+
+
+register_derived(HEATMAP_NAME, "userchats", build_heatmap)
+
+
+def load_heatmap(start: str, end: str) -> pd.DataFrame:
+    """start~end(포함) 날짜의 큐브 행. 캐시가 없는 월은 빠진다"""
+    return load_day_frames(HEATMAP_NAME, start, end, HEATMAP_COLUMNS)
+
+
+def split_labels(cube: pd.DataFrame, split: str) -> pd.Series:
+    """split 기준 그룹 라벨 (medium은 phone / chat, 빈 값은 "미분류")"""
+    col = cube[SPLITS[split]].astype(str).str.strip()
+    if split == "medium":
+        return col.where(col == "phone", "chat")
+    return col.replace("", "미분류")
+
+
+def count_matrix(cube: pd.DataFrame) -> np.ndarray:
+    """큐브 행 → 7×24 건수 행렬 (행: 요일 0=일, 열: 시)"""
+    matrix = np.zeros((7, 24), dtype=np.int64)
+    if not cube.empty:
+        np.add.at(matrix, (cube["weekday"].to_numpy(dtype=np.int64), cube["hour"].to_numpy(dtype=np.int64)),
+                  cube["count"].to_numpy(dtype=np.int64))
+    return matrix
+
+
+def _matrix_payload(matrix: np.ndarray) -> dict:
+    return {
+        "total": int(matrix.sum()),
+        "matrix": matrix.tolist(),
+        "byWeekday": matrix.sum(axis=1).tolist(),
+        "byHour": matrix.sum(axis=0).tolist(),
+    }
+
+
+def heatmap_payload(cube: pd.DataFrame, split: Optional[str] = None) -> Dict[str, object]:
+    out: Dict[str, object] = {
+        "weekdays": WEEKDAY_NAMES,
+        "hours": HOURS,
+        "basis": "createdAt",
+        "split": split,
+        **_matrix_payload(count_matrix(cube)),
+    }
+    if split:
+        groups: Dict[str, dict] = {}
+        if not cube.empty:
+            labels = split_labels(cube, split)
+            for label, part in cube.groupby(labels, sort=True):
+                groups[str(label)] = _matrix_payload(count_matrix(part))
+        # 건수 많은 순
+        out["splits"] = dict(sorted(groups.items(), key=lambda kv: (-kv[1]["total"], kv[0])))
+    return out
@@ -0,0 +1,143 @@
+# app/db/managers.py
+"""
+담당자(매니저) 데이터 모델.
+
+- manager_bridge: userchats 월 파티션 저장 시 managerIds를 펼친 (userChatId, managerId) 브리지 테이블.
+  행 단위 assigneeMatch(= managerIds 중 하나가 assigneeId와 같음)를 미리 계산해 둔다.
+  값 비교는 기존 규칙과 같다: str(id).strip()
+- 담당자 디렉터리: managerId → 이름. 캐시 디렉토리의 manager_directory.json에 보관
+  (캐시 전체 삭제 대상 아님). 파일이 없으면 DEFAULT_MANAGERS 사용, 원격 갱신은 refresh_manager_directory.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import register_derived, load_derived_months, server_cache, channel_api
+from app.db.json_db import load_json_db, save_json_db, file_lock
+from app.executor import run_blocking
+
+MANAGER_BRIDGE_NAME = "manager_bridge"
+
+BRIDGE_COLUMNS = ["userChatId", "managerId", "assigneeMatch", "isAssignee"]
+
+# 디렉터리 파일이 없을 때 쓰는 기본 담당자 (기존 하드코딩 목록)
+DEFAULT_MANAGERS = {
+    "557191": "안예은",
+    "547547": "조용준",
+    "531024": "우지훈",
+}
+
+
+# ---- 브리지 테이블 ----
+def _is_missing(v) -> bool:
+    try:
+        return v is None or bool(pd.isna(v))
+    except (ValueError, TypeError):
+        return False
+
+
+def _id_list(v) -> List[str]:
+    """managerIds 셀 → ["id", ...] (리스트/배열/단일값/결측 모두 허용)"""
+    if isinstance(v, str):
+        return [v.strip()]
+    if hasattr(v, "__iter__") and not isinstance(v, dict):
+        return [str(x).strip() for x in v if not _is_missing(x)]
+    if _is_missing(v):
+        return []
+    return [str(v).strip()]
+
+
+def _assignee_id(v) -> Optional[str]:
+    if not isinstance(v, str) and hasattr(v, "__iter__"):
+        v = next(iter(v), None)
+    if _is_missing(v):
+        return None
+    return str(v).strip()
+
+
+def build_manager_bridge(df: pd.DataFrame) -> pd.DataFrame:
+    """월 파티션 → (userChatId, managerId, assigneeMatch, isAssignee) — managerIds 순서대로 펼침"""
+    if df is None or df.empty or "userChatId" not in df.columns or "managerIds" not in df.columns:
+        return pd.DataFrame({c: pd.Series(dtype=object if c in ("userChatId", "managerId") else bool)
+                             for c in BRIDGE_COLUMNS})
+    ids = [_id_list(v) for v in df["managerIds"].tolist()]
+    lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+    rows = np.repeat(np.arange(len(df)), lengths)
+    manager_ids = np.array([m for x in ids for m in x], dtype=object)
+    assignees = (df["assigneeId"].map(_assignee_id).to_numpy(dtype=object)
+                 if "assigneeId" in df.columns else np.full(len(df), None, dtype=object))
+    chat_ids = df["userChatId"].astype(str).to_numpy(dtype=object)
+
+    is_assignee = manager_ids == assignees[rows] if len(rows) else np.zeros(0, dtype=bool)
+    # 행 단위: managerIds 중 하나라도 assigneeId와 같으면 그 행의 모든 브리지 행이 True
+    row_match = np.zeros(len(df), dtype=bool)
+    np.logical_or.at(row_match, rows, is_assignee)
+    return pd.DataFrame({
+        "userChatId": chat_ids[rows],
+        "managerId": manager_ids,
+        "assigneeMatch": row_match[rows],
+        "isAssignee": is_assignee.astype(bool),
+    })
+
+
+register_derived(MANAGER_BRIDGE_NAME, "userchats", build_manager_bridge)
+
+
+def load_manager_bridge(months: List[str]) -> pd.DataFrame:
+    """months 파티션의 브리지 테이블을 합쳐 반환"""
+    parts = [b for b in load_derived_months(MANAGER_BRIDGE_NAME, months).values() if not b.empty]
+    if not parts:
+        return build_manager_bridge(None)
+    return pd.concat(parts, ignore_index=True)
+
+
+# ---- 담당자 디렉터리 ----
+_directory_memo: Dict[str, object] = {"stamp": None, "managers": None}
+
+
+def _directory_path() -> str:
+    return os.path.join(server_cache.cache_dir, "manager_directory.json")
+
+
+def load_manager_directory() -> Dict[str, str]:
+    """managerId → 이름 (파일 순서 유지). 파일 stat이 그대로면 메모리 사본 사용"""
+    path = _directory_path()
+    try:
+        st = os.stat(path)
+    except OSError:
+        return dict(DEFAULT_MANAGERS)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if _directory_memo["stamp"] != stamp:
+        rows = load_json_db(path)
+        managers = {str(r["id"]).strip(): str(r.get("name") or r["id"])
+                    for r in rows if isinstance(r, dict) and r.get("id") is not None}
+        _directory_memo.update(stamp=stamp, managers=managers)
+    return dict(_directory_memo["managers"] or DEFAULT_MANAGERS)
+
+
+def manager_directory_version() -> str:
+    """디렉터리 내용 기준 버전 (HTTP ETag용)"""
+    return repr(sorted(load_manager_directory().items()))
+
+
+def save_manager_directory(managers: Dict[str, str]) -> None:
+    path = _directory_path()
+    with file_lock(path):
+        save_json_db([{"id": k, "name": v} for k, v in managers.items()], path)
+
+
+async def refresh_manager_directory() -> Dict[str, str]:
+    """채널 API의 매니저 목록으로 디렉터리 교체 (이름 없는 매니저는 ID를 이름으로)"""
+    fetched = await channel_api.get_managers()
+    managers = {}
+    for m in fetched:
+        mid = m.get("id")
+        if mid is None:
+            continue
+        managers[str(mid).strip()] = m.get("name") or str(mid)
+    if managers:
+        await run_blocking(save_manager_directory, managers)
+    return await run_blocking(load_manager_directory)
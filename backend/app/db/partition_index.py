@@ -0,0 +1,84 @@
+# app/db/partition_index.py
+"""
+userChatId → (파티션 키, 행 위치) 인덱스.
+
+월별 캐시 파티션(userchats_YYYY-MM, csat_YYYY-MM)에 어떤 userChatId가
+어느 파티션의 몇 번째 행으로 저장되어 있는지 기록한다.
+업서트 시 기존 행을 찾아 교체하거나, 버킷 월이 바뀐 행을 다른 파티션으로
+옮길 때 관련 없는 월을 읽지 않도록 하기 위해 사용한다.
+"""
+
+import json
+import os
+import tempfile
+import shutil
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.db.json_db import file_lock
+
+
+class PartitionIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Optional[Dict[str, List]] = None  # id -> [partition, row]
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> Dict[str, List]:
+        if self._entries is not None:
+            return self._entries
+        entries = {}
+        if os.path.exists(self.path):
+            with file_lock(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    try:
+                        data = json.load(f)
+                    except json.JSONDecodeError:
+                        data = {}
+            entries = data.get("entries", {}) if isinstance(data, dict) else {}
+        self._entries = entries
+        return entries
+
+    def save(self) -> None:
+        entries = self.load()
+        tmpdir = os.path.dirname(self.path) or "."
+        os.makedirs(tmpdir, exist_ok=True)
+        with file_lock(self.path):
+            tmpfd, tmppath = tempfile.mkstemp(dir=tmpdir, suffix=".tmp")
+            try:
+                with os.fdopen(tmpfd, "w", encoding="utf-8") as f:
+                    json.dump({"entries": entries}, f, ensure_ascii=False)
+                shutil.move(tmppath, self.path)  # atomic replace
+            finally:
+                if os.path.exists(tmppath):
+                    os.remove(tmppath)
+
+    def reset(self) -> None:
+        """메모리 상태를 비운다 (다음 load에서 파일을 다시 읽음)."""
+        self._entries = None
+
+    def lookup(self, ids: Iterable[str]) -> Dict[str, Tuple[str, int]]:
+        entries = self.load()
+        out = {}
+        for i in ids:
+            hit = entries.get(str(i))
+            if hit:
+                out[str(i)] = (hit[0], int(hit[1]))
+        return out
+
+    def partitions(self) -> set:
+        return {v[0] for v in self.load().values()}
+
+    def replace_partition(self, partition: str, ids: Iterable[str]) -> None:
+        """partition을 가리키던 항목을 모두 지우고, ids 순서대로 행 위치를 다시 기록."""
+        entries = self.load()
+        for k in [k for k, v in entries.items() if v[0] == partition]:
+            del entries[k]
+        for row, i in enumerate(ids):
+            if i is None:
+                continue
+            entries[str(i)] = [partition, row]
+
+    def drop_partition(self, partition: str) -> None:
+        self.replace_partition(partition, [])
@@ -0,0 +1,102 @@
+# app/db/quantile_sketch.py
+"""
+소요시간 분위수 스케치 (DDSketch 방식).
+
+userchats 월 파티션이 저장될 때 일 × 유형 차원 조합 × 지표별로
+로그 구간(상대 오차 SKETCH_RELATIVE_ACCURACY) 건수를 미리 세어 둔다.
+구간 경계가 모든 스케치에서 같으므로 여러 날/차원의 스케치는 같은 구간끼리 더하기만 하면 병합된다.
+/api/percentiles는 원본 행 없이 병합한 구간 건수에서 P50/P90/P95/P99 등을 계산한다.
+
+- 구간 i = ceil(log_γ(x)), γ = (1 + α) / (1 - α). 구간 대표값 2γ^i / (γ + 1)은
+  구간 안의 어떤 값과도 상대 오차 α 이내
+- 값은 분 단위, duration_minutes 규칙대로 0 이하/빈 값 제외
+- day/차원 키는 롤업 큐브와 같다 (rollup.rollup_keys) → 같은 유형 필터를 그대로 적용
+"""
+
+import math
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import DURATION_COLUMNS, duration_minutes, register_derived
+from app.db.rollup import ROLLUP_DIMENSIONS, rollup_keys, load_day_frames
+
+SKETCH_NAME = "quantile_sketch"
+
+# 상대 오차 α. 바꾸면 기존 스케치와 구간이 달라지므로 캐시를 다시 만들어야 한다
+SKETCH_RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+SKETCH_COLUMNS = ["day", *ROLLUP_DIMENSIONS, "metric", "bucket", "count"]
+
+
+def bucket_index(values: np.ndarray) -> np.ndarray:
+    return np.ceil(np.log(values) / _LOG_GAMMA).astype(np.int32)
+
+
+def bucket_value(index: np.ndarray) -> np.ndarray:
+    return 2.0 * np.power(_GAMMA, index.astype("float64")) / (_GAMMA + 1.0)
+
+
+def build_sketches(df: pd.DataFrame) -> pd.DataFrame:
+    """월 파티션 → (day, 차원..., metric, bucket)별 건수 (희소 표)"""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=SKETCH_COLUMNS)
+    keys = pd.DataFrame(rollup_keys(df), index=df.index)
+    parts = []
+    for metric in DURATION_COLUMNS:
+        if metric not in df.columns:
+            continue
+        vals = duration_minutes(df[metric]).to_numpy(dtype="float64")
+        valid = np.isfinite(vals) & (vals > 0) & keys["day"].notna().to_numpy()
+        if not valid.any():
+            continue
+        work = keys[valid].assign(bucket=bucket_index(vals[valid]))
+        counts = work.groupby(["day", *ROLLUP_DIMENSIONS, "bucket"], sort=True, observed=True).size()
+        part = counts.rename("count").reset_index()
+        part.insert(len(ROLLUP_DIMENSIONS) + 1, "metric", metric)
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=SKETCH_COLUMNS)
+    out = pd.concat(parts, ignore_index=True)
+    for dim in ROLLUP_DIMENSIONS:
+        out[dim] = out[dim].astype(object)
+    out["count"] = out["count"].astype(np.int64)
+    return out[SKETCH_COLUMNS]
+
+
+register_derived(SKETCH_NAME, "userchats", build_sketches)
+
+
+def load_sketches(start: str, end: str) -> pd.DataFrame:
+    """start~end(포함) 날짜의 스케치 행. 캐시가 없는 월은 빠진다"""
+    return load_day_frames(SKETCH_NAME, start, end, SKETCH_COLUMNS)
+
+
+def merge_quantiles(sketches: pd.DataFrame, metrics: List[str], quantiles: List[float]) -> Dict[str, dict]:
+    """
+    스케치 행을 지표별로 병합해 분위수 계산.
+    quantiles: 0~1 값. 반환 {metric: {"count": n, "values": [q별 분(없으면 None)]}}
+    """
+    out = {m: {"count": 0, "values": [None] * len(quantiles)} for m in metrics}
+    if sketches.empty:
+        return out
+    merged = (sketches[sketches["metric"].isin(metrics)]
+              .groupby(["metric", "bucket"], sort=True)["count"].sum())
+    for metric in metrics:
+        if metric not in merged.index.get_level_values(0):
+            continue
+        part = merged.loc[metric]
+        counts = part.to_numpy(dtype=np.int64)
+        total = int(counts.sum())
+        if total <= 0:
+            continue
+        cum = np.cumsum(counts)
+        # 순위 q·(n-1)인 값이 들어 있는 구간 (DDSketch 하한 순위 규칙)
+        ranks = np.asarray(quantiles, dtype="float64") * (total - 1)
+        pos = np.searchsorted(cum, ranks, side="right")
+        values = bucket_value(part.index.to_numpy()[np.minimum(pos, len(counts) - 1)])
+        out[metric] = {"count": total, "values": values.tolist()}
+    return out
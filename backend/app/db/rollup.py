@@ -0,0 +1,129 @@
+# app/db/rollup.py
+"""
+일별 롤업 큐브.
+
+userchats 월 파티션이 저장될 때 일 × 유형 차원 조합별로
+건수, 소요시간(분)의 표본수/합/제곱합, 응답시간 히스토그램을 미리 합산해 둔다.
+집계 엔드포인트는 원본 행 대신 이 큐브를 더해서 답한다 (평균/표준편차는 합과 제곱합으로 복원).
+
+- day: firstAskedAt(없으면 createdAt)의 날짜 — get_cached_data 기간 필터와 같은 기준
+- 차원 값이 비어 있으면 "" 로 저장 (유형 필터의 정규화 규칙과 동일하게 취급됨)
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import (
+    DURATION_COLUMNS, duration_minutes, register_derived, load_derived_months,
+)
+
+ROLLUP_NAME = "rollup"
+
+ROLLUP_DIMENSIONS = [
+    "고객유형_1차", "고객유형_2차",
+    "문의유형_1차", "문의유형_2차",
+    "서비스유형_1차", "서비스유형_2차",
+    "mediumType", "direction",
+]
+
+# 히스토그램 구간 경계 (분). 마지막 구간은 24시간 이상
+HIST_EDGES_MINUTES = [0, 1, 3, 5, 10, 30, 60, 120, 240, 480, 1440]
+
+
+def hist_columns(metric: str) -> List[str]:
+    return [f"{metric}_h{i}" for i in range(len(HIST_EDGES_MINUTES))]
+
+
+def hist_labels() -> List[str]:
+    edges = HIST_EDGES_MINUTES
+    return [f"{edges[i]}-{edges[i + 1]}" for i in range(len(edges) - 1)] + [f"{edges[-1]}+"]
+
+
+def rollup_keys(df: pd.DataFrame) -> dict:
+    """행별 롤업 키 {"day": 날짜, 차원: 정리한 값} (롤업 큐브/분위수 스케치 공용)"""
+    when = df["firstAskedAt"] if "firstAskedAt" in df.columns else pd.Series(pd.NaT, index=df.index)
+    if "createdAt" in df.columns:
+        when = when.fillna(df["createdAt"])
+
+    keys = {"day": when.dt.normalize()}
+    for dim in ROLLUP_DIMENSIONS:
+        col = df[dim] if dim in df.columns else pd.Series(None, index=df.index, dtype=object)
+        keys[dim] = col.astype("string").fillna("").str.strip()
+    return keys
+
+
+def build_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """월 파티션 → 일 × 차원 조합별 합계 프레임"""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["day", *ROLLUP_DIMENSIONS, "count"])
+
+    work = rollup_keys(df)
+    work["count"] = np.ones(len(df), dtype=np.int64)
+
+    edges = np.asarray(HIST_EDGES_MINUTES, dtype="float64")
+    for metric in DURATION_COLUMNS:
+        mins = duration_minutes(df[metric]) if metric in df.columns else pd.Series(np.nan, index=df.index)
+        vals = mins.to_numpy(dtype="float64")
+        valid = ~np.isnan(vals)
+        work[f"{metric}_n"] = valid.astype(np.int64)
+        work[f"{metric}_sum"] = np.where(valid, vals, 0.0)
+        work[f"{metric}_sumsq"] = np.where(valid, vals * vals, 0.0)
+        bins = np.searchsorted(edges, np.where(valid, vals, 0.0), side="right") - 1
+        for i, col in enumerate(hist_columns(metric)):
+            work[col] = (valid & (bins == i)).astype(np.int64)
+
+    frame = pd.DataFrame(work, index=df.index)
+    frame = frame[frame["day"].notna()]
+    cube = frame.groupby(["day", *ROLLUP_DIMENSIONS], sort=True, observed=True).sum().reset_index()
+    for dim in ROLLUP_DIMENSIONS:
+        cube[dim] = cube[dim].astype(object)
+    return cube
+
+
+register_derived(ROLLUP_NAME, "userchats", build_rollup)
+
+
+def _months(start: str, end: str) -> List[str]:
+    return [str(p) for p in pd.period_range(pd.to_datetime(start), pd.to_datetime(end), freq="M")]
+
+
+def load_day_frames(name: str, start: str, end: str, empty_columns: List[str]) -> pd.DataFrame:
+    """day 컬럼이 있는 월별 아티팩트 name을 합쳐 start~end(포함) 날짜만 남긴다"""
+    parts = [c for c in load_derived_months(name, _months(start, end)).values() if not c.empty]
+    if not parts:
+        return pd.DataFrame(columns=empty_columns)
+    frame = pd.concat(parts, ignore_index=True)
+    s = pd.to_datetime(start).normalize()
+    e = pd.to_datetime(end).normalize()
+    return frame[(frame["day"] >= s) & (frame["day"] <= e)]
+
+
+def load_rollup(start: str, end: str) -> pd.DataFrame:
+    """start~end(포함) 날짜의 큐브 행. 캐시가 없는 월은 빠진다 (cache 모드와 동일)"""
+    return load_day_frames(ROLLUP_NAME, start, end, ["day", *ROLLUP_DIMENSIONS, "count"])
+
+
+def aggregate(cube: pd.DataFrame, keys, metrics: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    keys(컬럼명 또는 Series 목록)로 큐브를 합산하고, 지표별 mean/std를 합·제곱합에서 복원.
+    반환 컬럼: count, {metric}_n, {metric}_sum, {metric}_sumsq, {metric}_mean, {metric}_std, 히스토그램
+    """
+    metrics = list(metrics or DURATION_COLUMNS)
+    value_cols = ["count"]
+    for m in metrics:
+        value_cols += [f"{m}_n", f"{m}_sum", f"{m}_sumsq", *hist_columns(m)]
+    out = cube.groupby(keys, sort=True)[value_cols].sum()
+    for m in metrics:
+        n = out[f"{m}_n"].astype("float64")
+        mean = out[f"{m}_sum"] / n.where(n > 0)
+        var = (out[f"{m}_sumsq"] / n.where(n > 0) - mean * mean).clip(lower=0)
+        out[f"{m}_mean"] = mean
+        out[f"{m}_std"] = np.sqrt(var)
+    return out
+
+
+def histogram(agg_row: pd.Series, metric: str) -> Dict[str, int]:
+    """aggregate 결과 한 행에서 지표의 구간별 건수"""
+    return {label: int(agg_row[col]) for label, col in zip(hist_labels(), hist_columns(metric))}
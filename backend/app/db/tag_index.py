@@ -0,0 +1,95 @@
+# app/db/tag_index.py
+"""
+태그 차원 역색인.
+
+userchats 월 파티션이 저장될 때 유형 차원(고객/문의/서비스유형 1차·2차, mediumType, direction)별로
+정규화한 값 → 행 위치(정렬된 int32 배열)를 만들어 둔다.
+유형 필터는 매 요청마다 문자열 컬럼을 정규화/비교하는 대신
+값 목록의 행 위치를 OR로 모으고, 필터끼리는 AND로 묶은 불리언 마스크로 처리한다.
+
+- 정규화 규칙은 기존 유형 필터와 같다: str → strip → lower, "none"/"nan"은 ""
+- 인덱스 행 수가 로드한 파티션과 다르면(저장이 끼어든 경우) 그 파티션만 문자열 비교로 처리
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import register_derived, load_derived
+
+TAG_INDEX_NAME = "tag_index"
+
+TAG_DIMENSIONS = [
+    "고객유형_1차", "고객유형_2차",
+    "문의유형_1차", "문의유형_2차",
+    "서비스유형_1차", "서비스유형_2차",
+    "mediumType", "direction",
+]
+
+
+def normalize_tag_series(s: pd.Series) -> pd.Series:
+    """유형 필터 비교용 정규화 (인덱스 키와 요청 값 비교 기준)"""
+    return s.astype(str).str.strip().str.lower().replace({"none": "", "nan": ""})
+
+
+def build_tag_index(df: pd.DataFrame) -> dict:
+    """월 파티션 → {"rows": 행 수, "dims": {차원: {정규화 값: 행 위치 배열}}}"""
+    n = 0 if df is None else len(df)
+    dims: Dict[str, Dict[str, np.ndarray]] = {}
+    for dim in TAG_DIMENSIONS:
+        if n == 0:
+            dims[dim] = {}
+            continue
+        if dim in df.columns:
+            values = normalize_tag_series(df[dim]).to_numpy(dtype=object)
+        else:
+            values = np.full(n, "", dtype=object)
+        codes, uniques = pd.factorize(values, sort=False)
+        order = np.argsort(codes, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        dims[dim] = {str(v): order[bounds[i]:bounds[i + 1]] for i, v in enumerate(uniques)}
+    return {"rows": n, "dims": dims}
+
+
+register_derived(TAG_INDEX_NAME, "userchats", build_tag_index)
+
+
+def index_mask(index: dict, clauses: List[Tuple[str, Iterable[str]]]) -> np.ndarray:
+    """clauses = [(차원, 정규화 값들)] → 차원 안에서는 OR, 차원끼리는 AND"""
+    n = index["rows"]
+    mask = np.ones(n, dtype=bool)
+    for dim, values in clauses:
+        postings = index["dims"].get(dim, {})
+        hit = np.zeros(n, dtype=bool)
+        for v in values:
+            rows = postings.get(v)
+            if rows is not None:
+                hit[rows] = True
+        mask &= hit
+    return mask
+
+
+def string_mask(df: pd.DataFrame, clauses: List[Tuple[str, Iterable[str]]]) -> np.ndarray:
+    """인덱스 없이 같은 조건을 문자열 비교로 계산 (대체 경로)"""
+    mask = np.ones(len(df), dtype=bool)
+    for dim, values in clauses:
+        if dim in df.columns:
+            mask &= normalize_tag_series(df[dim]).isin(set(values)).to_numpy()
+        else:
+            mask &= "" in set(values)
+    return mask
+
+
+def filter_partition(month: str, df: Optional[pd.DataFrame],
+                     clauses: List[Tuple[str, Iterable[str]]]) -> Optional[pd.DataFrame]:
+    """month 파티션 df에 태그 조건 적용 (조건이 없으면 그대로)"""
+    if df is None or df.empty or not clauses:
+        return df
+    index = load_derived(TAG_INDEX_NAME, month)
+    if index is not None and index["rows"] == len(df):
+        mask = index_mask(index, clauses)
+    else:
+        print(f"[TAG_INDEX] {month} 인덱스 불일치 → 문자열 비교")
+        mask = string_mask(df, clauses)
+    return df[mask]
@@ -0,0 +1,109 @@
+# app/executor.py
+"""
+블로킹 작업 실행 모델.
+
+- pandas 연산, pickle/JSON 파일 I/O, fcntl 락처럼 이벤트 루프를 멈추는 작업은
+  전용 스레드 풀(BLOCKING_POOL_SIZE)에서 실행한다. (run_blocking)
+- 원격 API 호출이 없는 순수 동기 엔드포인트는 `def`로 선언해 FastAPI 스레드 풀에서
+  실행되게 하고, 그 풀의 크기도 startup 시 BLOCKING_POOL_SIZE로 맞춘다.
+- 프로세스 풀은 쓰지 않는다: 결과 DataFrame을 다시 피클링해 넘기는 비용이 더 크다.
+- 여러 월 파티션 로드는 별도 풀(PARTITION_LOAD_WORKERS)에서 병렬로 수행한다.
+  블로킹 풀 안에서 다시 블로킹 풀을 기다리면 풀이 고갈될 때 교착되므로 풀을 분리한다.
+- EventLoopLagMonitor로 이벤트 루프 지연(ms)을 계속 측정해 효과를 확인한다.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", str(min(32, (os.cpu_count() or 1) + 4))))
+
+_blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="cs-blocking")
+
+# 월 파티션 동시 로드 상한 (디스크/메모리 상황에 맞게 환경변수로 조절, 1이면 순차 로드)
+PARTITION_LOAD_WORKERS = max(1, int(os.getenv("PARTITION_LOAD_WORKERS", "4")))
+
+_PARTITION_THREAD_PREFIX = "cs-partition"
+
+_partition_pool = ThreadPoolExecutor(max_workers=PARTITION_LOAD_WORKERS, thread_name_prefix=_PARTITION_THREAD_PREFIX)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """func(*args, **kwargs)를 블로킹 풀에서 실행하고 결과를 기다린다."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_pool, functools.partial(func, *args, **kwargs))
+
+
+def map_partitions(func, items: list) -> list:
+    """
+    items 각각에 func를 파티션 로드 풀에서 병렬 적용하고, 입력 순서대로 결과를 돌려준다.
+    동기 함수라서 run_blocking 안(블로킹 풀 스레드)에서도 그대로 호출할 수 있다.
+    파티션 로드 풀 스레드 안에서 다시 호출되면 순차 실행한다.
+    (예: load_derived_months 작업자 안의 csat_enriched 빌더가 get_partition_index를 부르고,
+     인덱스 파일이 없으면 repair → load_month_partitions로 다시 이 풀을 쓴다 —
+     모든 작업자가 자기 하위 작업을 기다리며 교착되는 것을 막는다)
+    """
+    items = list(items)
+    nested = threading.current_thread().name.startswith(_PARTITION_THREAD_PREFIX)
+    if len(items) <= 1 or PARTITION_LOAD_WORKERS <= 1 or nested:
+        return [func(item) for item in items]
+    return list(_partition_pool.map(func, items))
+
+
+class EventLoopLagMonitor:
+    """
+    interval마다 깨어나서 예정 시각 대비 늦게 깨어난 시간(= 루프 지연)을 기록.
+    블로킹 작업이 루프를 점유하면 그 시간만큼 지연이 튄다.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self._samples = deque(maxlen=window)
+        self._max_total = 0.0
+        self._task = None
+        self._started_at = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._started_at = time.time()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - t0 - self.interval)
+            self._samples.append(lag)
+            self._max_total = max(self._max_total, lag)
+
+    def snapshot(self) -> dict:
+        samples = sorted(self._samples)
+        n = len(samples)
+
+        def _ms(v):
+            return round(v * 1000, 2)
+
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": _ms(self.interval),
+            "samples": n,
+            "last_ms": _ms(self._samples[-1]) if n else 0.0,
+            "avg_ms": _ms(sum(samples) / n) if n else 0.0,
+            "p99_ms": _ms(samples[min(n - 1, int(n * 0.99))]) if n else 0.0,
+            "max_ms": _ms(samples[-1]) if n else 0.0,
+            "max_ms_since_start": _ms(self._max_total),
+            "blocking_pool_size": BLOCKING_POOL_SIZE,
+        }
+
+
+event_loop_lag = EventLoopLagMonitor()
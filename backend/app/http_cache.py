@@ -0,0 +1,294 @@
+# app/http_cache.py
+"""
+HTTP 캐시 계층 (캐시 전용 조회 엔드포인트용).
+
+- ConditionalGetMiddleware: 파티션 버전(generation)과 쿼리 파라미터로 강한 ETag를 만들고,
+  If-None-Match가 일치하면 엔드포인트를 실행하지 않고 304를 돌려준다.
+  Cache-Control / X-Accel-Expires로 브라우저는 매번 재검증, nginx는 짧게 마이크로 캐시하게 한다.
+  엔드포인트가 Cache-Control: no-store를 직접 붙인 응답(오류 시 기본값 등)은 태그를 달지 않는다.
+- CompressionMiddleware: Accept-Encoding에 따라 br(brotli 설치 시) 또는 gzip으로 압축.
+  스트리밍(NDJSON) 응답도 청크 단위로 압축하고, 큰 본문은 블로킹 풀에서 압축한다.
+
+ETag는 인코딩별로 달라야 하므로(같은 태그 = 같은 바이트) 실제로 압축한 응답에만
+CompressionMiddleware가 인코딩을 태그 끝에 붙인다 (COMPRESS_MIN_SIZE 미만 본문은 원래 태그 그대로).
+"""
+
+import hashlib
+import os
+import zlib
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+
+import pandas as pd
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.cs_utils import FRAME_SCHEMA_VERSION, partition_versions, derived_dependency_versions
+from app.executor import run_blocking
+
+try:
+    import brotli
+    _HAS_BROTLI = True
+except Exception:
+    brotli = None
+    _HAS_BROTLI = False
+
+# 응답 형식이 바뀌면 올려서 기존 ETag를 모두 무효화
+ETAG_VERSION = "1"
+
+# nginx 마이크로 캐시 유지 시간(초). 0이면 nginx 캐시 사용 안 함
+HTTP_MICRO_CACHE_SECONDS = max(0, int(os.getenv("HTTP_MICRO_CACHE_SECONDS", "10")))
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_THREAD_MIN_SIZE = 256 * 1024   # 이보다 큰 본문은 이벤트 루프 밖에서 압축
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4                      # 수 MB JSON 기준 속도/압축률 절충
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# 실패를 감추고 200으로 내보내는 대체 응답용: ETag/마이크로 캐시 대상에서 빠진다
+NO_STORE_HEADERS = {"Cache-Control": "no-store"}
+
+
+# ---- 인코딩 협상 ----
+def _accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    codings = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k.strip() == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        codings[name] = q
+    return codings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """"br" | "gzip" | None — br 우선 (brotli 모듈이 있을 때만)"""
+    codings = _accepted_codings(accept_encoding)
+    star = codings.get("*", 0.0)
+    candidates = (["br"] if _HAS_BROTLI else []) + ["gzip"]
+    for name in candidates:
+        if codings.get(name, star) > 0:
+            return name
+    return None
+
+
+# ---- 조건부 GET (ETag / 304) ----
+def _months_between(start: Optional[str], end: Optional[str]) -> Optional[List[str]]:
+    try:
+        s, e = pd.to_datetime(start), pd.to_datetime(end)
+        if pd.isna(s) or pd.isna(e) or s > e:
+            return None
+        return [str(p) for p in pd.period_range(s, e, freq="M")]
+    except Exception:
+        return None
+
+
+def _add_vary(headers: MutableHeaders, value: str) -> None:
+    current = [v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()]
+    if value.lower() not in current:
+        headers.add_vary_header(value)
+
+
+def _is_no_store(headers: MutableHeaders) -> bool:
+    return "no-store" in headers.get("cache-control", "").lower()
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """'"abc"' → '"abc-gzip"' (압축된 표현의 태그)"""
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def _etag_match(if_none_match: str, candidates: List[str]) -> Optional[str]:
+    """If-None-Match와 일치하는 후보 태그 (약한 비교: W/ 접두사 무시)"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return candidates[0]
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in candidates:
+            return tag
+    return None
+
+
+class ConditionalGetMiddleware:
+    """
+    routes: {경로: {"kinds": (파티션 종류...), "ranged": start~end 월만 볼지 여부,
+                   "derived": (선택) 파생 아티팩트 이름들 — 기록된 의존 파티션 버전도 태그에 넣는다,
+                   "extra": (선택) 추가 버전 문자열을 돌려주는 함수}}
+    refresh_mode가 cache가 아닌 요청(원격 수집이 일어날 수 있음)은 건드리지 않는다.
+    """
+
+    def __init__(self, app, routes: Dict[str, Dict]):
+        self.app = app
+        self.routes = routes
+
+    def compute_etag(self, path: str, query: List[tuple]) -> str:
+        spec = self.routes[path]
+        params = dict(query)
+        months = _months_between(params.get("start"), params.get("end")) if spec.get("ranged", True) else None
+        h = hashlib.sha1()
+        h.update(f"{ETAG_VERSION}|{FRAME_SCHEMA_VERSION}|{path}".encode("utf-8"))
+        for k, v in sorted(query):
+            h.update(f"|{k}={v}".encode("utf-8"))
+        for kind in spec["kinds"]:
+            for key, version in sorted(partition_versions(kind, months).items()):
+                h.update(f"|{key}@{version}".encode("utf-8"))
+        for name in spec.get("derived", ()):
+            for key, version in derived_dependency_versions(name, months).items():
+                h.update(f"|{name}>{key}@{version}".encode("utf-8"))
+        if spec.get("extra"):
+            h.update(f"|{spec['extra']()}".encode("utf-8"))
+        return f'"{h.hexdigest()[:32]}"'
+
+    def _cache_headers(self, etag: str) -> Dict[str, str]:
+        headers = {
+            "ETag": etag,
+            # 브라우저: 저장은 하되 매번 ETag로 재검증 / 공유 캐시: 짧게 재사용
+            "Cache-Control": f"public, max-age=0, s-maxage={HTTP_MICRO_CACHE_SECONDS}, must-revalidate",
+            "Vary": "Accept-Encoding",
+        }
+        if HTTP_MICRO_CACHE_SECONDS:
+            # nginx proxy_cache는 이 헤더를 Cache-Control보다 우선한다 (클라이언트에는 전달되지 않음)
+            headers["X-Accel-Expires"] = str(HTTP_MICRO_CACHE_SECONDS)
+        return headers
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in ("GET", "HEAD")
+                or scope["path"] not in self.routes):
+            await self.app(scope, receive, send)
+            return
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        if dict(query).get("refresh_mode", "cache") != "cache":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        path = scope["path"]
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            etag = await run_blocking(self.compute_etag, path, query)
+            # 클라이언트가 가진 표현: 압축 안 된 것(작은 본문) 또는 지금 협상된 인코딩으로 압축된 것
+            matched = _etag_match(if_none_match, [etag] + ([encoded_etag(etag, encoding)] if encoding else []))
+            if matched:
+                headers = [(k.lower().encode("latin-1"), v.encode("latin-1"))
+                           for k, v in self._cache_headers(matched).items()]
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                if _is_no_store(headers):
+                    # 대체 응답: 태그를 달면 파티션이 다시 저장될 때까지 304로 굳는다
+                    await send(message)
+                    return
+                # 요청 처리 중 파티션이 바뀌었을 수 있으므로 응답 시점 버전으로 다시 계산
+                tag = await run_blocking(self.compute_etag, path, query)
+                for k, v in self._cache_headers(tag).items():
+                    if k == "Vary":
+                        _add_vary(headers, v)
+                    else:
+                        headers[k] = v
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+# ---- 압축 (br / gzip) ----
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._c.process(body)
+            return out + (self._c.flush() if more_body else self._c.finish())
+        out = self._c.compress(body)
+        return out + self._c.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+    return any(media_type.startswith(t) for t in COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def _compress(body: bytes, more_body: bool) -> bytes:
+            if len(body) >= COMPRESS_THREAD_MIN_SIZE:
+                return await run_blocking(state["compressor"].compress, body, more_body)
+            return state["compressor"].compress(body, more_body)
+
+        async def send_compressed(message):
+            kind = message["type"]
+            if kind == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message["status"] in (204, 304) or not _is_compressible(headers):
+                    state["passthrough"] = True
+                    await send(message)
+                else:
+                    state["start"] = message  # 첫 본문을 보고 압축 여부 결정
+                return
+            if kind != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+            if start is not None:
+                state["start"] = None
+                headers = MutableHeaders(scope=start)
+                _add_vary(headers, "Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    state["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+                state["compressor"] = _Compressor(encoding)
+                body = await _compress(body, more_body)
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+            else:
+                body = await _compress(body, more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
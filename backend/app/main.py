@@ -2,13 +2,14 @@ import os
 import re
 import base64
 import asyncio
+import time
 import math
 import numpy as np
 import json
 import logging
-from fastapi import FastAPI, Query, HTTPException, BackgroundTasks, Header, Depends, Request, File, UploadFile
+from fastapi import FastAPI, Query, HTTPException, BackgroundTasks, Header, Depends, Request, Response, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
 import pandas as pd
 from datetime import datetime
 from typing import Optional, List, Any
@@ -20,11 +21,27 @@ from app.cs_utils import (
     server_cache,
     build_and_cache_csat_rows,
     load_csat_rows_from_cache,
-    enrich_csat_with_user_types,
     build_csat_type_scores,
-    get_filtered_df
+    get_filtered_df,
+    duration_minutes,
+    DURATION_COLUMNS,
+    cached_partition_months,
+    derived_dependency_versions,
 )
 from app.db.json_db import load_json_db, save_json_db, file_lock, DEFAULT_DB_PATH
+from app.executor import run_blocking, event_loop_lag, BLOCKING_POOL_SIZE
+from app.db import rollup, tag_index, quantile_sketch, heatmap, contact_index, csat_search, csat_keywords
+from app.db.tag_index import normalize_tag_series
+from app.db.filter_options import load_filter_options
+from app.db.csat_enriched import load_enriched_csat_rows, MATCHED_COLUMN, ENRICH_COLUMNS, CSAT_ENRICHED_NAME
+from app.db.managers import (
+    load_manager_bridge, load_manager_directory, refresh_manager_directory, manager_directory_version,
+)
+from app.serialization import FastJSONResponse, frame_to_records, sanitize_json, ISO_MILLIS, dumps as json_dumps
+from app.http_cache import ConditionalGetMiddleware, CompressionMiddleware, NO_STORE_HEADERS
+from app.result_cache import result_cache, result_key
+from app.csat_stats import build_summary as build_csat_summary, comment_frame
+from app import sla_histogram as sla_histogram_mod
 
 LOG = logging.getLogger("uvicorn.error")
 
@@ -70,11 +87,6 @@ def _clean_str(value: Any) -> str:
         return ""
     return str(value).strip()
 
-# ---- 유틸 함수 ----
-def _iso_millis(series):
-    s = pd.to_datetime(series, errors="coerce")
-    return s.dt.strftime("%Y-%m-%dT%H:%M:%S.%f").str.slice(0, 23)
-
 # ---- 필터 유틸 ----
 def _norm(v: Optional[str]) -> str:
     return (str(v or "").strip().lower())
@@ -96,13 +108,42 @@ def _parse_values(val) -> list[str]:
     return out
 
 # ---- 1. FastAPI 기본 셋업 ----
-app = FastAPI(title="CS Dashboard API", version="1.1.0")
+# 기본 응답 클래스: orjson 기반 (없으면 표준 json) — app/serialization.py
+app = FastAPI(title="CS Dashboard API", version="1.1.0", default_response_class=FastJSONResponse)
 
 # 타임아웃 설정 - TimeoutMiddleware는 존재하지 않으므로 제거
 # from fastapi import Request
 # from fastapi.middleware.timeout import TimeoutMiddleware
 # app.add_middleware(TimeoutMiddleware, timeout=300)  # 5분 타임아웃
 
+# 캐시 전용 조회 엔드포인트: ETag/304 + Cache-Control, 응답 압축(br/gzip)
+# kinds: 응답이 의존하는 파티션 종류 / ranged: start~end 월의 파티션만 반영 (filter-options는 전체 캐시 기준)
+# derived: 기간 밖 파티션에도 의존하는 파생 아티팩트 (기록된 의존 파티션 버전을 태그에 포함)
+# extra: 파티션 외에 응답이 의존하는 상태의 버전 문자열 (예: 담당자 디렉터리)
+HTTP_CACHE_ROUTES = {
+    "/api/period-data": {"kinds": ("userchats",), "ranged": True},
+    "/api/csat/rows": {"kinds": ("csat",), "ranged": True},
+    "/api/csat-analysis": {"kinds": ("csat", "userchats"), "ranged": True, "derived": (CSAT_ENRICHED_NAME,)},
+    "/api/csat/search": {"kinds": ("csat", "userchats"), "ranged": True, "derived": (CSAT_ENRICHED_NAME,)},
+    "/api/csat/keywords": {"kinds": ("csat", "userchats"), "ranged": False},   # compare: 이전 기간 월도 읽음
+    "/api/filter-options": {"kinds": ("userchats",), "ranged": False},
+    "/api/percentiles": {"kinds": ("userchats",), "ranged": True},
+    "/api/sla-histogram": {"kinds": ("userchats",), "ranged": True},
+    "/api/heatmap": {"kinds": ("userchats",), "ranged": True},
+    "/api/repeat-contacts": {"kinds": ("userchats",), "ranged": True},
+    "/api/recontact-intervals": {"kinds": ("userchats",), "ranged": True},
+    "/api/cohorts": {"kinds": ("userchats",), "ranged": False},
+    "/api/avg-times": {"kinds": ("userchats",), "ranged": True},
+    "/api/customer-type-cs": {"kinds": ("userchats",), "ranged": True},
+    "/api/statistics": {"kinds": ("userchats",), "ranged": True},
+    "/api/sample": {"kinds": ("userchats",), "ranged": True},
+    "/api/dashboard": {"kinds": ("userchats", "csat"), "ranged": False, "derived": (CSAT_ENRICHED_NAME,),
+                       "extra": manager_directory_version},   # filter_options 위젯: 전체 월
+    "/api/manager-stats": {"kinds": ("userchats",), "ranged": True, "extra": manager_directory_version},
+}
+app.add_middleware(ConditionalGetMiddleware, routes=HTTP_CACHE_ROUTES)
+app.add_middleware(CompressionMiddleware)
+
 # CORS 설정 강화 - 정확한 오리진 나열
 ALLOWED_ORIGINS = [
     "http://61.107.201.48:8080",
@@ -141,24 +182,31 @@ def admin_guard(x_admin_token: str = Header(None)):
         raise HTTPException(status_code=403, detail="관리자 권한이 필요합니다.")
     return True
 
-# ---- 2-3. NaN/Inf sanitize 유틸 ----
-def _sanitize_json(o):
-    # float / numpy float -> 0.0 for NaN/Inf
-    if isinstance(o, float):
-        if math.isnan(o) or math.isinf(o): return 0.0
-        return float(o)
-    if isinstance(o, (np.floating,)):
-        v = float(o)
-        return 0.0 if (math.isnan(v) or math.isinf(v)) else v
-    # numpy int -> int
-    if isinstance(o, (np.integer,)):
-        return int(o)
-    # 컨테이너 순회
-    if isinstance(o, dict):
-        return {k: _sanitize_json(v) for k, v in o.items()}
-    if isinstance(o, list):
-        return [_sanitize_json(v) for v in o]
-    return o
+# ---- 2-3. 조회 결과 캐시 (app/result_cache.py) ----
+# 키 = (이름, 정규화한 파라미터, 관련 파티션 버전) → 직렬화된 응답 본문을 그대로 재사용
+def _months_of(start: str, end: str) -> list:
+    return [str(p) for p in pd.period_range(pd.to_datetime(start), pd.to_datetime(end), freq="M")]
+
+def _filter_key(*values) -> tuple:
+    """유형 필터 값 정규화 (CSV 순서/대소문자/공백/'전체' 차이를 같은 키로)"""
+    return tuple(tuple(sorted({_norm(v) for v in _parse_values(val)})) for val in values)
+
+async def _result_key(name: str, params: tuple, kinds: tuple, start: str, end: str) -> tuple:
+    return await run_blocking(result_key, name, params, kinds, _months_of(start, end))
+
+def _cached_json_response(hit) -> Response:
+    body, headers = hit
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def _json_response_cached(payload, cache_key: Optional[tuple], headers: Optional[dict] = None) -> Response:
+    """payload를 블로킹 풀에서 직렬화해 반환하고 결과 캐시에 저장"""
+    body = await run_blocking(json_dumps, payload)
+    result_cache.put(cache_key, (body, headers or {}), len(body))
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _fallback_response(payload) -> Response:
+    """오류를 감춘 200 대체 응답 — ETag/마이크로 캐시/결과 캐시 어디에도 남기지 않는다"""
+    return FastJSONResponse(payload, headers=NO_STORE_HEADERS)
 
 # ---- 2-1. Pydantic 모델 ----
 # CSAT 업로드 관련 모델 제거됨
@@ -176,9 +224,35 @@ async def health():
 async def api_health():
     return {"status": "healthy", "api": True}
 
+# ---- 3-1. 실행 모델 (블로킹 작업은 스레드 풀로) ----
+@app.on_event("startup")
+async def _start_execution_model():
+    # `def` 엔드포인트가 쓰는 FastAPI(anyio) 스레드 풀도 같은 크기로 맞춤
+    try:
+        import anyio.to_thread
+        anyio.to_thread.current_default_thread_limiter().total_tokens = BLOCKING_POOL_SIZE
+    except Exception as e:
+        print(f"[EXEC] 스레드 풀 크기 설정 실패: {e}")
+    event_loop_lag.start()
+    print(f"[EXEC] blocking pool size={BLOCKING_POOL_SIZE}, event-loop lag monitor 시작")
+
+@app.on_event("shutdown")
+async def _stop_execution_model():
+    event_loop_lag.stop()
+
+@app.get("/api/metrics/event-loop")
+async def event_loop_metrics():
+    """이벤트 루프 지연(ms) 통계. 블로킹 작업이 루프를 점유하면 max/p99가 튄다."""
+    return event_loop_lag.snapshot()
+
+@app.get("/api/metrics/result-cache")
+async def result_cache_metrics():
+    """조회 결과 캐시 적중률/용량 (이름별 hit/miss 포함)"""
+    return result_cache.stats()
+
 # ---- 4. 캐시 상태/관리 ----
 @app.get("/api/cache/status")
-async def cache_status():
+def cache_status():
     try:
         cache_dir = server_cache.cache_dir
         if not os.path.exists(cache_dir):
@@ -212,17 +286,57 @@ async def cache_status():
         raise HTTPException(status_code=500, detail=f"캐시 상태 조회 실패: {str(e)}")
 
 @app.delete("/api/cache/clear")
-async def clear_cache():
+def clear_cache():
     try:
         ok = server_cache.clear_all_cache()
+        result_cache.clear()
         if ok:
             return {"message": "전체 캐시 삭제 완료"}
         raise HTTPException(status_code=500, detail="캐시 삭제 실패")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"캐시 삭제 실패: {str(e)}")
 
+def _partition_status(kind: str, month: str) -> dict:
+    """메타데이터 파일만 읽어 파티션 상태 (pickle은 열지 않음)"""
+    key = f"{kind}_{month}"
+    meta = server_cache.load_metadata(key) if os.path.exists(server_cache.get_cache_path(key)) else None
+    if meta is None:
+        return {"exists": False, "valid": False, "data_count": 0, "saved_at": None, "generation": None}
+    return {
+        "exists": True,
+        "valid": server_cache.is_cache_still_valid(meta),
+        "data_count": int(meta.get("data_count") or 0),
+        "saved_at": meta.get("saved_at"),
+        "generation": meta.get("generation"),
+    }
+
+@app.get("/api/cache/check")
+def check_cache_for_period(start: str = Query(...), end: str = Query(...)):
+    """
+    기간의 월별 캐시 커버리지 (userchats / csat).
+    valid: 저장 후 CACHE_EXPIRE_HOURS 이내, missing_months: userchats 파티션이 없는 월
+    """
+    try:
+        months = _months_of(start, end)
+        cache_status = {m: _partition_status("userchats", m) for m in months}
+        csat_status = {m: _partition_status("csat", m) for m in months}
+        missing = [m for m, s in cache_status.items() if not s["exists"]]
+        return {
+            "start_date": start,
+            "end_date": end,
+            "required_months": months,
+            "cache_status": cache_status,
+            "csat_status": csat_status,
+            "missing_months": missing,
+            "csat_missing_months": [m for m, s in csat_status.items() if not s["exists"]],
+            "covered": not missing,
+            "total_count": sum(s["data_count"] for s in cache_status.values()),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"캐시 확인 실패: {str(e)}")
+
 @app.get("/api/cache/check-firstasked")
-async def check_cache_firstasked():
+def check_cache_firstasked():
     """캐시에 firstAskedAt이 없는 데이터가 있는지 확인"""
     try:
         import pandas as pd
@@ -350,7 +464,7 @@ async def _rebuild_all_cache_task(start: str, end: str):
     """관리자 전용: 전체 캐시 삭제 후 전구간 재수집"""
     try:
         # 1) 전체 캐시 삭제
-        ok = server_cache.clear_all_cache()
+        ok = await run_blocking(server_cache.clear_all_cache)
         print(f"[ADMIN] clear_all_cache: {ok}")
 
         # 2) 전구간 재수집 (월별 저장 + openedAt/closedAt 포함 + CSAT 캐시도 함께)
@@ -385,7 +499,7 @@ async def refresh_cache(
         if not force:
             df = await get_cached_data(start, end, refresh_mode="cache")
             if include_csat:
-                _ = load_csat_rows_from_cache(start, end)
+                _ = await run_blocking(load_csat_rows_from_cache, start, end)
             return {"message": "캐시 새로고침 완료(원격 호출 없음)", "data_count": len(df)}
         else:
             df = await get_cached_data(start, end, refresh_mode="refresh")
@@ -444,134 +558,284 @@ async def refresh_cache(
 # 5-1. 필터 옵션
 @app.get("/api/filter-options")
 async def filter_options(
-    start: str = Query(...), 
-    end: str = Query(...), 
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
     refresh_mode: str = Query("cache"),
     고객유형: str = Query("전체"),
     문의유형: str = Query("전체"),
     서비스유형: str = Query("전체")
 ):
     """
-    1차/2차 옵션을 캐시에서만 생성.
-    - 1차: *_1차 컬럼 사용
-    - 2차: 선택된 1차로 DF를 먼저 좁힌 뒤 *_2차 고유값 반환
+    1차/2차 옵션 + subtype_maps를 캐시에서만 생성.
+    - 파티션 저장 시 만들어 둔 월별 옵션 집합(app/db/filter_options.py)을 합치기만 한다
+    - 기간과 무관하게 캐시된 모든 월을 사용 (start/end는 호환용으로만 받음)
     """
     try:
-        # 기간과 무관하게, 옵션은 전체 캐시 기반으로 생성
-        df = await get_cached_data("2025-04-01", "2025-12-31", refresh_mode="cache")
-        if df is None or df.empty:
+        months = await run_blocking(cached_partition_months, "userchats")
+        cache_key = await run_blocking(result_key, "filter_options", (), ("userchats",), None)
+        hit = result_cache.get(cache_key)
+        if hit is not None:
+            return _cached_json_response(hit)
+
+        options = await run_blocking(load_filter_options, months)
+        if options is None:
             return {
                 "고객유형": ["전체"], "문의유형": ["전체"], "서비스유형": ["전체"],
                 "고객유형_2차": ["전체"], "문의유형_2차": ["전체"], "서비스유형_2차": ["전체"],
             }
 
-        # 안전 정규화 유틸
-        def norm_series(s):
-            return (s.astype(str)
-                     .str.strip()
-                     .replace({"None": "", "nan": ""}))
-
-        # 실제 사용할 컬럼 매핑 (cs_utils.process_userchat_data에서 생성됨)
-        COLS = {
-            "고객유형": ("고객유형_1차", "고객유형_2차"),
-            "문의유형": ("문의유형_1차", "문의유형_2차"),
-            "서비스유형": ("서비스유형_1차", "서비스유형_2차"),
-        }
-
-        # 없으면 만들어두기
-        for p, (c1, c2) in COLS.items():
-            if c1 not in df.columns: df[c1] = None
-            if c2 not in df.columns: df[c2] = None
-            df[c1] = norm_series(df[c1])
-            df[c2] = norm_series(df[c2])
-
-        # 1차 옵션 뽑기
-        def primary_opts(col1):
-            vals = df[col1].dropna()
-            vals = [v for v in vals if v]
-            return ["전체"] + sorted(set(vals))
-
-        # 2차 옵션 뽑기
-        def secondary_opts(col2):
-            vals = df[col2].dropna()
-            vals = [v for v in vals if v]
-            return ["전체"] + sorted(set(vals))
-
-        result = {
-            "고객유형": primary_opts(COLS["고객유형"][0]),
-            "문의유형": primary_opts(COLS["문의유형"][0]),
-            "서비스유형": primary_opts(COLS["서비스유형"][0]),
-            # 2차 풀리스트도 유지
-            "고객유형_2차": secondary_opts(COLS["고객유형"][1]),
-            "문의유형_2차": secondary_opts(COLS["문의유형"][1]),
-            "서비스유형_2차": secondary_opts(COLS["서비스유형"][1]),
-        }
-
-        # ✅ [추가] subtype_maps 통합 생성
-        def _build_map(df, p, c):
-            return (
-                df[[p, c]].dropna()
-                  .groupby(p)[c].unique()
-                  .apply(lambda xs: sorted(set([x for x in xs.tolist() if str(x).strip()])))
-                  .to_dict()
-            )
-
-        subtype_maps = {
-            "inquiry":  {k: ['전체'] + v for k, v in _build_map(df, '문의유형_1차',  '문의유형_2차').items()},
-            "service":  {k: ['전체'] + v for k, v in _build_map(df, '서비스유형_1차',  '서비스유형_2차').items()},
-            "customer": {k: ['전체'] + v for k, v in _build_map(df, '고객유형_1차', '고객유형_2차').items()},
-        }
-
-        result.update({
-            "subtype_maps": subtype_maps,  # [ADD] 통합 맵
-        })
-
-        return result
+        return await _json_response_cached(options, cache_key)
 
     except Exception:
         # 문제가 나도 UI가 깨지지 않도록 기본값 반환
-        return {
+        return _fallback_response({
             "고객유형": ["전체"], "문의유형": ["전체"], "서비스유형": ["전체"],
             "고객유형_2차": ["전체"], "문의유형_2차": ["전체"], "서비스유형_2차": ["전체"],
-        }
+        })
+
+# ---- 5-2-0. 필드 선택 / 커서 페이지네이션 (userchats, period-data 공통) ----
+# fields/limit/cursor가 없으면 기존과 동일하게 전체 행·전체 컬럼을 원래 순서로 반환.
+# limit 또는 cursor가 있으면 firstAskedAt(없으면 createdAt), userChatId 순으로 정렬 후 keyset 페이지네이션.
+PAGE_MAX_LIMIT = 50000
+_NAT_SORT_KEY = np.iinfo(np.int64).max  # 시각이 없는 행은 맨 뒤
+
+def _encode_cursor(key: int, chat_id: str) -> str:
+    raw = json.dumps([int(key), chat_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    """잘못된 커서는 400"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, chat_id = json.loads(raw.decode("utf-8"))
+        return int(key), str(chat_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="잘못된 cursor 값입니다")
+
+def _page_frame(df: pd.DataFrame, fields: Optional[str], limit: Optional[int],
+                cursor: Optional[tuple]) -> tuple:
+    """(페이지 df, 전체 건수, 다음 커서) — 필드 선택은 직렬화 전에 적용해 변환 비용도 줄인다"""
+    total = len(df)
+    next_cursor = None
+    if limit is not None or cursor is not None:
+        when = df["firstAskedAt"]
+        if "createdAt" in df.columns:
+            when = when.fillna(df["createdAt"])
+        keys = when.astype("datetime64[ns]").to_numpy().view("int64").copy()
+        keys[when.isna().to_numpy()] = _NAT_SORT_KEY
+        ids = (df["userChatId"].astype("string").fillna("").to_numpy(dtype=object)
+               if "userChatId" in df.columns else np.full(len(df), "", dtype=object))
+        order = np.lexsort((ids, keys))
+        keys, ids = keys[order], ids[order]
+        df = df.iloc[order]
+        if cursor is not None:
+            ck, cid = cursor
+            after = (keys > ck) | ((keys == ck) & (ids > cid))
+            df, keys, ids = df[after], keys[after], ids[after]
+        if limit is not None and len(df) > limit:
+            df, keys, ids = df.iloc[:limit], keys[:limit], ids[:limit]
+            next_cursor = _encode_cursor(keys[-1], ids[-1])
+    if fields:
+        wanted = _parse_values(fields)
+        df = df[[c for c in wanted if c in df.columns]]
+    return df, total, next_cursor
+
+def _frame_to_records(frame: pd.DataFrame) -> list:
+    """타임스탬프 ISO(밀리초) 변환 + NaN/Inf 정리 후 records 리스트 — 컬럼 단위 처리 (블로킹 풀에서 실행)"""
+    return frame_to_records(frame, datetime_format=ISO_MILLIS)
+
+# ---- 5-2-0-1. NDJSON 스트리밍 (format=ndjson) ----
+# 전체 records를 한 번에 만들지 않고 NDJSON_BATCH_ROWS 행씩 변환/인코딩해서 바로 내보낸다.
+# 동기 제너레이터라 Starlette가 스레드 풀에서 순회하므로 이벤트 루프를 막지 않는다.
+NDJSON_BATCH_ROWS = int(os.getenv("NDJSON_BATCH_ROWS", "2000"))
+
+def _ndjson_batches(frame: pd.DataFrame, batch_rows: int = NDJSON_BATCH_ROWS):
+    for i in range(0, len(frame), batch_rows):
+        records = _frame_to_records(frame.iloc[i:i + batch_rows])
+        yield b"".join(json_dumps(r) + b"\n" for r in records)
+
+def _encode_records(frame: pd.DataFrame) -> bytes:
+    return json_dumps([] if frame.empty else _frame_to_records(frame))
+
+async def _records_response(frame: pd.DataFrame, total: int, next_cursor: Optional[str],
+                            response_format: str, cache_key: Optional[tuple] = None):
+    """format=json(기본): records 리스트 / format=ndjson: 행 단위 스트리밍. json은 cache_key로 결과 캐시에 저장"""
+    if response_format == "ndjson":
+        headers = {"X-Total-Count": str(total)}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return StreamingResponse(_ndjson_batches(frame), media_type="application/x-ndjson", headers=headers)
+    # 직접 응답 객체를 반환해 FastAPI의 jsonable_encoder 단계를 건너뛴다 (헤더도 직접 설정)
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    body = await run_blocking(_encode_records, frame)
+    result_cache.put(cache_key, (body, headers), len(body))
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _check_response_format(response_format: str) -> str:
+    fmt = _norm(response_format) or "json"
+    if fmt not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail=f"format은 json 또는 ndjson이어야 합니다: {response_format}")
+    return fmt
 
 # 5-2. 기간 상세(프론트 집계용)
+def _userchats_frame(df: pd.DataFrame, start: str, end: str, fields: Optional[str] = None,
+                     limit: Optional[int] = None, cursor: Optional[tuple] = None) -> tuple:
+    """기간 재확인 + 필드 선택/페이지네이션 (블로킹 풀에서 실행)"""
+    # get_cached_data에서 이미 기간 필터 완료 → 그대로 반환
+    # firstAskedAt이 없어도 createdAt이 있으면 포함 (OB 데이터 처리)
+    # firstAskedAt 또는 createdAt 중 하나라도 있어야 함
+    # 타임스탬프는 캐시 저장 시 KST naive datetime64로 정규화되어 있어 재파싱하지 않음
+    first = df["firstAskedAt"]
+    created = df["createdAt"] if "createdAt" in df.columns else pd.Series(pd.NaT, index=df.index)
+    df = df[first.notna() | created.notna()]
+
+    s = pd.to_datetime(start)
+    e = pd.to_datetime(end)
+    # firstAskedAt이 없으면 createdAt 사용
+    date_for_filter = first.fillna(created).loc[df.index]
+    filtered = df[(date_for_filter >= s) & (date_for_filter <= e)]
+    return _page_frame(filtered, fields, limit, cursor)
+
 @app.get("/api/userchats")
-async def userchats(start: str = Query(...), end: str = Query(...), force_refresh: bool = Query(False)):
+async def userchats(
+    start: str = Query(...),
+    end: str = Query(...),
+    force_refresh: bool = Query(False),
+    fields: Optional[str] = Query(None, description="반환할 컬럼 (CSV)"),
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="이전 응답의 X-Next-Cursor"),
+    response_format: str = Query("json", alias="format", description="json | ndjson(스트리밍)"),
+):
+    page_cursor = _decode_cursor(cursor)
+    fmt = _check_response_format(response_format)
     try:
         end = limit_end_date(end)
         refresh_mode = "refresh" if force_refresh else "cache"
         df = await get_cached_data(start, end, refresh_mode=refresh_mode)
         if df.empty:
-            return []
-        # get_cached_data에서 이미 기간 필터 완료 → 그대로 반환
-        # firstAskedAt이 없어도 createdAt이 있으면 포함 (OB 데이터 처리)
-        # firstAskedAt 또는 createdAt 중 하나라도 있어야 함
-        has_first = df["firstAskedAt"].notna()
-        has_created = pd.to_datetime(df.get("createdAt", pd.Series()), errors='coerce').notna()
-        df = df[has_first | has_created]
-        
-        s = pd.to_datetime(start)
-        e = pd.to_datetime(end)
-        # firstAskedAt이 없으면 createdAt 사용
-        date_for_filter = pd.to_datetime(df["firstAskedAt"], errors='coerce').fillna(
-            pd.to_datetime(df.get("createdAt"), errors='coerce')
+            return await _records_response(df, 0, None, fmt)
+        frame, total, next_cursor = await run_blocking(
+            _userchats_frame, df, start, end, fields, limit, page_cursor,
         )
-        filtered = df[(date_for_filter >= s) & (date_for_filter <= e)].copy()
-        
-        # filtered 만들고 나서
-        for col in ["firstAskedAt","createdAt","openedAt","closedAt"]:
-            if col in filtered.columns:
-                filtered.loc[:, col] = _iso_millis(filtered[col])
-        
-        # NaN/Inf 값 제거
-        filtered = filtered.replace([np.inf, -np.inf], np.nan)
-        data_dict = filtered.to_dict(orient="records")
-        return _sanitize_json(data_dict)
+        return await _records_response(frame, total, next_cursor, fmt)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"캐시 데이터 조회 실패: {str(e)}")
 
 # 5-2-1. 기간별 데이터 (프론트엔드 호환성)
+# 실제 DF 컬럼 매핑: 1차/2차는 *_1차 / *_2차 로 통일
+TYPE_FILTER_COLUMNS = {
+    "문의유형":   ("문의유형_1차", "문의유형_2차"),
+    "서비스유형": ("서비스유형_1차", "서비스유형_2차"),
+    "고객유형":   ("고객유형_1차", "고객유형_2차"),
+}
+
+def _type_filter_values(고객유형: str, 고객유형_2차: str, 문의유형: str,
+                        문의유형_2차: str, 서비스유형: str, 서비스유형_2차: str) -> tuple:
+    """다중값/CSV 지원 → (parent_vals, child_vals)"""
+    parent_vals = {
+        "문의유형":   _parse_values(문의유형),
+        "서비스유형": _parse_values(서비스유형),
+        "고객유형":   _parse_values(고객유형),
+    }
+    child_vals = {
+        "문의유형_2차":   _parse_values(문의유형_2차),
+        "서비스유형_2차": _parse_values(서비스유형_2차),
+        "고객유형_2차":   _parse_values(고객유형_2차),
+    }
+    return parent_vals, child_vals
+
+def _type_filter_clauses(*filters) -> list:
+    """
+    [(컬럼, 정규화 값 집합)] — 컬럼 안에서는 OR, 컬럼끼리는 AND.
+    부모+자식 동시 / 부모만 / (부모 없이) 자식만 선택 모두 같은 규칙으로 적용된다.
+    """
+    parent_vals, child_vals = _type_filter_values(*filters)
+    clauses = []
+    for key in ["문의유형", "서비스유형", "고객유형"]:
+        p_col, c_col = TYPE_FILTER_COLUMNS[key]
+        p_vals = set(map(_norm, parent_vals[key]))
+        c_vals = set(map(_norm, child_vals[f"{key}_2차"]))
+        if p_vals:
+            clauses.append((p_col, p_vals))
+        if c_vals:
+            clauses.append((c_col, c_vals))
+    return clauses
+
+def _type_partition_filter(clauses: list):
+    """get_cached_data(partition_filter=...)용: 월 파티션에 태그 인덱스로 유형 필터 적용"""
+    return lambda month, df: tag_index.filter_partition(month, df, clauses)
+
+def _apply_type_filters(df: pd.DataFrame, 고객유형: str, 고객유형_2차: str, 문의유형: str,
+                        문의유형_2차: str, 서비스유형: str, 서비스유형_2차: str,
+                        prefiltered: bool = False):
+    """
+    고객/문의/서비스유형 1차·2차 필터 (CSV 다중값, 대소문자/공백 무시). (df, parent_vals, child_vals) 반환
+    prefiltered=True: 이미 파티션 단위로 태그 인덱스 필터가 적용된 df (컬럼 보정만 수행)
+    """
+    for _, (c1, c2) in TYPE_FILTER_COLUMNS.items():
+        if c1 not in df.columns: df[c1] = None
+        if c2 not in df.columns: df[c2] = None
+
+    filters = (고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차)
+    parent_vals, child_vals = _type_filter_values(*filters)
+    if not prefiltered:
+        for col, vals in _type_filter_clauses(*filters):
+            df = df[normalize_tag_series(df[col]).isin(vals)]
+
+    return df, parent_vals, child_vals
+
+def _type_filter_aliases(request: Optional[Request], 고객유형: str, 고객유형_2차: str, 문의유형: str,
+                         문의유형_2차: str, 서비스유형: str, 서비스유형_2차: str) -> tuple:
+    """프론트 영문 키 alias(inquiryType, serviceType, customerType + Sub)도 수용 (없는 값이면 무시)"""
+    if request is not None:
+        qp = request.query_params
+        # parent
+        if _norm(문의유형) == _norm("전체"):
+            문의유형 = qp.get("inquiryType") or qp.get("inquiryTypes") or 문의유형
+        if _norm(서비스유형) == _norm("전체"):
+            서비스유형 = qp.get("serviceType") or qp.get("serviceTypes") or 서비스유형
+        if _norm(고객유형)   == _norm("전체"):
+            고객유형   = qp.get("customerType") or qp.get("customerTypes") or 고객유형
+        # child
+        if _norm(문의유형_2차) == _norm("전체"):
+            문의유형_2차 = qp.get("inquirySubtype") or qp.get("inquirySubtypes") or 문의유형_2차
+        if _norm(서비스유형_2차) == _norm("전체"):
+            서비스유형_2차 = qp.get("serviceSubtype") or qp.get("serviceSubtypes") or 서비스유형_2차
+        if _norm(고객유형_2차) == _norm("전체"):
+            고객유형_2차 = qp.get("customerSubtype") or qp.get("customerSubtypes") or 고객유형_2차
+    return 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차
+
+def _period_frame(df: pd.DataFrame, start: str, end: str, refresh_mode: str,
+                  고객유형: str, 고객유형_2차: str, 문의유형: str,
+                  문의유형_2차: str, 서비스유형: str, 서비스유형_2차: str,
+                  fields: Optional[str] = None, limit: Optional[int] = None,
+                  cursor: Optional[tuple] = None, prefiltered: bool = False) -> tuple:
+    """유형 필터 + 필드 선택/페이지네이션 (블로킹 풀에서 실행). prefiltered: 유형 필터가 파티션 단위로 이미 적용됨"""
+    print(f"[PERIOD] params start={start} end={end} refresh_mode={refresh_mode} "
+          f"고객유형={고객유형} 문의유형={문의유형} 서비스유형={서비스유형} 문의유형_2차={문의유형_2차} 서비스유형_2차={서비스유형_2차}")
+    original_len = len(df)
+    print(f"[PERIOD] date-filtered rows(before type filters): {original_len}")
+
+    df, parent_vals, child_vals = _apply_type_filters(
+        df, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        prefiltered=prefiltered,
+    )
+    filtered_df = df
+
+    print("[FILTER] parent:", parent_vals, "child:", child_vals)
+    print(f"[FILTER] 유형 필터 적용: "
+          f"고객({고객유형})/{고객유형_2차}, "
+          f"문의({문의유형})/{문의유형_2차}, "
+          f"서비스({서비스유형})/{서비스유형_2차}")
+    print(f"[FILTER] 필터링 전: {original_len} rows, 필터링 후: {len(filtered_df)} rows")
+    print(f"[PERIOD] filtered rows(after type filters): {len(filtered_df)}")
+
+    return _page_frame(filtered_df, fields, limit, cursor)
+
 @app.get("/api/period-data")
 async def period_data(
     start: str = Query(...), 
@@ -583,7 +847,11 @@ async def period_data(
     문의유형_2차: str = Query("전체"),
     서비스유형: str = Query("전체"),
     서비스유형_2차: str = Query("전체"),
-    request: Request = None
+    fields: Optional[str] = Query(None, description="반환할 컬럼 (CSV)"),
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="이전 응답의 X-Next-Cursor"),
+    response_format: str = Query("json", alias="format", description="json | ndjson(스트리밍)"),
+    request: Request = None,
 ):
     """
     프론트엔드 호환성을 위한 /api/period-data 엔드포인트
@@ -596,102 +864,555 @@ async def period_data(
     유형 필터:
     - 고객유형, 문의유형, 서비스유형: 1차 분류
     - 문의유형_2차, 서비스유형_2차: 2차 분류
+
+    fields / limit / cursor:
+    - fields: 반환할 컬럼 (CSV). 없으면 전체 컬럼
+    - limit, cursor: firstAskedAt 순 페이지네이션. 다음 페이지 커서는 X-Next-Cursor 헤더
+    - 전체 건수(유형 필터 후, 페이지네이션 전)는 X-Total-Count 헤더
+
+    format:
+    - json(기본): 배열 한 번에 반환
+    - ndjson: 한 줄에 한 행씩 배치 단위로 스트리밍 (application/x-ndjson)
     """
+    page_cursor = _decode_cursor(cursor)
+    fmt = _check_response_format(response_format)
     try:
         end = limit_end_date(end)
-        df = await get_cached_data(start, end, refresh_mode=refresh_mode)
-        if df.empty:
-            return []
-        
+
         # ---- (1) 프론트 영문 키 alias도 수용 (없는 값이면 무시)
-        # inquiryType, serviceType, customerType (+ Sub)
-        if request is not None:
-            qp = request.query_params
-            # parent
-            if _norm(문의유형) == _norm("전체"):
-                문의유형 = qp.get("inquiryType") or qp.get("inquiryTypes") or 문의유형
-            if _norm(서비스유형) == _norm("전체"):
-                서비스유형 = qp.get("serviceType") or qp.get("serviceTypes") or 서비스유형
-            if _norm(고객유형)   == _norm("전체"):
-                고객유형   = qp.get("customerType") or qp.get("customerTypes") or 고객유형
-            # child
-            if _norm(문의유형_2차) == _norm("전체"):
-                문의유형_2차 = qp.get("inquirySubtype") or qp.get("inquirySubtypes") or 문의유형_2차
-            if _norm(서비스유형_2차) == _norm("전체"):
-                서비스유형_2차 = qp.get("serviceSubtype") or qp.get("serviceSubtypes") or 서비스유형_2차
-            if _norm(고객유형_2차) == _norm("전체"):
-                고객유형_2차 = qp.get("customerSubtype") or qp.get("customerSubtypes") or 고객유형_2차
-
-        print(f"[PERIOD] params start={start} end={end} refresh_mode={refresh_mode} "
-              f"고객유형={고객유형} 문의유형={문의유형} 서비스유형={서비스유형} 문의유형_2차={문의유형_2차} 서비스유형_2차={서비스유형_2차}")
-        original_len = len(df)
-        print(f"[PERIOD] date-filtered rows(before type filters): {original_len}")
-
-        # ---- (2) 실제 DF 컬럼 매핑: 1차/2차는 *_1차 / *_2차 로 통일
-        COLS = {
-            "문의유형":   ("문의유형_1차", "문의유형_2차"),
-            "서비스유형": ("서비스유형_1차", "서비스유형_2차"),
-            "고객유형":   ("고객유형_1차", "고객유형_2차"),
-        }
-        for _, (c1, c2) in COLS.items():
-            if c1 not in df.columns: df[c1] = None
-            if c2 not in df.columns: df[c2] = None
-
-        # ---- (3) 다중값/CSV 지원 + 정규화 비교
-        parent_vals = {
-            "문의유형":   _parse_values(문의유형),
-            "서비스유형": _parse_values(서비스유형),
-            "고객유형":   _parse_values(고객유형),
-        }
-        child_vals = {
-            "문의유형_2차":   _parse_values(문의유형_2차),
-            "서비스유형_2차": _parse_values(서비스유형_2차),
-            "고객유형_2차":   _parse_values(고객유형_2차),
-        }
+        고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차 = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
 
-        # 안전 정규화 시리즈
-        def _norm_series(s: pd.Series) -> pd.Series:
-            return s.astype(str).str.strip().str.lower().replace({"none": "", "nan": ""})
-
-        for key in ["문의유형", "서비스유형", "고객유형"]:
-            p_col, c_col = COLS[key]
-            p_vals = set(map(_norm, parent_vals[key]))
-            c_vals = set(map(_norm, child_vals[f"{key}_2차"]))
-            if p_vals and c_vals:
-                # 부모+자식 동시 적용
-                df = df[_norm_series(df[p_col]).isin(p_vals) & _norm_series(df[c_col]).isin(c_vals)]
-            elif p_vals:
-                # 부모만 적용
-                df = df[_norm_series(df[p_col]).isin(p_vals)]
-            elif c_vals:
-                # ✅ 부모 없이 자식만 선택해도 적용
-                df = df[_norm_series(df[c_col]).isin(c_vals)]
-
-        filtered_df = df
-        
-        print("[FILTER] parent:", parent_vals, "child:", child_vals)
-        print(f"[FILTER] 유형 필터 적용: "
-              f"고객({고객유형})/{고객유형_2차}, "
-              f"문의({문의유형})/{문의유형_2차}, "
-              f"서비스({서비스유형})/{서비스유형_2차}")
-        print(f"[FILTER] 필터링 전: {original_len} rows, 필터링 후: {len(filtered_df)} rows")
-        print(f"[PERIOD] filtered rows(after type filters): {len(filtered_df)}")
-        
-        # 기존 firstAskedAt 변환 자리에 아래처럼 4개 모두 처리
-        for col in ["firstAskedAt","createdAt","openedAt","closedAt"]:
-            if col in filtered_df.columns:
-                filtered_df.loc[:, col] = _iso_millis(filtered_df[col])
-        
-        # NaN/Inf 값 제거
-        filtered_df = filtered_df.replace([np.inf, -np.inf], np.nan)
-        data_dict = filtered_df.to_dict(orient="records")
-        return _sanitize_json(data_dict)
+        # ---- (2) 결과 캐시 (cache 모드 + json 응답만)
+        cache_key = None
+        if refresh_mode == "cache" and fmt == "json":
+            params = (start, end,
+                      _filter_key(고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차),
+                      tuple(_parse_values(fields)), limit, page_cursor)
+            cache_key = await _result_key("period_data", params, ("userchats",), start, end)
+            hit = result_cache.get(cache_key)
+            if hit is not None:
+                return _cached_json_response(hit)
+
+        # ---- (3) cache 모드: 유형 필터는 월 파티션의 태그 인덱스로 concat 전에 적용
+        prefiltered = refresh_mode == "cache"
+        clauses = _type_filter_clauses(고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차)
+        df = await get_cached_data(
+            start, end, refresh_mode=refresh_mode,
+            partition_filter=_type_partition_filter(clauses) if prefiltered and clauses else None,
+        )
+        if df.empty:
+            return await _records_response(df, 0, None, fmt, cache_key)
+
+        frame, total, next_cursor = await run_blocking(
+            _period_frame, df, start, end, refresh_mode,
+            고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+            fields, limit, page_cursor, prefiltered,
+        )
+        return await _records_response(frame, total, next_cursor, fmt, cache_key)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"기간별 데이터 조회 실패: {str(e)}")
 
+# 5-2-2. 시계열 집계 (트렌드 차트용: 행 대신 버킷별 집계값만 반환)
+TIMESERIES_GRANULARITY = {
+    "day": "day", "daily": "day",
+    "week": "week", "weekly": "week",
+    "month": "month", "monthly": "month",
+}
+TIMESERIES_MEASURES = ["count", "mean", "median", "p90"]
+
+def _timeseries_buckets(dt: pd.Series, granularity: str) -> pd.Series:
+    """KST naive 시각 → 버킷 시작일 (day: 자정, week: ISO 주 월요일, month: 1일)"""
+    day = dt.dt.normalize()
+    if granularity == "week":
+        return day - pd.to_timedelta(day.dt.weekday, unit="D")
+    if granularity == "month":
+        return day - pd.to_timedelta(day.dt.day - 1, unit="D")
+    return day
+
+def _timeseries_label(ts: pd.Timestamp, granularity: str) -> str:
+    # 프론트 차트 x축 표기와 동일
+    if granularity == "month":
+        return f"{ts.month}월"
+    return f"{ts.month}/{ts.day}"
+
+def _timeseries_points(df: pd.DataFrame, granularity: str, measures: list, metrics: list) -> pd.DataFrame:
+    """원본 행 → 버킷별 count + 소요시간(분) mean/median/p90 (groupby 한 번)"""
+    points = pd.DataFrame()
+    if df.empty:
+        return points
+    # firstAskedAt 기준 (없으면 createdAt) — get_cached_data의 기간 필터와 동일 규칙
+    when = df["firstAskedAt"]
+    if "createdAt" in df.columns:
+        when = when.fillna(df["createdAt"])
+    work = pd.DataFrame({"_bucket": _timeseries_buckets(when, granularity)}, index=df.index)
+    for m in metrics:
+        work[m] = duration_minutes(df[m]) if m in df.columns else np.nan
+    grouped = work.dropna(subset=["_bucket"]).groupby("_bucket")
+
+    parts = []
+    if "count" in measures:
+        parts.append(grouped.size().rename("count"))
+    if metrics:
+        if "mean" in measures:
+            parts.append(grouped[metrics].mean().add_suffix("_mean"))
+        if "median" in measures:
+            parts.append(grouped[metrics].median().add_suffix("_median"))
+        if "p90" in measures:
+            parts.append(grouped[metrics].quantile(0.9).add_suffix("_p90"))
+        # 통계 계산에 쓰인 표본 수 (0 이하/빈 값 제외)
+        parts.append(grouped[metrics].count().add_suffix("_n"))
+    return pd.concat(parts, axis=1) if parts else points
+
+def _timeseries_points_rollup(cube: pd.DataFrame, granularity: str, measures: list, metrics: list) -> pd.DataFrame:
+    """일별 롤업 큐브 → 버킷별 count/mean (합과 표본수로 계산, 원본 행을 읽지 않음)"""
+    if cube.empty:
+        return pd.DataFrame()
+    agg = rollup.aggregate(cube, _timeseries_buckets(cube["day"], granularity).rename("_bucket"), metrics)
+    cols = (["count"] if "count" in measures else [])
+    if metrics:
+        cols += ([f"{m}_mean" for m in metrics] if "mean" in measures else []) + [f"{m}_n" for m in metrics]
+    return agg[cols]
+
+def _timeseries_payload(points: pd.DataFrame, start: str, end: str, granularity: str,
+                        measures: list, metrics: list, source: str) -> dict:
+    """버킷 전체(빈 버킷 포함)로 펼쳐 차트용 포인트 목록 구성"""
+    start_ts = pd.to_datetime(start)
+    end_ts = pd.to_datetime(end)
+    full_index = pd.DatetimeIndex(sorted(set(_timeseries_buckets(
+        pd.Series(pd.date_range(start_ts, end_ts, freq="D")), granularity))))
+
+    # 데이터가 없는 버킷/필터 결과가 빈 경우에도 같은 키 구성을 유지
+    columns = (["count"] if "count" in measures else []) + [
+        f"{m}_{measure}" for measure in ("mean", "median", "p90") if measure in measures for m in metrics
+    ] + ([f"{m}_n" for m in metrics] if {"mean", "median", "p90"} & set(measures) else [])
+    points = points.reindex(index=full_index, columns=columns)
+    for c in points.columns:
+        if c == "count" or c.endswith("_n"):
+            points[c] = points[c].fillna(0).astype(int)
+
+    out = []
+    records = points.to_dict(orient="records") if columns else [{} for _ in range(len(points))]
+    for ts, row in zip(points.index, records):
+        item = {"period": ts.strftime("%Y-%m-%d"), "x축": _timeseries_label(ts, granularity)}
+        if granularity == "week":
+            iso = ts.isocalendar()
+            item["isoWeek"] = f"{iso[0]}-W{iso[1]:02d}"
+        for k, v in row.items():
+            item[k] = None if (isinstance(v, float) and not np.isfinite(v)) else (round(v, 2) if isinstance(v, float) else v)
+        out.append(item)
+
+    return {
+        "granularity": granularity,
+        "unit": "minutes",
+        "measures": measures,
+        "metrics": metrics,
+        "source": source,
+        "points": out,
+    }
+
+@app.get("/api/timeseries")
+async def timeseries(
+    start: str = Query(...),
+    end: str = Query(...),
+    granularity: str = Query("day"),
+    measures: str = Query("count,mean"),
+    metrics: Optional[str] = Query(None),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """
+    트렌드 차트용 시계열 집계. /api/period-data와 같은 유형 필터를 받는다.
+    - granularity: day | week(ISO 주, 월요일 시작) | month
+    - measures: count, mean, median, p90 (CSV)
+    - metrics: 소요시간 컬럼 (CSV, 기본: 4개 전부). 값은 분 단위, 0 이하/빈 값 제외
+    """
+    gran = TIMESERIES_GRANULARITY.get(_norm(granularity))
+    if gran is None:
+        raise HTTPException(status_code=400, detail=f"granularity는 day/week/month 중 하나여야 합니다: {granularity}")
+    measure_list = [m for m in (_norm(x) for x in _parse_values(measures)) if m in TIMESERIES_MEASURES]
+    if not measure_list:
+        raise HTTPException(status_code=400, detail=f"measures는 {TIMESERIES_MEASURES} 중 하나 이상이어야 합니다")
+    metric_list = _parse_values(metrics) if metrics else list(DURATION_COLUMNS)
+    unknown = [m for m in metric_list if m not in DURATION_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 metrics: {unknown}")
+
+    try:
+        end = limit_end_date(end)
+        고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차 = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+        filters = (고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차)
+
+        if set(measure_list) <= {"count", "mean"}:
+            # count/mean은 합산 가능한 값이므로 일별 롤업 큐브에서 계산
+            def _build_from_rollup():
+                cube = rollup.load_rollup(start, end)
+                if not cube.empty:
+                    cube, _, _ = _apply_type_filters(cube, *filters)
+                points = _timeseries_points_rollup(cube, gran, measure_list, metric_list)
+                return _timeseries_payload(points, start, end, gran, measure_list, metric_list, "rollup")
+
+            return await run_blocking(_build_from_rollup)
+
+        # median/p90은 원본 행에서 계산
+        df = await get_cached_data(start, end, refresh_mode="cache")
+
+        def _build():
+            filtered = df
+            if not filtered.empty:
+                filtered, _, _ = _apply_type_filters(filtered, *filters)
+            points = _timeseries_points(filtered, gran, measure_list, metric_list)
+            return _timeseries_payload(points, start, end, gran, measure_list, metric_list, "rows")
+
+        return await run_blocking(_build)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"시계열 집계 실패: {str(e)}")
+
+# 5-2-3. 소요시간 분위수 (app/db/quantile_sketch.py: 일 × 차원별 DDSketch 병합, 원본 행을 읽지 않음)
+PERCENTILE_DEFAULT = "50,90,95,99"
+
+def _parse_percentiles(value: str) -> list:
+    """"50,90" / "p95" / "0.99" → [50.0, 90.0, ...] (0 초과 100 이하, 입력 순서 유지)"""
+    out = []
+    for raw in _parse_values(value):
+        text = _norm(raw).lstrip("p")
+        try:
+            q = float(text)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"percentiles 값이 올바르지 않습니다: {raw}")
+        if 0 < q < 1 and "." in text:
+            q *= 100
+        if not 0 < q <= 100:
+            raise HTTPException(status_code=400, detail=f"percentiles는 0 초과 100 이하여야 합니다: {raw}")
+        if q not in out:
+            out.append(q)
+    if not out:
+        raise HTTPException(status_code=400, detail="percentiles가 비어 있습니다")
+    return out
+
+def _percentile_label(q: float) -> str:
+    return f"p{int(q)}" if float(q).is_integer() else f"p{q:g}"
+
+def _percentiles_payload(start: str, end: str, filters: tuple, metrics: list, qs: list) -> dict:
+    """스케치 로드 → 유형 필터 → 병합 (블로킹 풀에서 실행)"""
+    sketches = quantile_sketch.load_sketches(start, end)
+    if not sketches.empty:
+        sketches, _, _ = _apply_type_filters(sketches, *filters)
+    merged = quantile_sketch.merge_quantiles(sketches, metrics, [q / 100 for q in qs])
+    labels = [_percentile_label(q) for q in qs]
+    return {
+        "unit": "minutes",
+        "source": "sketch",
+        "relativeAccuracy": quantile_sketch.SKETCH_RELATIVE_ACCURACY,
+        "percentiles": labels,
+        "metrics": {
+            m: {"count": r["count"],
+                **{label: (round(v, 2) if v is not None else None)
+                   for label, v in zip(labels, r["values"])}}
+            for m, r in merged.items()
+        },
+    }
+
+@app.get("/api/percentiles")
+async def duration_percentiles(
+    start: str = Query(...),
+    end: str = Query(...),
+    percentiles: str = Query(PERCENTILE_DEFAULT),
+    metrics: Optional[str] = Query(None),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """
+    소요시간 분위수 (분 단위, 0 이하/빈 값 제외). /api/period-data와 같은 유형 필터를 받는다.
+    - percentiles: CSV (기본 50,90,95,99). "p95", "0.95"도 허용
+    - metrics: 소요시간 컬럼 (CSV, 기본: 4개 전부)
+    값은 상대 오차 SKETCH_RELATIVE_ACCURACY 이내의 근사값이다.
+    """
+    qs = _parse_percentiles(percentiles)
+    metric_list = _parse_values(metrics) if metrics else list(DURATION_COLUMNS)
+    unknown = [m for m in metric_list if m not in DURATION_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 metrics: {unknown}")
+
+    try:
+        end = limit_end_date(end)
+        filters = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+
+        return await run_blocking(_percentiles_payload, start, end, filters, metric_list, qs)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"분위수 집계 실패: {str(e)}")
+
+# 5-2-4. SLA 구간 스택 / 처리시간 밀도 히스토그램 (app/sla_histogram.py, 차트에 바로 그릴 값)
+SLA_GROUP_ALIASES = {"고객유형": "고객유형_1차", "문의유형": "문의유형_1차", "서비스유형": "서비스유형_1차"}
+SLA_GROUP_COLUMNS = [sla_histogram_mod.HANDLING_GROUP] + list(tag_index.TAG_DIMENSIONS)
+
+def _parse_edges(value: Optional[str]) -> list:
+    """"0,240,480,720,inf" → 오름차순 경계 목록 (2개 이상)"""
+    if not value:
+        return list(sla_histogram_mod.DEFAULT_EDGES)
+    edges = []
+    for raw in _parse_values(value):
+        try:
+            edges.append(math.inf if _norm(raw) in ("inf", "infinity", "∞") else float(raw))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"edges 값이 올바르지 않습니다: {raw}")
+    if len(edges) < 2 or any(b <= a for a, b in zip(edges, edges[1:])):
+        raise HTTPException(status_code=400, detail="edges는 2개 이상의 증가하는 값이어야 합니다")
+    return edges
+
+@app.get("/api/sla-histogram")
+async def sla_histogram(
+    start: str = Query(...),
+    end: str = Query(...),
+    metric: str = Query("operationResolutionTime"),
+    groupBy: str = Query(sla_histogram_mod.HANDLING_GROUP),
+    edges: Optional[str] = Query(None),
+    binCount: int = Query(40, ge=1, le=500),
+    cap: Optional[float] = Query(None, gt=0),
+    smooth: int = Query(2, ge=0, le=50),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """
+    SLA 스택 막대 + 처리시간 밀도 곡선용 집계. /api/period-data와 같은 유형 필터를 받는다.
+    - metric: 소요시간 컬럼 (기본 operationResolutionTime), 분 단위
+    - groupBy: 처리유형(기본, 자체해결/이관/처리불가 규칙) 또는 유형/mediumType/direction 컬럼
+    - edges: 스택 구간 경계 CSV (기본 0,240,480,720,inf)
+    - binCount/cap/smooth: 밀도 칸 수, 상한(분, 기본 max(30, P95)), 이동평균 칸 수
+    """
+    if metric not in DURATION_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 metric: {metric}")
+    group_by = SLA_GROUP_ALIASES.get(groupBy.strip(), groupBy.strip())
+    if group_by not in SLA_GROUP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"groupBy는 {SLA_GROUP_COLUMNS} 중 하나여야 합니다: {groupBy}")
+    edge_list = _parse_edges(edges)
+
+    try:
+        end = limit_end_date(end)
+        filters = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+        params = (start, end, metric, group_by, tuple(edge_list), binCount, cap, smooth, _filter_key(*filters))
+        cache_key = await _result_key("sla_histogram", params, ("userchats",), start, end)
+        hit = result_cache.get(cache_key)
+        if hit is not None:
+            return _cached_json_response(hit)
+
+        clauses = _type_filter_clauses(*filters)
+        df = await get_cached_data(
+            start, end, refresh_mode="cache",
+            partition_filter=_type_partition_filter(clauses) if clauses else None,
+        )
+
+        def _build():
+            frame = df
+            if not frame.empty:
+                frame, _, _ = _apply_type_filters(frame, *filters, prefiltered=True)
+            return sla_histogram_mod.sla_histogram(frame, metric, group_by, edge_list, binCount, smooth, cap)
+
+        payload = await run_blocking(_build)
+        return await _json_response_cached(payload, cache_key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"SLA 히스토그램 집계 실패: {str(e)}")
+
+# 5-2-5. 요일 × 시간대 문의량 (app/db/heatmap.py 큐브 → 7×24 행렬)
+def _heatmap_payload(start: str, end: str, filters: tuple, value_filters: list,
+                     split: Optional[str] = None) -> dict:
+    """큐브 로드 → 유형/값 필터 → 행렬 (블로킹 풀에서 실행)"""
+    cube = heatmap.load_heatmap(start, end)
+    if not cube.empty:
+        cube, _, _ = _apply_type_filters(cube, *filters)
+        for col, vals in value_filters:
+            cube = cube[normalize_tag_series(cube[col]).isin(vals)]
+    return heatmap.heatmap_payload(cube, split)
+
+@app.get("/api/heatmap")
+async def volume_heatmap(
+    start: str = Query(...),
+    end: str = Query(...),
+    split: Optional[str] = Query(None),
+    direction: Optional[str] = Query(None),
+    mediumType: Optional[str] = Query(None),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """
+    요일(0=일 ~ 6=토) × 시(0~23) 문의 건수. /api/period-data와 같은 유형 필터를 받는다.
+    - split: direction(IB/OB) | medium(phone/chat) | 문의유형 — 그룹별 행렬을 splits에 추가
+    - direction / mediumType: CSV 값 필터 (예: direction=IB)
+    """
+    split_key = split.strip() if split else None
+    if split_key and split_key not in heatmap.SPLITS:
+        raise HTTPException(status_code=400, detail=f"split은 {list(heatmap.SPLITS)} 중 하나여야 합니다: {split}")
+
+    try:
+        end = limit_end_date(end)
+        filters = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+        value_filters = [(col, {_norm(v) for v in _parse_values(val)})
+                         for col, val in (("direction", direction), ("mediumType", mediumType))
+                         if val and _norm(val) != _norm("전체")]
+
+        return await run_blocking(_heatmap_payload, start, end, filters, value_filters, split_key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"요일/시간대 집계 실패: {str(e)}")
+
+# 5-2-6. 재문의 / 코호트 (app/db/contact_index.py: userId별 문의 인덱스 + searchsorted)
+# direction 기본 IB(고객이 먼저 문의한 건), 유선은 같은 날짜·같은 userId를 1건으로 (manager-stats와 동일)
+CONTACT_GROUP_ALIASES = {"문의유형": "문의유형_1차", "medium": "mediumType"}
+CONTACT_GROUP_COLUMNS = ["문의유형_1차", "mediumType", "direction"]
+
+def _contact_directions(direction: str) -> list:
+    return [v.strip().upper() for v in _parse_values(direction)]
+
+async def _contact_response(name: str, params: tuple, key_start: str, end: str, builder, *args) -> Response:
+    """재문의/코호트 공통: 결과 캐시 조회 → 블로킹 풀에서 계산 → 캐시 저장"""
+    cache_key = await _result_key(name, params, ("userchats",), key_start, end)
+    hit = result_cache.get(cache_key)
+    if hit is not None:
+        return _cached_json_response(hit)
+    payload = await run_blocking(builder, *args)
+    return await _json_response_cached(payload, cache_key)
+
+def _repeat_contacts_payload(start: str, end: str, directions: list, dedup_phone: bool,
+                             window_days: int, min_contacts: int) -> dict:
+    frame = contact_index.load_contacts(start, end, directions, dedup_phone)
+    return {"start": start, "end": end, "direction": directions or None, "dedupPhone": dedup_phone,
+            **contact_index.repeat_summary(frame, window_days, min_contacts)}
+
+def _recontact_payload(start: str, end: str, directions: list, dedup_phone: bool,
+                       within_days: int, qs: list, group_by: Optional[str]) -> dict:
+    frame = contact_index.load_contacts(start, end, directions, dedup_phone)
+    return {"start": start, "end": end, "direction": directions or None, "dedupPhone": dedup_phone,
+            **contact_index.recontact_intervals(frame, within_days, [q / 100 for q in qs], group_by)}
+
+def _cohorts_payload(start: str, end: str, directions: list, dedup_phone: bool, periods: int) -> dict:
+    # 첫 문의 월을 정하려면 start 이전 이력도 필요 → 캐시에 있는 가장 이른 월부터
+    frame = contact_index.load_contacts(None, end, directions, dedup_phone)
+    return {"start": start, "end": end, "direction": directions or None, "dedupPhone": dedup_phone,
+            **contact_index.cohort_retention(frame, start, end, periods)}
+
+@app.get("/api/repeat-contacts")
+async def repeat_contacts(
+    start: str = Query(...),
+    end: str = Query(...),
+    window_days: int = Query(30, ge=1, le=366),
+    min_contacts: int = Query(3, ge=2, le=100),
+    direction: str = Query("IB"),
+    dedup_phone: bool = Query(True),
+):
+    """
+    기간 내 고객 재문의 요약.
+    - repeatCustomers: 기간 내 2회 이상 문의한 고객
+    - burstCustomers: 어느 window_days일 구간 안에서든 min_contacts회 이상 문의한 고객
+    - distribution: 고객별 문의 횟수 분포 (1, 2, 3, 4, 5+)
+    - direction: CSV (기본 IB, '전체'면 IB/OB 모두)
+    """
+    try:
+        end = limit_end_date(end)
+        directions = _contact_directions(direction)
+        params = (start, end, tuple(directions), dedup_phone, window_days, min_contacts)
+        return await _contact_response("repeat_contacts", params, start, end, _repeat_contacts_payload,
+                                       start, end, directions, dedup_phone, window_days, min_contacts)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"재문의 집계 실패: {str(e)}")
+
+@app.get("/api/recontact-intervals")
+async def recontact_intervals(
+    start: str = Query(...),
+    end: str = Query(...),
+    within_days: int = Query(7, ge=1, le=366),
+    percentiles: str = Query("50,90"),
+    groupBy: Optional[str] = Query(None),
+    direction: str = Query("IB"),
+    dedup_phone: bool = Query(True),
+):
+    """
+    같은 고객의 연속 문의 간격(시간 단위): 분위수, 구간 분포, within_days일 안 재문의율.
+    - groupBy: 문의유형_1차 | mediumType | direction — 앞 문의의 값별 재문의율 (groups)
+    """
+    qs = _parse_percentiles(percentiles)
+    group_by = None
+    if groupBy:
+        group_by = CONTACT_GROUP_ALIASES.get(groupBy.strip(), groupBy.strip())
+        if group_by not in CONTACT_GROUP_COLUMNS:
+            raise HTTPException(status_code=400, detail=f"groupBy는 {CONTACT_GROUP_COLUMNS} 중 하나여야 합니다: {groupBy}")
+    try:
+        end = limit_end_date(end)
+        directions = _contact_directions(direction)
+        params = (start, end, tuple(directions), dedup_phone, within_days, tuple(qs), group_by)
+        return await _contact_response("recontact_intervals", params, start, end, _recontact_payload,
+                                       start, end, directions, dedup_phone, within_days, qs, group_by)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"재문의 간격 집계 실패: {str(e)}")
+
+@app.get("/api/cohorts")
+async def cohorts(
+    start: str = Query(...),
+    end: str = Query(...),
+    periods: int = Query(6, ge=0, le=24),
+    direction: str = Query("IB"),
+    dedup_phone: bool = Query(True),
+):
+    """
+    첫 문의 월 코호트별 재문의 유지율. start~end 월에 처음 문의한 고객을 코호트로 묶고
+    0~periods개월 뒤 다시 문의한 고객 수(active)와 비율(retention, %)을 준다. end 이후 칸은 None.
+    첫 문의 월은 캐시에 있는 전체 이력 기준이다.
+    """
+    try:
+        end = limit_end_date(end)
+        directions = _contact_directions(direction)
+        months = cached_partition_months("userchats")
+        key_start = f"{months[0]}-01" if months else start
+        params = (start, end, tuple(directions), dedup_phone, periods)
+        return await _contact_response("cohorts", params, key_start, end, _cohorts_payload,
+                                       start, end, directions, dedup_phone, periods)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"코호트 집계 실패: {str(e)}")
+
 # 5-3. CSAT "행" 조회(캐시 전용)
 @app.get("/api/csat/rows")
-async def csat_rows(start: str = Query(...), end: str = Query(...)):
+def csat_rows(start: str = Query(...), end: str = Query(...)):
     """
     평소 사용 경로. 절대로 원격 API를 호출하지 않고, csat_YYYY-MM 캐시만 로드해서 반환.
     """
@@ -702,10 +1423,8 @@ async def csat_rows(start: str = Query(...), end: str = Query(...)):
         if df is None or df.empty:
             return []
         
-        # NaN/Inf 값 제거
-        df = df.replace([np.inf, -np.inf], np.nan)
-        data_dict = df.to_dict(orient="records")
-        return _sanitize_json(data_dict)
+        # NaN/Inf 정리 + 직렬화 (datetime은 기존처럼 isoformat 그대로)
+        return FastJSONResponse(frame_to_records(df, datetime_format=None))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"CSAT 캐시 조회 실패: {str(e)}")
 
@@ -724,14 +1443,105 @@ async def csat_refresh(start: str = Query(...), end: str = Query(...)):
         raise HTTPException(status_code=500, detail=f"CSAT 강제 갱신 실패: {str(e)}")
 
 # 5-6. 담당자별 통계 (managerIds와 assigneeId가 동일한 경우만 집계)
+def _manager_stats_payload(df: pd.DataFrame, bridge: pd.DataFrame, directory: dict) -> dict:
+    """
+    담당자별 문의량/문의유형 비율 집계 (블로킹 풀에서 실행).
+    bridge: 파티션 저장 시 만든 (userChatId, managerId) 브리지 테이블 (app/db/managers.py)
+    - managerIds 중 하나가 assigneeId와 같은 채팅만 대상 (assigneeMatch)
+    - 대상 채팅은 managerIds에 포함된 디렉터리 담당자 각각에게 집계
+    """
+    empty = {"manager_counts": [], "manager_inquiry_types": {}}
+    if df.empty or bridge.empty or "userChatId" not in df.columns:
+        return empty
+
+    # 브리지 → 기간 필터된 df의 행 위치 (df 행 순서 유지)
+    b = bridge[bridge["assigneeMatch"].to_numpy() & bridge["managerId"].isin(list(directory)).to_numpy()]
+    pos = pd.Index(df["userChatId"].astype(str)).get_indexer(b["userChatId"])
+    keep = pos >= 0
+    if not keep.any():
+        return empty
+    pos = pos[keep]
+    order = np.argsort(pos, kind="stable")
+    pos = pos[order]
+    managers = b["managerId"].to_numpy(dtype=object)[keep][order]
+
+    def _col(name):
+        if name in df.columns:
+            return df[name].to_numpy(dtype=object)[pos]
+        return np.full(len(pos), None, dtype=object)
+
+    medium = _col("mediumType")
+    inquiry = pd.Series(_col("문의유형"))
+    missing = inquiry.isna() | (inquiry == "")
+    first = df["firstAskedAt"] if "firstAskedAt" in df.columns else pd.Series(pd.NaT, index=df.index)
+    x = pd.DataFrame({
+        "managerId": managers,
+        "is_phone": medium == "phone",
+        "direction": _col("direction"),
+        "userId": _col("userId"),
+        "date_only": pd.to_datetime(first, errors="coerce").dt.normalize().to_numpy()[pos],
+        "문의유형": inquiry.astype(str).str.strip().where(~missing, "미분류").to_numpy(),
+    })
+
+    # 1. 담당자별 문의량: 유선은 같은 날짜·같은 userId 중복 제거 후 IB/OB 집계
+    totals = x.groupby("managerId", sort=False).size()
+    chats = x.loc[~x["is_phone"]].groupby("managerId", sort=False).size()
+    phone = x.loc[x["is_phone"]].drop_duplicates(subset=["managerId", "userId", "date_only"], keep="first")
+    phones = phone.groupby("managerId", sort=False).size()
+    phone_dir = phone.groupby(["managerId", "direction"], sort=False).size()
+
+    manager_counts = []
+    for manager_id, manager_name in directory.items():
+        manager_counts.append({
+            "managerId": manager_id,
+            "managerName": manager_name,
+            "total": int(totals.get(manager_id, 0)),
+            "chat": int(chats.get(manager_id, 0)),
+            "phone": int(phones.get(manager_id, 0)),
+            "phoneIB": int(phone_dir.get((manager_id, "IB"), 0)),
+            "phoneOB": int(phone_dir.get((manager_id, "OB"), 0)),
+        })
+    # 문의량 순으로 정렬
+    manager_counts.sort(key=lambda r: r["total"], reverse=True)
+
+    # 2. 담당자별 문의유형 비율: 건수 내림차순 (같으면 먼저 나온 유형 순)
+    type_counts = x.groupby(["managerId", "문의유형"], sort=False).size().reset_index(name="count")
+    manager_inquiry_types = {}
+    for manager_id, manager_name in directory.items():
+        total = int(totals.get(manager_id, 0))
+        if total == 0:
+            continue
+        rows = type_counts[type_counts["managerId"] == manager_id].sort_values("count", ascending=False, kind="stable")
+        manager_inquiry_types[manager_id] = {
+            "managerName": manager_name,
+            "total": total,
+            "inquiryTypes": [
+                {"문의유형": t, "count": int(c), "ratio": round((int(c) / total) * 100, 1)}
+                for t, c in zip(rows["문의유형"], rows["count"])
+            ],
+        }
+
+    return {
+        "manager_counts": manager_counts,
+        "manager_inquiry_types": manager_inquiry_types
+    }
+
 @app.get("/api/manager-stats")
 async def manager_stats(start: str = Query(...), end: str = Query(...)):
     """
     담당자별 문의량과 문의유형 비율을 반환합니다.
     managerIds와 assigneeId가 동일한 경우만 집계합니다.
+    담당자 목록은 담당자 디렉터리(/api/managers)를 따릅니다.
     """
     try:
         end = limit_end_date(end)
+        directory = await run_blocking(load_manager_directory)
+        cache_key = await _result_key("manager_stats", (start, end, tuple(directory.items())),
+                                      ("userchats",), start, end)
+        hit = result_cache.get(cache_key)
+        if hit is not None:
+            return _cached_json_response(hit)
+
         df = await get_cached_data(start, end, refresh_mode="cache")
         
         if df is None or df.empty:
@@ -741,200 +1551,9 @@ async def manager_stats(start: str = Query(...), end: str = Query(...)):
                 "manager_inquiry_types": {}
             }
         
-        # 담당자 ID -> 이름 매핑
-        manager_map = {
-            "557191": "안예은",
-            "547547": "조용준",
-            "531024": "우지훈"
-        }
-        
-        # managerIds 리스트에 assigneeId와 동일한 값이 있는 경우만 필터링
-        def _check_manager_match(manager_ids, assignee_id):
-            """managerIds 리스트에 assigneeId와 동일한 값이 있는지 확인"""
-            try:
-                if hasattr(manager_ids, '__iter__') and not isinstance(manager_ids, (str, list)):
-                    manager_ids = list(manager_ids)
-                if hasattr(assignee_id, '__iter__') and not isinstance(assignee_id, (str, int, float)):
-                    assignee_id = list(assignee_id)[0] if len(list(assignee_id)) > 0 else None
-                
-                if assignee_id is None:
-                    return False
-                if manager_ids is None:
-                    return False
-                
-                try:
-                    if pd.isna(assignee_id):
-                        return False
-                except (ValueError, TypeError):
-                    pass
-                
-                try:
-                    if pd.isna(manager_ids):
-                        return False
-                except (ValueError, TypeError):
-                    pass
-                
-                assignee_str = str(assignee_id).strip()
-                
-                if isinstance(manager_ids, list):
-                    for mgr_id in manager_ids:
-                        if str(mgr_id).strip() == assignee_str:
-                            return True
-                    return False
-                else:
-                    return str(manager_ids).strip() == assignee_str
-            except Exception as e:
-                print(f"[MANAGER_STATS] _check_manager_match 오류: {e}")
-                return False
-        
-        # managerIds와 assigneeId가 동일한 행만 필터링
-        filtered_df = df.copy()
-        
-        if "managerIds" not in filtered_df.columns:
-            filtered_df["managerIds"] = None
-        if "assigneeId" not in filtered_df.columns:
-            filtered_df["assigneeId"] = None
-        
-        def _check_match_row(row):
-            try:
-                return _check_manager_match(row.get("managerIds"), row.get("assigneeId"))
-            except Exception as e:
-                print(f"[MANAGER_STATS] _check_match_row 오류: {e}")
-                return False
-        
-        mask = filtered_df.apply(_check_match_row, axis=1)
-        filtered_df = filtered_df[mask].copy()
-        
-        if filtered_df.empty:
-            return {
-                "manager_counts": [],
-                "manager_inquiry_types": {}
-            }
-        
-        # 1. 담당자별 문의량 집계
-        def _has_manager_id(manager_ids, target_id):
-            """managerIds 리스트에 target_id가 있는지 확인"""
-            try:
-                if hasattr(manager_ids, '__iter__') and not isinstance(manager_ids, (str, list)):
-                    manager_ids = list(manager_ids)
-                
-                if pd.isna(manager_ids) or manager_ids is None:
-                    return False
-                target_str = str(target_id).strip()
-                if isinstance(manager_ids, list):
-                    for mgr_id in manager_ids:
-                        if str(mgr_id).strip() == target_str:
-                            return True
-                    return False
-                return str(manager_ids).strip() == target_str
-            except Exception as e:
-                print(f"[MANAGER_STATS] _has_manager_id 오류: {e}")
-                return False
-        
-        manager_counts = []
-        for manager_id, manager_name in manager_map.items():
-            # managerIds에 해당 ID가 포함된 행만 필터링
-            manager_mask = filtered_df["managerIds"].apply(
-                lambda mgr_ids: _has_manager_id(mgr_ids, manager_id)
-            )
-            manager_data = filtered_df[manager_mask].copy()
-            
-            if len(manager_data) == 0:
-                manager_counts.append({
-                    "managerId": manager_id,
-                    "managerName": manager_name,
-                    "total": 0,
-                    "chat": 0,
-                    "phone": 0,
-                    "phoneIB": 0,
-                    "phoneOB": 0
-                })
-                continue
-            
-            # mediumType과 direction 컬럼 확인
-            if "mediumType" not in manager_data.columns:
-                manager_data["mediumType"] = None
-            if "direction" not in manager_data.columns:
-                manager_data["direction"] = None
-            
-            # 채팅 상담 (mediumType != "phone")
-            chat_count = len(manager_data[manager_data["mediumType"] != "phone"])
-            
-            # 유선 상담 (mediumType == "phone")
-            phone_data = manager_data[manager_data["mediumType"] == "phone"].copy()
-            
-            # 같은 날짜에 같은 userId가 여러 번 나타나면 중복 제거
-            if len(phone_data) > 0 and "userId" in phone_data.columns and "firstAskedAt" in phone_data.columns:
-                # firstAskedAt을 날짜만 추출 (시간 제외)
-                phone_data["date_only"] = pd.to_datetime(phone_data["firstAskedAt"], errors="coerce").dt.date
-                # userId와 날짜 기준으로 중복 제거 (첫 번째 것만 유지)
-                phone_data = phone_data.drop_duplicates(subset=["userId", "date_only"], keep="first")
-                # 임시 컬럼 제거
-                phone_data = phone_data.drop(columns=["date_only"])
-            
-            phone_count = len(phone_data)
-            
-            # 유선 상담 IB (mediumType == "phone" AND direction == "IB")
-            phone_ib_count = len(phone_data[phone_data["direction"] == "IB"])
-            
-            # 유선 상담 OB (mediumType == "phone" AND direction == "OB")
-            phone_ob_count = len(phone_data[phone_data["direction"] == "OB"])
-            
-            manager_counts.append({
-                "managerId": manager_id,
-                "managerName": manager_name,
-                "total": int(len(manager_data)),
-                "chat": int(chat_count),
-                "phone": int(phone_count),
-                "phoneIB": int(phone_ib_count),
-                "phoneOB": int(phone_ob_count)
-            })
-        
-        # 문의량 순으로 정렬
-        manager_counts.sort(key=lambda x: x["total"], reverse=True)
-        
-        # 2. 담당자별 문의유형 비율 집계
-        manager_inquiry_types = {}
-        for manager_id, manager_name in manager_map.items():
-            # managerIds에 해당 ID가 포함된 행만 필터링
-            manager_mask = filtered_df["managerIds"].apply(
-                lambda mgr_ids: _has_manager_id(mgr_ids, manager_id)
-            )
-            manager_data = filtered_df[manager_mask].copy()
-            if len(manager_data) == 0:
-                continue
-            
-            # 문의유형별 집계
-            inquiry_type_counts = {}
-            for _, row in manager_data.iterrows():
-                inquiry_type = row.get("문의유형")
-                if pd.isna(inquiry_type) or not inquiry_type:
-                    inquiry_type = "미분류"
-                else:
-                    inquiry_type = str(inquiry_type).strip()
-                
-                inquiry_type_counts[inquiry_type] = inquiry_type_counts.get(inquiry_type, 0) + 1
-            
-            # 비율 계산
-            total = len(manager_data)
-            inquiry_type_ratios = []
-            for inquiry_type, count in sorted(inquiry_type_counts.items(), key=lambda x: x[1], reverse=True):
-                inquiry_type_ratios.append({
-                    "문의유형": inquiry_type,
-                    "count": int(count),
-                    "ratio": round((count / total) * 100, 1) if total > 0 else 0.0
-                })
-            
-            manager_inquiry_types[manager_id] = {
-                "managerName": manager_name,
-                "total": int(total),
-                "inquiryTypes": inquiry_type_ratios
-            }
-        
-        return {
-            "manager_counts": manager_counts,
-            "manager_inquiry_types": manager_inquiry_types
-        }
+        bridge = await run_blocking(load_manager_bridge, _months_of(start, end))
+        payload = await run_blocking(_manager_stats_payload, df, bridge, directory)
+        return await _json_response_cached(payload, cache_key)
         
     except Exception as e:
         print(f"[MANAGER_STATS] 오류: {type(e).__name__}: {e}")
@@ -942,9 +1561,50 @@ async def manager_stats(start: str = Query(...), end: str = Query(...)):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"담당자별 통계 조회 실패: {str(e)}")
 
+# ---- CSAT 코멘트 목록 (app/csat_stats.comment_frame: 컬럼 단위 필터 + 최신순 정렬) ----
+def _frame_column(df: pd.DataFrame, col: str, default=None) -> pd.Series:
+    return df[col] if col in df.columns else pd.Series(default, index=df.index, dtype=object)
+
+def _pack_comments(df: pd.DataFrame, text_col: str, score_col_hint: str) -> dict:
+    """/api/csat-analysis comments 항목 — 태그는 프론트에서 userchats 캐시와 매칭해 채워줌"""
+    rows = comment_frame(df, text_col)
+    if rows.empty:
+        return {"total": 0, "data": []}
+    first = _frame_column(rows, "firstAskedAt")
+    packed = pd.DataFrame({
+        "firstAskedAt": pd.to_datetime(first, errors="coerce") if "firstAskedAt" in rows.columns else first,
+        "userId": _frame_column(rows, "userId"),
+        "personId": _frame_column(rows, "personId"),
+        "userChatId": _frame_column(rows, "userChatId"),
+        "text": rows["text"],
+        # 점수는 힌트 컬럼이 있으면 같이 내려줌(없어도 OK)
+        "score": (pd.to_numeric(rows[score_col_hint], errors="coerce")
+                  if score_col_hint in rows.columns else _frame_column(rows, score_col_hint)),
+    })
+    data = frame_to_records(packed, datetime_format=None)
+    return {"total": len(data), "data": data}
+
+CSAT_TEXT_TAG_COLUMNS = ["고객유형", "문의유형", "서비스유형"]
+
+def _text_comments(df: pd.DataFrame, text_col: str) -> list:
+    """/api/csat-text-analysis 항목 (firstAskedAt, userId, text, tags)"""
+    rows = comment_frame(df, text_col)
+    if rows.empty:
+        return []
+    packed = pd.DataFrame({
+        "firstAskedAt": rows["firstAskedAt"],
+        "userId": rows["userId"],
+        "text": rows["text"],
+        **{c: _frame_column(rows, c, "") for c in CSAT_TEXT_TAG_COLUMNS},
+    })
+    data = frame_to_records(packed, datetime_format=None)
+    for r in data:
+        r["tags"] = {c: r.pop(c) for c in CSAT_TEXT_TAG_COLUMNS}
+    return data
+
 # 5-5-1. CSAT 텍스트 분석 (comment_3, comment_6)
 @app.get("/api/csat-text-analysis")
-async def csat_text_analysis(start: str = Query(...), end: str = Query(...)):
+def csat_text_analysis(start: str = Query(...), end: str = Query(...)):
     """
     CSAT의 comment_3, comment_6 텍스트 데이터를 분석하여 반환합니다.
     """
@@ -958,38 +1618,9 @@ async def csat_text_analysis(start: str = Query(...), end: str = Query(...)):
         # NaN/Inf 값 제거
         csat_df = csat_df.replace([np.inf, -np.inf], np.nan)
         
-        # comment_3, comment_6 데이터 추출
-        comment_3_data = []
-        comment_6_data = []
-        
-        for _, row in csat_df.iterrows():
-            if pd.notna(row.get('comment_3')) and str(row['comment_3']).strip():
-                comment_3_data.append({
-                    "firstAskedAt": row['firstAskedAt'],
-                    "userId": row['userId'],
-                    "text": str(row['comment_3']).strip(),
-                    "tags": {
-                        "고객유형": row.get('고객유형', ''),
-                        "문의유형": row.get('문의유형', ''),
-                        "서비스유형": row.get('서비스유형', '')
-                    }
-                })
-            
-            if pd.notna(row.get('comment_6')) and str(row['comment_6']).strip():
-                comment_6_data.append({
-                    "firstAskedAt": row['firstAskedAt'],
-                    "userId": row['userId'],
-                    "text": str(row['comment_6']).strip(),
-                    "tags": {
-                        "고객유형": row.get('고객유형', ''),
-                        "문의유형": row.get('문의유형', ''),
-                        "서비스유형": row.get('서비스유형', '')
-                    }
-                })
-        
-        # 날짜순으로 정렬 (최신순)
-        comment_3_data.sort(key=lambda x: x.get('firstAskedAt', ''), reverse=True)
-        comment_6_data.sort(key=lambda x: x.get('firstAskedAt', ''), reverse=True)
+        # comment_3, comment_6 데이터 추출 (최신순)
+        comment_3_data = _text_comments(csat_df, "comment_3")
+        comment_6_data = _text_comments(csat_df, "comment_6")
         
         result = {
             "status": "success",
@@ -1003,158 +1634,656 @@ async def csat_text_analysis(start: str = Query(...), end: str = Query(...)):
             }
         }
         
-        return _sanitize_json(result)
+        return sanitize_json(result)
         
     except Exception as e:
         print(f"[CSAT_TEXT] 분석 실패: {type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail=f"CSAT 텍스트 분석 실패: {str(e)}")
 
+# 5-5-2. CSAT 코멘트 검색 (app/db/csat_search.py: 문자 n-gram 역색인 + BM25)
+CSAT_SEARCH_MAX_LIMIT = 200
+# 보강 CSAT 유형 컬럼(1차는 접미사 없음) → 유형 필터 컬럼
+CSAT_SEARCH_TYPE_COLUMNS = {"고객유형": "고객유형_1차", "문의유형": "문의유형_1차", "서비스유형": "서비스유형_1차"}
+
+def _csat_search_payload(q: str, start: str, end: str, fields: list, filters: tuple,
+                         limit: int, offset: int) -> dict:
+    """인덱스 로드 → 기간/코멘트 종류/유형 필터 → 검색 → 페이지 (블로킹 풀에서 실행)"""
+    terms = csat_search.query_terms(q)
+    corpus, indexes, starts = csat_search.load_corpus(_months_of(start, end))
+    if not corpus.empty:
+        s = pd.to_datetime(start)
+        e = pd.to_datetime(end) + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+        date = pd.to_datetime(corpus["date"], errors="coerce")
+        keep = (date >= s) & (date <= e)
+        if fields:
+            keep &= corpus["field"].isin(fields)
+        corpus = corpus[keep]
+        if not corpus.empty and _type_filter_clauses(*filters):
+            typed, _, _ = _apply_type_filters(corpus.rename(columns=CSAT_SEARCH_TYPE_COLUMNS), *filters)
+            corpus = corpus.loc[typed.index]
+    hits = csat_search.search(corpus, indexes, starts, terms)
+    page = hits.iloc[offset:offset + limit]
+    packed = pd.DataFrame({
+        "field": page["field"],
+        "text": page["text"],
+        "relevance": page["relevance"].round(4),
+        "csatDate": pd.to_datetime(page["date"], errors="coerce"),
+        "firstAskedAt": pd.to_datetime(page["firstAskedAt"], errors="coerce"),
+        "userId": page["userId"],
+        "userChatId": page["userChatId"],
+        "score": page["score"],
+        **{c: page[c] for c in ENRICH_COLUMNS},
+    })
+    results = frame_to_records(packed, datetime_format=ISO_MILLIS) if not packed.empty else []
+    for r in results:
+        r["tags"] = {c: r.pop(c) for c in ENRICH_COLUMNS}
+    return {
+        "query": q,
+        "terms": terms,
+        "total": int(len(hits)),
+        "searched": int(len(corpus)),
+        "offset": offset,
+        "limit": limit,
+        "results": results,
+    }
+
+@app.get("/api/csat/search")
+async def csat_comment_search(
+    q: str = Query(..., min_length=1),
+    start: str = Query(...),
+    end: str = Query(...),
+    field: str = Query("전체"),
+    limit: int = Query(20, ge=1, le=CSAT_SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """
+    CSAT 코멘트(comment_3, comment_6) 검색. 공백으로 나눈 단어를 모두 포함한 코멘트를 관련도(BM25)순으로.
+    - field: comment_3 | comment_6 (CSV, 기본 전체)
+    - 유형 필터는 코멘트가 달린 상담(userChatId)의 유형 기준 (/api/period-data와 같은 파라미터)
+    - limit/offset 페이지, total: 전체 일치 건수 (X-Total-Count 헤더에도)
+    """
+    terms = csat_search.query_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="검색어가 비어 있습니다")
+    fields = _parse_values(field)
+    unknown = [f for f in fields if f not in csat_search.TEXT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"field는 {list(csat_search.TEXT_FIELDS)} 중 하나여야 합니다: {unknown}")
+    try:
+        end = limit_end_date(end)
+        filters = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+        # 유형 컬럼은 보강 CSAT에서 붙으므로 기간 밖 의존 파티션 버전도 키에 넣는다
+        deps = await run_blocking(derived_dependency_versions, CSAT_ENRICHED_NAME, _months_of(start, end))
+        params = (tuple(terms), start, end, tuple(sorted(fields)), _filter_key(*filters), limit, offset,
+                  tuple(deps.items()))
+        cache_key = await _result_key("csat_search", params, ("csat", "userchats"), start, end)
+        hit = result_cache.get(cache_key)
+        if hit is not None:
+            return _cached_json_response(hit)
+        payload = await run_blocking(_csat_search_payload, q, start, end, fields, filters, limit, offset)
+        return await _json_response_cached(payload, cache_key, {"X-Total-Count": str(payload["total"])})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"CSAT 코멘트 검색 실패: {str(e)}")
+
+# 5-5-3. CSAT 키워드/구 빈도 (app/db/csat_keywords.py: 월별 빈도표를 일 단위로 합산)
+CSAT_KEYWORD_GROUPS = {"문의유형": "문의유형", "서비스유형": "서비스유형", "score": "band", "band": "band", "점수대": "band"}
+CSAT_KEYWORD_BANDS = list(csat_keywords.SCORE_BANDS) + [csat_keywords.NO_SCORE]
+
+def _previous_period(start: str, end: str) -> tuple:
+    """start~end 바로 앞의 같은 일수 기간"""
+    s, e = pd.to_datetime(start).normalize(), pd.to_datetime(end).normalize()
+    prev_end = s - pd.Timedelta(days=1)
+    return (prev_end - (e - s)).strftime("%Y-%m-%d"), prev_end.strftime("%Y-%m-%d")
+
+def _csat_keywords_payload(start: str, end: str, by: Optional[str], fields: list, bands: list,
+                           ngrams: list, top_k: int, min_count: int, compare: bool, sort: str) -> dict:
+    """빈도표 로드 → 필터 → 그룹별 상위 단어 (블로킹 풀에서 실행)"""
+    current = csat_keywords.filter_tables(csat_keywords.load_keyword_tables(start, end), fields, bands, ngrams)
+    previous, prev_range = None, None
+    if compare:
+        prev_range = _previous_period(start, end)
+        previous = csat_keywords.filter_tables(csat_keywords.load_keyword_tables(*prev_range), fields, bands, ngrams)
+    return {
+        "start": start,
+        "end": end,
+        "previous": {"start": prev_range[0], "end": prev_range[1]} if prev_range else None,
+        "by": by,
+        "ngram": ngrams,
+        "totals": csat_keywords.group_totals(current, by),
+        "previousTotals": csat_keywords.group_totals(previous, by) if previous is not None else None,
+        "groups": csat_keywords.top_terms(current, top_k, min_count, by, previous, sort),
+    }
+
+@app.get("/api/csat/keywords")
+async def csat_keywords_top(
+    start: str = Query(...),
+    end: str = Query(...),
+    top_k: int = Query(20, ge=1, le=200),
+    by: Optional[str] = Query(None),
+    field: str = Query("전체"),
+    band: str = Query("전체"),
+    ngram: str = Query("1,2"),
+    min_count: int = Query(1, ge=1),
+    compare: bool = Query(False),
+    sort: str = Query("count"),
+):
+    """
+    CSAT 코멘트 상위 단어/구 (코멘트 수 기준). 값은 "이 단어가 나온 코멘트 수"와 그룹 내 비율(share, %).
+    - by: 문의유형 | 서비스유형 | score(점수대: 낮음 1~2 / 보통 3 / 높음 4~5 / 없음) — 없으면 전체 한 그룹
+    - field: comment_3 | comment_6 (CSV), band: 점수대 CSV (예: band=낮음 → 불만 코멘트만)
+    - ngram: 1(단어), 2(이웃한 두 단어 구) CSV
+    - compare=true: 바로 앞 같은 길이 기간과 비교(prevCount, prevShare, change %p), sort=change로 증가폭순
+    """
+    group_by = None
+    if by:
+        group_by = CSAT_KEYWORD_GROUPS.get(by.strip())
+        if group_by is None:
+            raise HTTPException(status_code=400, detail=f"by는 {list(CSAT_KEYWORD_GROUPS)} 중 하나여야 합니다: {by}")
+    fields = _parse_values(field)
+    unknown = [f for f in fields if f not in csat_search.TEXT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"field는 {list(csat_search.TEXT_FIELDS)} 중 하나여야 합니다: {unknown}")
+    bands = _parse_values(band)
+    unknown = [b for b in bands if b not in CSAT_KEYWORD_BANDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"band는 {CSAT_KEYWORD_BANDS} 중 하나여야 합니다: {unknown}")
+    try:
+        ngrams = sorted({int(v) for v in _parse_values(ngram)})
+    except ValueError:
+        ngrams = []
+    if not ngrams or any(n not in (1, 2) for n in ngrams):
+        raise HTTPException(status_code=400, detail=f"ngram은 1, 2 중 하나 이상이어야 합니다: {ngram}")
+    sort_key = _norm(sort)
+    if sort_key not in ("count", "change"):
+        raise HTTPException(status_code=400, detail=f"sort는 count 또는 change여야 합니다: {sort}")
+    try:
+        end = limit_end_date(end)
+        key_start = _previous_period(start, end)[0] if compare else start
+        # 유형은 기간 밖 상담 파티션에서도 붙으므로 빈도표가 기록한 의존 파티션 버전도 키에 넣는다
+        deps = await run_blocking(derived_dependency_versions, csat_keywords.CSAT_KEYWORDS_NAME,
+                                  _months_of(key_start, end))
+        params = (start, end, group_by, tuple(sorted(fields)), tuple(sorted(bands)), tuple(ngrams),
+                  top_k, min_count, compare, sort_key, tuple(deps.items()))
+        cache_key = await _result_key("csat_keywords", params, ("csat", "userchats"), key_start, end)
+        hit = result_cache.get(cache_key)
+        if hit is not None:
+            return _cached_json_response(hit)
+        payload = await run_blocking(_csat_keywords_payload, start, end, group_by, fields, bands, ngrams,
+                                     top_k, min_count, compare, sort_key)
+        return await _json_response_cached(payload, cache_key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"CSAT 키워드 집계 실패: {str(e)}")
+
 # 5-5. CSAT 분석 결과 (프론트엔드 호환성)
+def _csat_analysis_payload(csat_df: pd.DataFrame) -> dict:
+    """코멘트/요약/유형별 집계 (블로킹 풀에서 실행). csat_df는 유형 보강 CSAT 행"""
+    # ---- 코멘트 payload (프론트 상세의견용) ----
+    comments_payload = {
+        "comment_3": _pack_comments(csat_df, "comment_3", "A-2"),
+        "comment_6": _pack_comments(csat_df, "comment_6", "A-5"),
+    }
+
+    # ---- 기본 요약 (A-1/2/4/5) ----
+    score_cols = [c for c in ["A-1", "A-2", "A-4", "A-5"] if c in csat_df.columns]
+
+    # ✅ 공통 분모(대상자수) = 설문 워크플로우 시작자 수로 산정, 총응답수 = 공통 분모
+    summary = build_csat_summary(csat_df, score_cols)
+    summary_list = summary["요약"]
+    total_responses = int(summary["총응답수"])
+
+    # ---- 유형별 집계 : 보강 CSAT 파티션(상담 userChatId로 유형이 붙어 있음)의 매칭 행만 ----
+    type_scores = {}
+    try:
+        if MATCHED_COLUMN in csat_df.columns:
+            enriched = csat_df[csat_df[MATCHED_COLUMN].astype(bool)]
+            if not enriched.empty:
+                scores = build_csat_type_scores(enriched.drop(columns=[MATCHED_COLUMN]))
+                type_scores = sanitize_json(scores)   # ✅ NaN/Inf/numpy 스칼라 전부 정리
+    except Exception as e:
+        print(f"[CSAT] 유형별 집계 스킵: {type(e).__name__}: {e}")
+        type_scores = {}
+
+    # ---- 최종 응답 ----
+
+    resp = {
+        "status": "success",
+        "총응답수": total_responses,
+        "요약": summary_list,
+        "유형별": type_scores,     # 조인 안되면 {}
+        "comments": comments_payload,
+    }
+
+    # ✅ NaN/Inf/numpy 스칼라 전부 정리
+    return sanitize_json(resp)
+
+def _csat_empty_payload() -> dict:
+    return {"status": "success", "총응답수": 0, "요약": [], "유형별": {}, "comments": {
+        "comment_3": {"total": 0, "data": []},
+        "comment_6": {"total": 0, "data": []},
+    }}
+
+def _load_csat_analysis_rows(start: str, end: str) -> pd.DataFrame:
+    """유형이 미리 붙은 CSAT 파티션 (없으면 기존 CSAT 캐시, 유형별 집계는 생략)"""
+    csat_df = load_enriched_csat_rows(start, end)
+    if csat_df is None:
+        csat_df = load_csat_rows_from_cache(start, end)
+    return csat_df
+
 @app.get("/api/csat-analysis")
 async def csat_analysis(start: str = Query(...), end: str = Query(...)):
     """
     캐시 전용 CSAT 분석:
     - 절대 외부 API 호출 안 함
-    - userId/조인키가 없어도 500 던지지 않고 가능한 결과만 반환
+    - 유형별 집계는 유형 보강 CSAT 파티션(app/db/csat_enriched.py)을 사용, 없으면 생략
+    - 어떤 경우에도 500 던지지 않고 가능한 결과만 반환
     - 상세 코멘트 포함(comments.comment_3 / comments.comment_6)
     """
     try:
         end = limit_end_date(end)
-        csat_df = load_csat_rows_from_cache(start, end)
+        # 유형은 기간 밖 상담 파티션에서도 붙으므로 보강 CSAT의 의존 파티션 버전도 키에 넣는다
+        deps = await run_blocking(derived_dependency_versions, CSAT_ENRICHED_NAME, _months_of(start, end))
+        cache_key = await _result_key("csat_analysis", (start, end, tuple(deps.items())),
+                                      ("csat", "userchats"), start, end)
+        hit = result_cache.get(cache_key)
+        if hit is not None:
+            return _cached_json_response(hit)
+
+        csat_df = await run_blocking(_load_csat_analysis_rows, start, end)
 
         # 비어 있으면 빈 성공 응답
         if csat_df is None or csat_df.empty:
-            return {"status": "success", "총응답수": 0, "요약": [], "유형별": {}, "comments": {
-                "comment_3": {"total": 0, "data": []},
-                "comment_6": {"total": 0, "data": []},
-            }}
+            return _csat_empty_payload()
 
-        import pandas as pd
-        import numpy as np
+        safe_payload = await run_blocking(_csat_analysis_payload, csat_df)
+        return await _json_response_cached(safe_payload, cache_key)
 
-        # ---- 코멘트 payload (프론트 상세의견용) ----
-        def _clean_ts(v):
-            try:
-                if pd.isna(v): return None
-                return pd.to_datetime(v, errors="coerce").isoformat()
-            except Exception:
-                return None
-
-        def _pack_comments(df, text_col, score_col_hint):
-            data = []
-            if text_col in df.columns:
-                for _, r in df.iterrows():
-                    txt = r.get(text_col)
-                    if pd.notna(txt) and str(txt).strip():
-                        data.append({
-                            "firstAskedAt": _clean_ts(r.get("firstAskedAt")),
-                            "userId": r.get("userId"),
-                            "personId": r.get("personId"),
-                            "userChatId": r.get("userChatId"),
-                            "text": str(txt).strip(),
-                            # 점수는 힌트 컬럼이 있으면 같이 내려줌(없어도 OK)
-                            "score": (pd.to_numeric(r.get(score_col_hint), errors="coerce")
-                                      if score_col_hint in df.columns else None),
-                            # 태그는 프론트에서 userchats 캐시와 매칭해 채워줌
-                        })
-            # 최신순 정렬
-            data.sort(key=lambda x: x.get("firstAskedAt") or "", reverse=True)
-            return {"total": len(data), "data": data}
-
-        comments_payload = {
-            "comment_3": _pack_comments(csat_df, "comment_3", "A-2"),
-            "comment_6": _pack_comments(csat_df, "comment_6", "A-5"),
-        }
+    except Exception as e:
+        print(f"[CSAT] 전체 처리 실패: {type(e).__name__}: {e}")
+        # 어떤 경우에도 500이 전체 탭을 죽이지 않도록, 안전한 빈 결과 반환
+        return _fallback_response(_csat_empty_payload())
 
-        # ---- 기본 요약 (A-1/2/4/5) ----
-        score_cols = [c for c in ["A-1", "A-2", "A-4", "A-5"] if c in csat_df.columns]
-
-        # ✅ 공통 분모(대상자수) = 설문 워크플로우 시작자 수로 산정
-        raw = csat_df.get("wf_768201_started")
-        elig = pd.Series(raw if raw is not None else False, index=csat_df.index)
-        elig = (elig.replace({
-            True: True, False: False,
-            "True": True, "False": False,
-            "true": True, "false": False,
-            "1": True, "0": False, 1: True, 0: False
-        }).fillna(False).astype(bool))
-        elig_count = int(elig.sum())
-
-        summary_list = []
-        for col in score_cols:
-            series = pd.to_numeric(csat_df[col], errors="coerce")
-            valid = series.dropna()
-            avg_score = float(valid.mean()) if len(valid) > 0 and np.isfinite(valid.mean()) else 0.0
-
-            answered_this = int(valid.count())
-            non_responded = max(0, elig_count - answered_this)
-
-            summary_list.append({
-                "항목": col,
-                "평균점수": round(avg_score, 2),
-                "응답자수": answered_this,
-                "대상자수": elig_count,        # ✅ 추가
-                "미응답자수": non_responded,    # ✅ 추가
-                "라벨": f"{col} ({round(avg_score, 2)}점)",
-            })
+# 5-6. 대시보드 번들 (한 기간의 위젯을 한 번에: 파티션은 한 번만 읽고 위젯은 동시에 계산)
+# 위젯 payload는 각 단독 엔드포인트 응답 본문과 같은 형태
+DASHBOARD_WIDGETS = [
+    "period_data", "filter_options", "manager_stats", "csat_analysis",
+    "timeseries", "percentiles", "sla_histogram", "heatmap",
+]
+# 기간 원본 행(userchats)이 필요한 위젯
+DASHBOARD_ROW_WIDGETS = {"period_data", "manager_stats", "timeseries", "sla_histogram"}
+
+def _timed(fn, *args):
+    """fn(*args) 결과와 소요 시간(ms) — 블로킹 풀에서 실행"""
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, round((time.perf_counter() - t0) * 1000, 1)
+
+def _dashboard_rows(df: pd.DataFrame, filters: tuple) -> tuple:
+    """공유 프레임: (기간 전체 행, 유형 필터 적용 행)"""
+    if df is None or df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    filtered, _, _ = _apply_type_filters(df.copy(), *filters)
+    return df, filtered
+
+def _dashboard_manager_stats(df: pd.DataFrame, start: str, end: str) -> dict:
+    if df.empty:
+        return {"manager_counts": [], "manager_inquiry_types": {}}
+    return _manager_stats_payload(df, load_manager_bridge(_months_of(start, end)), load_manager_directory())
+
+def _dashboard_csat_analysis(start: str, end: str) -> dict:
+    csat_df = _load_csat_analysis_rows(start, end)
+    if csat_df is None or csat_df.empty:
+        return _csat_empty_payload()
+    return _csat_analysis_payload(csat_df)
+
+def _dashboard_timeseries(filtered: pd.DataFrame, start: str, end: str) -> dict:
+    measures, metrics = ["count", "mean"], list(DURATION_COLUMNS)
+    points = _timeseries_points(filtered, "day", measures, metrics)
+    return _timeseries_payload(points, start, end, "day", measures, metrics, "rows")
+
+def _dashboard_filter_options() -> dict:
+    options = load_filter_options(cached_partition_months("userchats"))
+    if options is None:
+        return {
+            "고객유형": ["전체"], "문의유형": ["전체"], "서비스유형": ["전체"],
+            "고객유형_2차": ["전체"], "문의유형_2차": ["전체"], "서비스유형_2차": ["전체"],
+        }
+    return options
 
-        # ✅ 총응답수 = 공통 분모(대상자수)
-        total_responses = int(elig_count)
+@app.get("/api/dashboard")
+async def dashboard(
+    start: str = Query(...),
+    end: str = Query(...),
+    widgets: Optional[str] = Query(None),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """
+    대시보드 위젯 번들. widgets: CSV (기본: 전부) — DASHBOARD_WIDGETS 참고.
+    - 기간 userchats 파티션은 한 번만 읽고, 유형 필터도 한 번만 적용해 위젯끼리 공유
+      (period_data/timeseries/sla_histogram/percentiles/heatmap은 유형 필터 적용,
+       manager_stats/csat_analysis/filter_options는 단독 엔드포인트처럼 필터 없음)
+    - 서로 독립인 위젯은 블로킹 풀에서 동시에 계산
+    - timings_ms: 위젯별 계산 시간 (+ load: 공유 프레임 준비), errors: 실패한 위젯만
+      결과 캐시에서 나간 응답은 처음 계산했을 때의 시간이다
+    """
+    requested = [w for w in (_norm(x) for x in _parse_values(widgets))] if widgets else list(DASHBOARD_WIDGETS)
+    unknown = [w for w in requested if w not in DASHBOARD_WIDGETS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 widgets: {unknown} (가능: {DASHBOARD_WIDGETS})")
+    requested = list(dict.fromkeys(requested))
 
-        # ---- 유형별 집계(가능할 때만) : 캐시만 사용, 조인 실패해도 스킵 ----
-        type_scores = {}
-        try:
-            chats_df = await get_cached_data(start, end, refresh_mode="cache")  # 캐시 전용
-            if chats_df is not None and not chats_df.empty:
-                # 조인키 우선순위: userId → personId → userChatId
-                join_key = next((k for k in ["userId", "personId", "userChatId"]
-                                 if k in csat_df.columns and k in chats_df.columns), None)
-                if join_key == "userId":
-                    # 기존 함수 재사용
-                    enriched = enrich_csat_with_user_types(csat_df, chats_df)
-                elif join_key is not None:
-                    # 간단 조인(1차 분류만 가져와 붙임)
-                    need_cols = ["userId", "personId", "userChatId", "문의유형", "고객유형", "서비스유형"]
-                    use_cols = [c for c in need_cols if c in chats_df.columns]
-                    enriched = pd.merge(
-                        csat_df.copy(),
-                        chats_df[use_cols].drop_duplicates(subset=[join_key], keep="last"),
-                        on=join_key,
-                        how="inner",
-                    )
-                else:
-                    enriched = pd.DataFrame()
-
-                if enriched is not None and not enriched.empty:
-                    scores = build_csat_type_scores(enriched)
-                    type_scores = _sanitize_json(scores)   # ✅ NaN/Inf/numpy 스칼라 전부 정리
-        except Exception as e:
-            print(f"[CSAT] 유형별 집계 스킵: {type(e).__name__}: {e}")
-            type_scores = {}
+    end = limit_end_date(end)
+    filters = _type_filter_aliases(
+        request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+    )
+    params = (start, end, tuple(requested), _filter_key(*filters),
+              tuple(load_manager_directory().items()) if "manager_stats" in requested else ())
+    if "filter_options" in requested:
+        # filter_options 위젯은 기간과 무관하게 캐시된 전체 월을 읽으므로 전체 버전도 키에 넣는다
+        params += (await run_blocking(result_key, "filter_options", (), ("userchats",), None),)
+    if "csat_analysis" in requested:
+        # /api/csat-analysis와 같이 보강 CSAT의 기간 밖 의존 파티션 버전
+        deps = await run_blocking(derived_dependency_versions, CSAT_ENRICHED_NAME, _months_of(start, end))
+        params += (tuple(deps.items()),)
+    cache_key = await _result_key("dashboard", params, ("userchats", "csat"), start, end)
+    hit = result_cache.get(cache_key)
+    if hit is not None:
+        return _cached_json_response(hit)
+
+    timings = {}
+    rows, filtered = pd.DataFrame(), pd.DataFrame()
+    if DASHBOARD_ROW_WIDGETS & set(requested):
+        t0 = time.perf_counter()
+        df = await get_cached_data(start, end, refresh_mode="cache")
+        rows, filtered = await run_blocking(_dashboard_rows, df, filters)
+        timings["load"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    jobs = {
+        "period_data": (_frame_to_records, filtered),
+        "filter_options": (_dashboard_filter_options,),
+        "manager_stats": (_dashboard_manager_stats, rows, start, end),
+        "csat_analysis": (_dashboard_csat_analysis, start, end),
+        "timeseries": (_dashboard_timeseries, filtered, start, end),
+        "percentiles": (_percentiles_payload, start, end, filters, list(DURATION_COLUMNS),
+                        _parse_percentiles(PERCENTILE_DEFAULT)),
+        "sla_histogram": (sla_histogram_mod.sla_histogram, filtered, "operationResolutionTime",
+                          sla_histogram_mod.HANDLING_GROUP, list(sla_histogram_mod.DEFAULT_EDGES), 40, 2),
+        "heatmap": (_heatmap_payload, start, end, filters, []),
+    }
+    results = await asyncio.gather(
+        *(run_blocking(_timed, *jobs[w]) for w in requested), return_exceptions=True,
+    )
+
+    payload = {"start": start, "end": end, "widgets": {}, "timings_ms": timings, "errors": {}}
+    for name, res in zip(requested, results):
+        if isinstance(res, Exception):
+            print(f"[DASHBOARD] {name} 실패: {type(res).__name__}: {res}")
+            payload["widgets"][name] = None
+            payload["errors"][name] = f"{type(res).__name__}: {res}"
+            continue
+        payload["widgets"][name], timings[name] = res
+    if payload["errors"]:
+        return _fallback_response(payload)   # 일부 실패한 결과는 캐시하지 않음
+    return await _json_response_cached(payload, cache_key)
+
+# 5-7. 요약 집계 (avg-times, customer-type-cs, statistics: 일별 롤업 큐브만 읽음)
+# 소요시간은 다른 집계와 같이 분 단위, 0 이하/빈 값 제외
+AVG_TIME_NAMES = ["대기시간", "첫응답시간", "총응답시간", "해결시간"]   # DURATION_COLUMNS 순서
+AVG_TIMES_GROUPS = {"월간": "month", "주간": "week", "일간": "day"}
+
+def _filtered_rollup(start: str, end: str, filters: tuple) -> pd.DataFrame:
+    cube = rollup.load_rollup(start, end)
+    if not cube.empty:
+        cube, _, _ = _apply_type_filters(cube, *filters)
+    return cube
+
+def _round_or_none(v, digits: int = 2):
+    return round(float(v), digits) if v is not None and np.isfinite(v) else None
+
+def _avg_times_payload(start: str, end: str, filters: tuple, granularity: str) -> dict:
+    """버킷별 지표 평균 (데이터가 있는 버킷만, 시간순)"""
+    cube = _filtered_rollup(start, end, filters)
+    data = []
+    if not cube.empty:
+        agg = rollup.aggregate(cube, _timeseries_buckets(cube["day"], granularity).rename("_bucket"))
+        for ts, row in agg.iterrows():
+            item = {"period": ts.strftime("%Y-%m-%d"), "x축": _timeseries_label(ts, granularity),
+                    "count": int(row["count"])}
+            for m in DURATION_COLUMNS:
+                item[m] = _round_or_none(row[f"{m}_mean"])
+                item[f"{m}_n"] = int(row[f"{m}_n"])
+            data.append(item)
+    return {"granularity": granularity, "unit": "minutes", "data": data,
+            "time_names": AVG_TIME_NAMES, "metrics": list(DURATION_COLUMNS)}
+
+def _customer_type_cs_payload(start: str, end: str, filters: tuple, top_n: int) -> list:
+    """고객유형(1차)별 문의량 상위 top_n (빈 유형 제외, 건수 내림차순 → 이름순)"""
+    cube = _filtered_rollup(start, end, filters)
+    if cube.empty:
+        return []
+    cube = cube[cube["고객유형_1차"] != ""]
+    agg = rollup.aggregate(cube, "고객유형_1차", ["operationResolutionTime"])
+    total = int(agg["count"].sum())
+    agg = agg.reset_index().sort_values(["count", "고객유형_1차"], ascending=[False, True], kind="stable")
+    return [
+        {"고객유형": name, "문의량": int(cnt), "비율": round(cnt / total * 100, 2),
+         "평균해결시간": _round_or_none(mean)}
+        for name, cnt, mean in zip(agg["고객유형_1차"].head(top_n), agg["count"].head(top_n),
+                                   agg["operationResolutionTime_mean"].head(top_n))
+    ]
+
+def _statistics_payload(start: str, end: str, filters: tuple) -> dict:
+    """총 문의 수, 유형 가짓수, 평균 시간(기존 키) + 매체/방향별 건수, 지표별 n/mean/std"""
+    cube = _filtered_rollup(start, end, filters)
+    out = {
+        "총문의수": 0, "고객유형수": 0, "문의유형수": 0, "서비스유형수": 0,
+        "평균첫응답시간": None, "평균해결시간": None,
+        "unit": "minutes", "기간": {"first": None, "last": None},
+        "mediumType": {}, "direction": {},
+        "metrics": {m: {"n": 0, "mean": None, "std": None} for m in DURATION_COLUMNS},
+    }
+    if cube.empty:
+        return out
+    total = rollup.aggregate(cube, np.zeros(len(cube), dtype=np.int8)).iloc[0]
+    out["총문의수"] = int(total["count"])
+    for key, col in (("고객유형수", "고객유형_1차"), ("문의유형수", "문의유형_1차"), ("서비스유형수", "서비스유형_1차")):
+        out[key] = int(cube.loc[cube[col] != "", col].nunique())
+    out["평균첫응답시간"] = _round_or_none(total["operationAvgReplyTime_mean"])
+    out["평균해결시간"] = _round_or_none(total["operationResolutionTime_mean"])
+    out["기간"] = {"first": cube["day"].min().strftime("%Y-%m-%d"), "last": cube["day"].max().strftime("%Y-%m-%d")}
+    for col in ("mediumType", "direction"):
+        counts = cube.groupby(cube[col].replace("", "미분류"), sort=True)["count"].sum()
+        out[col] = {str(k): int(v) for k, v in counts.sort_values(ascending=False, kind="stable").items()}
+    out["metrics"] = {
+        m: {"n": int(total[f"{m}_n"]), "mean": _round_or_none(total[f"{m}_mean"]),
+            "std": _round_or_none(total[f"{m}_std"])}
+        for m in DURATION_COLUMNS
+    }
+    return out
 
-        # ---- 최종 응답 ----
-        
-        resp = {
-            "status": "success",
-            "총응답수": total_responses,
-            "요약": summary_list,
-            "유형별": type_scores,     # 조인 안되면 {}
-            "comments": comments_payload,
-        }
+async def _summary_response(name: str, builder, start: str, end: str, filters: tuple, *args) -> Response:
+    """요약 집계 공통: 결과 캐시 조회 → 블로킹 풀에서 계산 → 캐시 저장"""
+    cache_key = await _result_key(name, (start, end, _filter_key(*filters), *args), ("userchats",), start, end)
+    hit = result_cache.get(cache_key)
+    if hit is not None:
+        return _cached_json_response(hit)
+    payload = await run_blocking(builder, start, end, filters, *args)
+    return await _json_response_cached(payload, cache_key)
+
+@app.get("/api/avg-times")
+async def avg_times(
+    start: str = Query(...),
+    end: str = Query(...),
+    date_group: str = Query("월간"),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """
+    기간 버킷별 평균 소요시간(분). /api/period-data와 같은 유형 필터를 받는다.
+    - date_group: 월간(기본) | 주간 | 일간 (month/week/day도 허용)
+    - data: [{period, x축, count, 지표별 평균, 지표별 표본수(_n)}], time_names: 지표 표시 이름
+    """
+    gran = AVG_TIMES_GROUPS.get(date_group.strip()) or TIMESERIES_GRANULARITY.get(_norm(date_group))
+    if gran is None:
+        raise HTTPException(status_code=400, detail=f"date_group은 {list(AVG_TIMES_GROUPS)} 중 하나여야 합니다: {date_group}")
+    try:
+        end = limit_end_date(end)
+        filters = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+        return await _summary_response("avg_times", _avg_times_payload, start, end, filters, gran)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"평균 시간 조회 실패: {str(e)}")
 
-        # ✅ NaN/Inf/numpy 스칼라 전부 정리
-        safe_payload = _sanitize_json(resp)
-        return JSONResponse(content=safe_payload)
+@app.get("/api/customer-type-cs")
+async def customer_type_cs(
+    start: str = Query(...),
+    end: str = Query(...),
+    top_n: int = Query(5, ge=1, le=100),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """고객유형별 문의량 상위 top_n: [{고객유형, 문의량, 비율(%), 평균해결시간(분)}]"""
+    try:
+        end = limit_end_date(end)
+        filters = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+        return await _summary_response("customer_type_cs", _customer_type_cs_payload, start, end, filters, top_n)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"고객유형별 문의량 조회 실패: {str(e)}")
 
+@app.get("/api/statistics")
+async def get_statistics(
+    start: str = Query(...),
+    end: str = Query(...),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """기간 요약 통계 (유형 필터 선택). 평균 시간은 분 단위"""
+    try:
+        end = limit_end_date(end)
+        filters = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+        return await _summary_response("statistics", _statistics_payload, start, end, filters)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"[CSAT] 전체 처리 실패: {type(e).__name__}: {e}")
-        # 어떤 경우에도 500이 전체 탭을 죽이지 않도록, 안전한 빈 결과 반환
-        return {"status": "success", "총응답수": 0, "요약": [], "유형별": {}, "comments": {
-            "comment_3": {"total": 0, "data": []},
-            "comment_6": {"total": 0, "data": []},
-        }}
+        raise HTTPException(status_code=500, detail=f"통계 조회 실패: {str(e)}")
 
 # 6. (기존) 샘플/단일 조회 등 필요시 유지
+# 6-0. 층화 샘플: 층(기본 문의유형_1차)마다 최대 n행, seed가 같으면 같은 행
+SAMPLE_MAX_N = 100
+SAMPLE_STRATA = list(tag_index.TAG_DIMENSIONS)
+
+def _sample_frame(df: pd.DataFrame, n: int, by: str, seed: int, fields: Optional[str]) -> pd.DataFrame:
+    """행 순서를 seed로 한 번 섞은 뒤 층별 앞 n행 → 층 이름순, 층 안에서는 시각순"""
+    if df.empty:
+        return df
+    strata = (df[by] if by in df.columns else pd.Series(None, index=df.index, dtype=object))
+    strata = strata.astype("string").fillna("").str.strip().replace("", "미분류")
+    when = df["firstAskedAt"]
+    if "createdAt" in df.columns:
+        when = when.fillna(df["createdAt"])
+    order = np.random.default_rng(seed).permutation(len(df))
+    keys = pd.DataFrame({"s": strata.to_numpy()[order], "t": when.to_numpy()[order], "pos": order})
+    keys = keys[keys.groupby("s", sort=False).cumcount() < n]
+    keys = keys.sort_values(["s", "t"], kind="stable", na_position="last")
+    frame, _, _ = _page_frame(df.iloc[keys["pos"].to_numpy()], fields, None, None)
+    return frame
+
+@app.get("/api/sample")
+async def sample(
+    start: str = Query(...),
+    end: str = Query(...),
+    n: int = Query(5, ge=1, le=SAMPLE_MAX_N),
+    by: str = Query("문의유형_1차"),
+    seed: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None, description="반환할 컬럼 (CSV)"),
+    고객유형: str = Query("전체"),
+    고객유형_2차: str = Query("전체"),
+    문의유형: str = Query("전체"),
+    문의유형_2차: str = Query("전체"),
+    서비스유형: str = Query("전체"),
+    서비스유형_2차: str = Query("전체"),
+    request: Request = None
+):
+    """
+    기간 행의 층화 샘플 (records 리스트). /api/period-data와 같은 유형 필터를 받는다.
+    - by: 층 컬럼 (유형 1차/2차, mediumType, direction — 고객유형 등 1차 이름도 허용)
+    - n: 층마다 최대 행 수, seed: 무작위 순서 고정값
+    """
+    strata = SLA_GROUP_ALIASES.get(by.strip(), by.strip())
+    if strata not in SAMPLE_STRATA:
+        raise HTTPException(status_code=400, detail=f"by는 {SAMPLE_STRATA} 중 하나여야 합니다: {by}")
+    try:
+        end = limit_end_date(end)
+        filters = _type_filter_aliases(
+            request, 고객유형, 고객유형_2차, 문의유형, 문의유형_2차, 서비스유형, 서비스유형_2차,
+        )
+        params = (start, end, n, strata, seed, tuple(_parse_values(fields)) if fields else None, _filter_key(*filters))
+        cache_key = await _result_key("sample", params, ("userchats",), start, end)
+        hit = result_cache.get(cache_key)
+        if hit is not None:
+            return _cached_json_response(hit)
+
+        clauses = _type_filter_clauses(*filters)
+        df = await get_cached_data(
+            start, end, refresh_mode="cache",
+            partition_filter=_type_partition_filter(clauses) if clauses else None,
+        )
+
+        def _build():
+            frame = df
+            if not frame.empty:
+                frame, _, _ = _apply_type_filters(frame, *filters, prefiltered=True)
+            return _frame_to_records(_sample_frame(frame, n, strata, seed, fields)) if not frame.empty else []
+
+        payload = await run_blocking(_build)
+        return await _json_response_cached(payload, cache_key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"샘플 데이터 조회 실패: {str(e)}")
+
 @app.get("/api/user-chat/{userchat_id}")
 async def get_user_chat(userchat_id: str):
     try:
@@ -1163,7 +2292,23 @@ async def get_user_chat(userchat_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"UserChat 조회 실패: {str(e)}")
 
+# 6-1. 담당자 디렉터리 (manager-stats 대상 담당자)
+@app.get("/api/managers")
+def get_managers():
+    """managerId → 이름 (캐시된 디렉터리, 없으면 기본 담당자)"""
+    return [{"managerId": k, "managerName": v} for k, v in load_manager_directory().items()]
+
 # ---- 7. 관리자 전용 엔드포인트 ----
+@app.post("/api/admin/managers/refresh")
+async def admin_refresh_managers(_=Depends(admin_guard)):
+    """관리자 전용: 채널 API의 매니저 목록으로 담당자 디렉터리 갱신"""
+    try:
+        directory = await refresh_manager_directory()
+        return {"status": "ok", "count": len(directory),
+                "managers": [{"managerId": k, "managerName": v} for k, v in directory.items()]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"담당자 디렉터리 갱신 실패: {str(e)}")
+
 @app.post("/api/admin/cache/rebuild")
 async def admin_rebuild_cache(
     start: str = Query("2025-04-01"),
@@ -1304,7 +2449,7 @@ class CrmCustomerCreate(BaseModel):
     기관어드민링크: Optional[str] = ""
 
 @app.get("/api/cloud-customers")
-async def get_cloud_customers():
+def get_cloud_customers():
     """Cloud 고객 목록 조회"""
     with file_lock(DEFAULT_DB_PATH):
         rows = load_json_db()
@@ -1322,7 +2467,7 @@ async def get_cloud_customers():
         return rows
 
 @app.post("/api/cloud-customers")
-async def create_cloud_customer(customer: dict):
+def create_cloud_customer(customer: dict):
     """신규 고객 등록"""
     # 필수 필드 검증
     if not customer.get("사업유형") or not customer.get("이름"):
@@ -1360,7 +2505,7 @@ async def create_cloud_customer(customer: dict):
         return new_customer
 
 @app.put("/api/cloud-customers/{customer_id}")
-async def update_cloud_customer(customer_id: int, customer: dict):
+def update_cloud_customer(customer_id: int, customer: dict):
     """고객 정보 수정"""
     # 필수 필드 검증
     if not customer.get("사업유형") or not customer.get("이름"):
@@ -1437,7 +2582,7 @@ async def update_cloud_customer(customer_id: int, customer: dict):
         return rows[idx]
 
 @app.delete("/api/cloud-customers/{customer_id}")
-async def delete_cloud_customer(customer_id: int):
+def delete_cloud_customer(customer_id: int):
     """고객 삭제"""
     with file_lock(DEFAULT_DB_PATH):
         rows = load_json_db()
@@ -1448,7 +2593,7 @@ async def delete_cloud_customer(customer_id: int):
         return {"ok": True}
 
 @app.post("/api/cloud-customers/migrate")
-async def migrate_from_memory_to_json():
+def migrate_from_memory_to_json():
     """레거시 메모리 캐시(server_cache['cloud_customers']) → JSON 파일로 강제 덤프"""
     try:
         legacy_rows = server_cache.get("cloud_customers") or []
@@ -1468,7 +2613,7 @@ async def migrate_from_memory_to_json():
 # ---- 9. 환불 고객 관리 API ----
 
 @app.get("/api/refund-customers")
-async def get_refund_customers():
+def get_refund_customers():
     """환불 고객 목록 조회"""
     with file_lock(REFUND_DB_PATH):
         rows = load_json_db(REFUND_DB_PATH)
@@ -1479,7 +2624,7 @@ async def get_refund_customers():
         return rows
 
 @app.post("/api/refund-customers")
-async def create_refund_customer(refund: RefundCustomerCreate):
+def create_refund_customer(refund: RefundCustomerCreate):
     """신규 환불 고객 등록"""
     if not refund.이름 or not refund.환불금액 or not refund.환불날짜:
         raise HTTPException(status_code=400, detail="이름, 환불금액, 환불날짜는 필수 입력 항목입니다.")
@@ -1512,7 +2657,7 @@ async def create_refund_customer(refund: RefundCustomerCreate):
         return new_refund
 
 @app.put("/api/refund-customers/{refund_id}", response_model=RefundCustomer)
-async def update_refund_customer(refund_id: int, refund: RefundCustomerCreate):
+def update_refund_customer(refund_id: int, refund: RefundCustomerCreate):
     """환불 고객 정보 수정"""
     if not refund.이름 or not refund.환불금액 or not refund.환불날짜:
         raise HTTPException(status_code=400, detail="이름, 환불금액, 환불날짜는 필수 입력 항목입니다.")
@@ -1564,7 +2709,7 @@ async def update_refund_customer(refund_id: int, refund: RefundCustomerCreate):
 
 
 @app.delete("/api/refund-customers/{refund_id}")
-async def delete_refund_customer(refund_id: int):
+def delete_refund_customer(refund_id: int):
     """환불 고객 삭제"""
     with file_lock(REFUND_DB_PATH):
         rows = load_json_db(REFUND_DB_PATH)
@@ -1598,7 +2743,7 @@ async def delete_refund_customer(refund_id: int):
 # ---- 10. CRM 고객(기관) 관리 API ----
 
 @app.get("/api/crm-customers")
-async def get_crm_customers():
+def get_crm_customers():
     """CRM 고객(기관) 목록 조회"""
     with file_lock(CRM_DB_PATH):
         rows = load_json_db(CRM_DB_PATH)
@@ -1610,7 +2755,7 @@ async def get_crm_customers():
 
 
 @app.post("/api/crm-customers")
-async def create_crm_customer(crm: CrmCustomerCreate):
+def create_crm_customer(crm: CrmCustomerCreate):
     """신규 CRM 고객(기관) 등록"""
     if not crm.성함 or not crm.이메일:
         raise HTTPException(status_code=400, detail="성함과 이메일은 필수 입력 항목입니다.")
@@ -1644,7 +2789,7 @@ async def create_crm_customer(crm: CrmCustomerCreate):
 
 
 @app.put("/api/crm-customers/{crm_id}", response_model=CrmCustomer)
-async def update_crm_customer(crm_id: int, crm: CrmCustomerCreate):
+def update_crm_customer(crm_id: int, crm: CrmCustomerCreate):
     """CRM 고객(기관) 정보 수정"""
     if not crm.성함 or not crm.이메일:
         raise HTTPException(status_code=400, detail="성함과 이메일은 필수 입력 항목입니다.")
@@ -1697,7 +2842,7 @@ async def update_crm_customer(crm_id: int, crm: CrmCustomerCreate):
 
 
 @app.delete("/api/crm-customers/{crm_id}")
-async def delete_crm_customer(crm_id: int):
+def delete_crm_customer(crm_id: int):
     """CRM 고객(기관) 삭제"""
     with file_lock(CRM_DB_PATH):
         rows = load_json_db(CRM_DB_PATH)
@@ -1728,117 +2873,120 @@ async def delete_crm_customer(crm_id: int):
         return {"ok": True}
 
 
+def _import_crm_csv(contents: bytes) -> dict:
+    """CSV 디코딩/파싱/검증 후 CRM JSON DB에 일괄 저장 (블로킹 풀에서 실행)"""
+    # 인코딩 시도 (utf-8-sig, utf-8, cp949 순서)
+    csv_text = None
+    for encoding in ['utf-8-sig', 'utf-8', 'cp949']:
+        try:
+            csv_text = contents.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+
+    if csv_text is None:
+        raise HTTPException(status_code=400, detail="CSV 파일 인코딩을 인식할 수 없습니다. UTF-8 또는 CP949 형식으로 저장해주세요.")
+
+    # pandas로 CSV 파싱
+    df = pd.read_csv(io.StringIO(csv_text))
+
+    # 필수 컬럼 확인
+    required_cols = ['성함', '이메일']
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"필수 컬럼이 없습니다: {', '.join(missing_cols)}"
+        )
+
+    # 데이터 정리 및 검증
+    rows = []
+    errors = []
+
+    for idx, row in df.iterrows():
+        try:
+            # 필수 필드 검증
+            성함 = _clean_str(row.get('성함', ''))
+            이메일 = _clean_str(row.get('이메일', ''))
+
+            if not 성함 or not 이메일:
+                errors.append(f"행 {idx + 2}: 성함과 이메일은 필수 입력 항목입니다.")
+                continue
+
+            # 날짜 필드 정리 (NaN이면 빈 문자열)
+            기관생성일 = _clean_str(row.get('기관생성일', ''))
+            카드미등록발송일자 = _clean_str(row.get('카드미등록발송일자', ''))
+            카드등록일 = _clean_str(row.get('카드등록일', ''))
+            크레딧충전일 = _clean_str(row.get('크레딧충전일', ''))
+
+            rows.append({
+                "기관생성일": 기관생성일,
+                "성함": 성함,
+                "이메일": 이메일,
+                "카드미등록발송일자": 카드미등록발송일자,
+                "카드등록일": 카드등록일,
+                "크레딧충전일": 크레딧충전일,
+                "기관링크": _clean_str(row.get('기관링크', '')),
+                "기관어드민링크": _clean_str(row.get('기관어드민링크', '')),
+            })
+        except Exception as e:
+            errors.append(f"행 {idx + 2}: 처리 중 오류 - {str(e)}")
+            continue
+
+    if not rows:
+        raise HTTPException(
+            status_code=400,
+            detail="업로드할 유효한 데이터가 없습니다. " + ("\n".join(errors[:5]) if errors else "")
+        )
+
+    # 일괄 저장
+    with file_lock(CRM_DB_PATH):
+        existing_rows = load_json_db(CRM_DB_PATH)
+        if not isinstance(existing_rows, list):
+            existing_rows = []
+
+        existing_ids = [r.get("id") for r in existing_rows if isinstance(r, dict) and r.get("id")]
+        next_id = (max(existing_ids) + 1) if existing_ids else 1
+
+        now_iso = datetime.now().isoformat()
+        new_rows = []
+
+        for row_data in rows:
+            new_crm = {
+                "id": next_id,
+                "기관생성일": row_data["기관생성일"],
+                "성함": row_data["성함"],
+                "이메일": row_data["이메일"],
+                "카드미등록발송일자": row_data["카드미등록발송일자"],
+                "카드등록일": row_data["카드등록일"],
+                "크레딧충전일": row_data["크레딧충전일"],
+                "기관링크": row_data["기관링크"],
+                "기관어드민링크": row_data["기관어드민링크"],
+                "등록일": now_iso,
+                "업데이트날짜": now_iso,
+            }
+            new_rows.append(new_crm)
+            next_id += 1
+
+        existing_rows.extend(new_rows)
+        save_json_db(existing_rows, CRM_DB_PATH)
+
+    result = {
+        "success": True,
+        "uploaded": len(new_rows),
+        "errors": errors[:10] if errors else []  # 최대 10개 에러만 반환
+    }
+
+    return result
+
+
 @app.post("/api/crm-customers/upload-csv")
 async def upload_crm_customers_csv(file: UploadFile = File(...)):
     """CSV 파일로 CRM 고객 일괄 등록"""
     try:
         # CSV 파일 읽기
         contents = await file.read()
-        
-        # 인코딩 시도 (utf-8-sig, utf-8, cp949 순서)
-        csv_text = None
-        for encoding in ['utf-8-sig', 'utf-8', 'cp949']:
-            try:
-                csv_text = contents.decode(encoding)
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if csv_text is None:
-            raise HTTPException(status_code=400, detail="CSV 파일 인코딩을 인식할 수 없습니다. UTF-8 또는 CP949 형식으로 저장해주세요.")
-        
-        # pandas로 CSV 파싱
-        df = pd.read_csv(io.StringIO(csv_text))
-        
-        # 필수 컬럼 확인
-        required_cols = ['성함', '이메일']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"필수 컬럼이 없습니다: {', '.join(missing_cols)}"
-            )
-        
-        # 데이터 정리 및 검증
-        rows = []
-        errors = []
-        
-        for idx, row in df.iterrows():
-            try:
-                # 필수 필드 검증
-                성함 = _clean_str(row.get('성함', ''))
-                이메일 = _clean_str(row.get('이메일', ''))
-                
-                if not 성함 or not 이메일:
-                    errors.append(f"행 {idx + 2}: 성함과 이메일은 필수 입력 항목입니다.")
-                    continue
-                
-                # 날짜 필드 정리 (NaN이면 빈 문자열)
-                기관생성일 = _clean_str(row.get('기관생성일', ''))
-                카드미등록발송일자 = _clean_str(row.get('카드미등록발송일자', ''))
-                카드등록일 = _clean_str(row.get('카드등록일', ''))
-                크레딧충전일 = _clean_str(row.get('크레딧충전일', ''))
-                
-                rows.append({
-                    "기관생성일": 기관생성일,
-                    "성함": 성함,
-                    "이메일": 이메일,
-                    "카드미등록발송일자": 카드미등록발송일자,
-                    "카드등록일": 카드등록일,
-                    "크레딧충전일": 크레딧충전일,
-                    "기관링크": _clean_str(row.get('기관링크', '')),
-                    "기관어드민링크": _clean_str(row.get('기관어드민링크', '')),
-                })
-            except Exception as e:
-                errors.append(f"행 {idx + 2}: 처리 중 오류 - {str(e)}")
-                continue
-        
-        if not rows:
-            raise HTTPException(
-                status_code=400,
-                detail="업로드할 유효한 데이터가 없습니다. " + ("\n".join(errors[:5]) if errors else "")
-            )
-        
-        # 일괄 저장
-        with file_lock(CRM_DB_PATH):
-            existing_rows = load_json_db(CRM_DB_PATH)
-            if not isinstance(existing_rows, list):
-                existing_rows = []
-            
-            existing_ids = [r.get("id") for r in existing_rows if isinstance(r, dict) and r.get("id")]
-            next_id = (max(existing_ids) + 1) if existing_ids else 1
-            
-            now_iso = datetime.now().isoformat()
-            new_rows = []
-            
-            for row_data in rows:
-                new_crm = {
-                    "id": next_id,
-                    "기관생성일": row_data["기관생성일"],
-                    "성함": row_data["성함"],
-                    "이메일": row_data["이메일"],
-                    "카드미등록발송일자": row_data["카드미등록발송일자"],
-                    "카드등록일": row_data["카드등록일"],
-                    "크레딧충전일": row_data["크레딧충전일"],
-                    "기관링크": row_data["기관링크"],
-                    "기관어드민링크": row_data["기관어드민링크"],
-                    "등록일": now_iso,
-                    "업데이트날짜": now_iso,
-                }
-                new_rows.append(new_crm)
-                next_id += 1
-            
-            existing_rows.extend(new_rows)
-            save_json_db(existing_rows, CRM_DB_PATH)
-        
-        result = {
-            "success": True,
-            "uploaded": len(new_rows),
-            "errors": errors[:10] if errors else []  # 최대 10개 에러만 반환
-        }
-        
-        return result
-        
+        return await run_blocking(_import_crm_csv, contents)
     except HTTPException:
         raise
     except Exception as e:
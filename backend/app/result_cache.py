@@ -0,0 +1,113 @@
+# app/result_cache.py
+"""
+조회 결과 캐시 (메모리, 바이트 상한).
+
+같은 (기간, 필터) 조합이 대시보드에서 반복 요청되므로, 파티션 로드 → 기간/유형 필터 →
+직렬화까지 끝난 응답 본문(bytes)을 보관한다.
+
+- 키: (이름, 정규화한 파라미터, 관련 파티션 버전). 파티션이 저장되면 버전(generation:saved_at)이
+  바뀌어 새 키가 되므로 따로 무효화할 필요가 없다. 옛 키는 LRU로 밀려난다.
+- 본문 바이트 합계가 RESULT_CACHE_MAX_MB를 넘으면 오래 안 쓴 것부터 제거.
+- 적중률 등 통계는 stats() (/api/metrics/result-cache)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.cs_utils import partition_versions
+
+RESULT_CACHE_MAX_MB = max(0, int(os.getenv("RESULT_CACHE_MAX_MB", "256")))
+
+# 항목 하나가 전체 상한의 이 비율을 넘으면 저장하지 않음 (큰 응답 하나가 캐시를 비우지 않도록)
+MAX_ENTRY_RATIO = 0.25
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[object, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._evictions = 0
+        self._rejected = 0
+
+    def get(self, key: Optional[tuple]):
+        if key is None:
+            return None
+        name = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses[name] = self._misses.get(name, 0) + 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits[name] = self._hits.get(name, 0) + 1
+            return entry[0]
+
+    def put(self, key: Optional[tuple], value, size: int) -> bool:
+        if key is None or self.max_bytes <= 0:
+            return False
+        with self._lock:
+            if size > self.max_bytes * MAX_ENTRY_RATIO:
+                self._rejected += 1
+                return False
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            names = sorted(set(self._hits) | set(self._misses))
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+
+            def _rate(h, m):
+                return round(h / (h + m), 4) if (h + m) else None
+
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": _rate(hits, misses),
+                "evictions": self._evictions,
+                "rejected_too_large": self._rejected,
+                "by_name": {
+                    n: {"hits": self._hits.get(n, 0), "misses": self._misses.get(n, 0),
+                        "hit_rate": _rate(self._hits.get(n, 0), self._misses.get(n, 0))}
+                    for n in names
+                },
+            }
+
+
+result_cache = ResultCache(RESULT_CACHE_MAX_MB * 1024 * 1024)
+
+
+def result_key(name: str, params: tuple, kinds: Iterable[str], months: Optional[list]) -> tuple:
+    """
+    결과 캐시 키. 데이터를 읽기 전에 만들어야 한다 (읽는 도중 저장이 끼어들어도
+    옛 버전 키에 새 데이터가 들어갈 뿐, 새 버전 키에 옛 데이터가 들어가지는 않음).
+    months=None이면 해당 종류의 전체 파티션 버전을 사용.
+    """
+    versions = tuple(
+        (kind, tuple(sorted(partition_versions(kind, months).items())))
+        for kind in kinds
+    )
+    return (name, params, versions)
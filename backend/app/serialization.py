@@ -0,0 +1,140 @@
+# app/serialization.py
+"""
+JSON 직렬화 계층.
+
+- frame_to_records: DataFrame을 컬럼 단위로 정리한 뒤 records로 변환
+  (float NaN/Inf → 0.0, datetime → ISO 문자열 / NaT → null, numpy 스칼라 → 파이썬 타입).
+  sanitize_json처럼 행마다 재귀 순회하지 않는다.
+- sanitize_json: 작은 집계 payload(dict/list)용 재귀 정리 (float NaN/Inf → 0.0, numpy 스칼라 → 파이썬 타입).
+- FastJSONResponse: orjson으로 바로 bytes를 만드는 기본 응답 클래스.
+  orjson이 없으면 표준 json으로 동작한다.
+"""
+
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except Exception:
+    orjson = None
+    _HAS_ORJSON = False
+
+# _iso_millis와 같은 형식 (밀리초까지)
+ISO_MILLIS = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def _datetime_values(s: pd.Series, fmt: Optional[str]) -> list:
+    if fmt is None:
+        # 원래 Timestamp.isoformat()과 같은 표현 (tz-aware면 오프셋 포함)
+        values = s.astype(object).where(s.notna(), None).tolist()
+        return [v.isoformat() if v is not None else None for v in values]
+    if fmt == ISO_MILLIS and getattr(s.dt, "tz", None) is None:
+        # numpy가 "YYYY-MM-DDTHH:MM:SS.mmm"을 바로 만들어 준다 (strftime보다 훨씬 빠름)
+        text = np.datetime_as_string(s.to_numpy(dtype="datetime64[ms]"), unit="ms").astype(object)
+    else:
+        text = s.dt.strftime(fmt).to_numpy(dtype=object)
+        if fmt == ISO_MILLIS:
+            text = np.array([t[:23] if isinstance(t, str) else t for t in text], dtype=object)
+    text[s.isna().to_numpy()] = None
+    return text.tolist()
+
+
+def _column_values(s: pd.Series, datetime_format: Optional[str]) -> list:
+    dtype = s.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return _datetime_values(s, datetime_format)
+    if pd.api.types.is_bool_dtype(dtype) and dtype != object:
+        return s.astype(object).where(s.notna(), None).tolist()
+    if pd.api.types.is_float_dtype(dtype):
+        arr = s.to_numpy(dtype="float64", na_value=np.nan).copy()
+        arr[~np.isfinite(arr)] = 0.0
+        return arr.tolist()
+    if pd.api.types.is_integer_dtype(dtype):
+        if s.isna().any():  # nullable Int
+            return s.astype(object).where(s.notna(), None).tolist()
+        return s.to_numpy().tolist()
+    # object/string: None은 유지, 값이 없는 float(NaN)은 0.0 (sanitize_json 규칙), NaT/NA는 None
+    arr = s.to_numpy(dtype=object).copy()
+    missing = pd.isna(arr)
+    if missing.any():
+        is_float = np.fromiter((isinstance(v, float) for v in arr[missing]), dtype=bool, count=int(missing.sum()))
+        idx = np.flatnonzero(missing)
+        arr[idx[is_float]] = 0.0
+        arr[idx[~is_float]] = None
+    return arr.tolist()
+
+
+def frame_to_records(df: pd.DataFrame, datetime_format: Optional[str] = ISO_MILLIS) -> List[dict]:
+    """
+    DataFrame → [{컬럼: 값}] (JSON 안전 값만 포함).
+    datetime_format=None이면 datetime을 isoformat()으로 (기존 Timestamp 직렬화와 동일).
+    """
+    if df is None or df.empty:
+        return []
+    cols = [str(c) for c in df.columns]
+    values = [_column_values(df.iloc[:, i], datetime_format) for i in range(df.shape[1])]
+    return [dict(zip(cols, row)) for row in zip(*values)]
+
+
+def sanitize_json(o: Any) -> Any:
+    """dict/list를 재귀 순회하며 float/numpy float NaN/Inf → 0.0, numpy 정수 → int"""
+    if isinstance(o, float):
+        return 0.0 if not math.isfinite(o) else float(o)
+    if isinstance(o, np.floating):
+        v = float(o)
+        return 0.0 if not math.isfinite(v) else v
+    if isinstance(o, np.integer):
+        return int(o)
+    if isinstance(o, dict):
+        return {k: sanitize_json(v) for k, v in o.items()}
+    if isinstance(o, list):
+        return [sanitize_json(v) for v in o]
+    return o
+
+
+def _default(o: Any):
+    """orjson/json이 기본으로 처리하지 못하는 값"""
+    if o is pd.NaT or o is pd.NA:
+        return None
+    if isinstance(o, pd.Timestamp):
+        return o.isoformat()
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, np.integer):
+        return int(o)
+    if isinstance(o, np.floating):
+        v = float(o)
+        return v if math.isfinite(v) else None
+    if isinstance(o, np.bool_):
+        return bool(o)
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, (set, frozenset, tuple)):
+        return list(o)
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Type is not JSON serializable: {type(o).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """NaN/Inf는 null (orjson) — 0.0 치환이 필요하면 frame_to_records/sanitize_json을 먼저 거친다"""
+    if _HAS_ORJSON:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """앱 기본 응답 클래스. 엔드포인트가 이 클래스를 직접 반환하면 jsonable_encoder 단계도 건너뛴다."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
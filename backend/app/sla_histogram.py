@@ -0,0 +1,169 @@
+# app/sla_histogram.py
+"""
+SLA 구간 스택 / 처리시간 밀도 히스토그램 (SLAStackBar.jsx, HandlingLeadtimeDensity.jsx와 같은 규칙).
+
+- 값: 소요시간(분), duration_minutes 규칙대로 0 이하/빈 값 제외
+- 처리유형 그룹: 처리유형_1차(없으면 처리유형) + 처리유형_2차 → "자체해결" / "이관/개발팀" ...
+  (미분류/기타, 허용되지 않은 2차 값은 제외)
+- stacked: 구간 경계(edges) np.searchsorted, 경계 밖 값은 마지막 구간. 구간별 그룹 비율(%)과 누적 y0/y1
+- density: 상한 = max(30, round(P95)) (또는 지정한 분), 0~상한을 bin_count 등분 + 상한 칸 1개,
+  그룹별 건수를 양쪽 smooth_window 칸 이동평균
+"""
+
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import duration_minutes
+
+HANDLING_GROUP = "처리유형"
+
+HANDLING_ORDER = [
+    "자체해결",
+    "이관/개발팀", "이관/사업팀", "이관/운영팀", "이관/고객사",
+    "처리불가/개발팀", "처리불가/사업팀", "처리불가/운영팀",
+]
+
+DEFAULT_EDGES = [0.0, 240.0, 480.0, 720.0, math.inf]
+
+# 밀도 상한 최솟값(분)
+DENSITY_MIN_CAP = 30
+
+UNCLASSIFIED = "미분류"
+
+
+def _text(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].astype("string").fillna("").str.strip().astype(object)
+
+
+def handling_groups(df: pd.DataFrame) -> pd.Series:
+    """행 → 처리유형 그룹 라벨 (제외 대상은 None)"""
+    head = _text(df, "처리유형_1차")
+    if "처리유형" in df.columns:
+        head = _text(df, "처리유형").where(lambda s: s != "", head)
+    tail = _text(df, "처리유형_2차")
+    label = pd.Series(None, index=df.index, dtype=object)
+    label[head == "자체해결"] = "자체해결"
+    for top in ("이관", "처리불가"):
+        candidate = top + "/" + tail
+        ok = (head == top) & candidate.isin(HANDLING_ORDER)
+        label[ok] = candidate[ok]
+    return label
+
+
+def group_labels(df: pd.DataFrame, group_by: str) -> pd.Series:
+    """group_by 컬럼 → 그룹 라벨 (처리유형은 규칙 적용, 그 외 빈 값은 "미분류")"""
+    if group_by == HANDLING_GROUP:
+        return handling_groups(df)
+    return _text(df, group_by).replace("", UNCLASSIFIED)
+
+
+def group_order(labels: pd.Series, group_by: str) -> List[str]:
+    """표시 순서: 처리유형은 고정 순서(없는 그룹 포함), 그 외는 건수 내림차순 → 이름순"""
+    present = labels.dropna()
+    if group_by == HANDLING_GROUP:
+        extra = sorted(set(present) - set(HANDLING_ORDER))
+        return HANDLING_ORDER + extra
+    counts = present.value_counts()
+    return sorted(counts.index.tolist(), key=lambda k: (-int(counts[k]), str(k)))
+
+
+def edge_labels(edges: List[float]) -> List[str]:
+    out = []
+    for a, b in zip(edges[:-1], edges[1:]):
+        out.append(f"{a / 60:g}h+" if math.isinf(b) else f"{a:g}~{b:g}")
+    return out
+
+
+def stacked_histogram(values: np.ndarray, codes: np.ndarray, groups: List[str],
+                      edges: List[float]) -> List[dict]:
+    """구간 × 그룹 건수 → 구간별 [{key, value, p, y0, y1}] (p: 구간 내 %)"""
+    n_bins = len(edges) - 1
+    idx = np.searchsorted(np.asarray(edges, dtype="float64"), values, side="right") - 1
+    idx = np.where((idx < 0) | (idx >= n_bins), n_bins - 1, idx)
+    counts = np.zeros((n_bins, len(groups)), dtype=np.int64)
+    np.add.at(counts, (idx, codes), 1)
+
+    out = []
+    for label, row in zip(edge_labels(edges), counts):
+        total = int(row.sum())
+        pct = row / (total or 1) * 100
+        y1 = np.cumsum(pct)
+        out.append({
+            "label": label,
+            "total": total,
+            "segments": [
+                {"key": g, "value": int(v), "p": float(p), "y0": float(b - p), "y1": float(b)}
+                for g, v, p, b in zip(groups, row, pct, y1)
+            ],
+        })
+    return out
+
+
+def _round_half_up(x: float) -> int:
+    return int(math.floor(x + 0.5))
+
+
+def smooth_counts(counts: np.ndarray, window: int) -> np.ndarray:
+    """양쪽 window 칸 이동평균 (가장자리는 있는 칸만 평균)"""
+    if window < 1:
+        return counts.astype("float64")
+    kernel = np.ones(2 * window + 1)
+    total = np.convolve(counts.astype("float64"), kernel, mode="same")
+    support = np.convolve(np.ones(len(counts)), kernel, mode="same")
+    return total / support
+
+
+def density_histogram(values: np.ndarray, codes: np.ndarray, groups: List[str], bin_count: int,
+                      smooth_window: int, cap: Optional[float] = None) -> dict:
+    """그룹별 0~상한 히스토그램(상한 칸 포함 bin_count + 1칸) + 스무딩"""
+    if cap is None:
+        p95 = float(np.quantile(values, 0.95)) if len(values) else 0.0
+        cap = max(DENSITY_MIN_CAP, _round_half_up(p95))
+    width = cap / bin_count
+    idx = np.minimum(bin_count, np.floor(np.clip(values, 0, cap) / width).astype(np.int64))
+    counts = np.zeros((len(groups), bin_count + 1), dtype=np.int64)
+    np.add.at(counts, (codes, idx), 1)
+    n = counts.sum(axis=1)
+
+    series = []
+    for g, row, total in zip(groups, counts, n):
+        if total == 0:
+            continue
+        series.append({"label": g, "n": int(total), "counts": smooth_counts(row, smooth_window).tolist()})
+    y_max = max([1.0] + [max(s["counts"]) for s in series])
+    return {
+        "xMax": cap,
+        "binCount": bin_count,
+        "binWidth": width,
+        "smoothWindow": smooth_window,
+        "yMax": int(math.ceil(y_max)),
+        "series": series,
+    }
+
+
+def sla_histogram(df: pd.DataFrame, metric: str, group_by: str, edges: List[float],
+                  bin_count: int, smooth_window: int, cap: Optional[float] = None) -> Dict[str, object]:
+    labels = group_labels(df, group_by) if not df.empty else pd.Series(dtype=object)
+    mins = duration_minutes(df[metric]) if metric in df.columns else pd.Series(np.nan, index=df.index)
+    vals = mins.to_numpy(dtype="float64")
+    keep = labels.notna().to_numpy() & np.isfinite(vals) & (vals > 0)
+    groups = group_order(labels[keep], group_by)
+    codes = pd.Categorical(labels[keep], categories=groups).codes.astype(np.int64)
+    values = vals[keep]
+    return {
+        "metric": metric,
+        "unit": "minutes",
+        "groupBy": group_by,
+        "groups": groups,
+        "n": int(keep.sum()),
+        "stacked": {
+            "edges": [None if math.isinf(e) else e for e in edges],
+            "bins": stacked_histogram(values, codes, groups, edges),
+        },
+        "density": density_histogram(values, codes, groups, bin_count, smooth_window, cap),
+    }
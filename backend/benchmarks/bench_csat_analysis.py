@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+CSAT 분석 집계 비용 측정 (기본 50,000행)
+
+- legacy: 라벨 × 문항마다 groupby + reindex (이전 build_csat_type_scores),
+          iterrows + 행마다 pd.to_numeric 코멘트 패킹 (이전 _pack_comments)
+- fast:   aggregate_scores 한 번 + comment_frame 컬럼 단위 필터/정렬 (app/csat_stats.py)
+
+캐시된 csat 파티션에 유형 라벨을 붙여 목표 행 수만큼 반복해 입력을 만들고,
+두 결과가 같은지도 확인한다.
+사용법: python benchmarks/bench_csat_analysis.py [행수] [반복횟수]
+"""
+import sys
+import os
+import io
+import time
+import contextlib
+
+# 프로젝트 루트를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from app.cs_utils import load_month_partitions
+from app.csat_stats import build_type_scores, comment_frame
+from app.serialization import frame_to_records
+
+LABELS = ["문의유형", "고객유형", "서비스유형"]
+
+
+def legacy_type_scores(df: pd.DataFrame) -> dict:
+    """이전 build_csat_type_scores (디버그 출력 제외)"""
+    csat_cols = [c for c in df.columns if c.startswith("A-")]
+
+    def _group_payload(label_col, score_col):
+        raw = df["wf_768201_started"] if "wf_768201_started" in df.columns else pd.Series(False, index=df.index)
+        elig = (pd.Series(raw, index=df.index)
+                .replace({True: True, False: False, 'True': True, 'False': False,
+                          'true': True, 'false': False, '1': True, '0': False, 1: True, 0: False})
+                .fillna(False).astype(bool))
+        tmp = pd.to_numeric(df[score_col], errors="coerce")
+        records = []
+        for label_val, sub in df.groupby(label_col, dropna=False):
+            if pd.isna(label_val) or str(label_val).strip() == "":
+                label_val = "미분류"
+            denom = int(elig.reindex(sub.index).sum())
+            answered = int(tmp.reindex(sub.index).notna().sum())
+            series = pd.to_numeric(sub[score_col], errors='coerce').dropna()
+            avg = float(series.mean()) if len(series) else 0.0
+            user_ids = sub.get("userId")
+            user_ids = sorted(set(user_ids.dropna().astype(str).tolist()))[:50] if user_ids is not None else []
+            records.append({label_col: label_val, "평균점수": avg if np.isfinite(avg) else 0.0,
+                            "userIds": user_ids, "대상자수": denom, "응답자수": answered,
+                            "미응답자수": max(0, denom - answered), "막대값": answered})
+        return sorted(records, key=lambda r: r["응답자수"], reverse=True)
+
+    return {label: {a: _group_payload(label, a) for a in csat_cols} for label in LABELS}
+
+
+def legacy_comments(df: pd.DataFrame, text_col: str, score_col_hint: str) -> list:
+    """이전 _pack_comments (iterrows)"""
+    def _clean_ts(v):
+        if pd.isna(v):
+            return None
+        return pd.to_datetime(v, errors="coerce").isoformat()
+
+    data = []
+    for _, r in df.iterrows():
+        txt = r.get(text_col)
+        if pd.notna(txt) and str(txt).strip():
+            score = pd.to_numeric(r.get(score_col_hint), errors="coerce")
+            data.append({"firstAskedAt": _clean_ts(r.get("firstAskedAt")), "userId": r.get("userId"),
+                         "personId": r.get("personId"), "userChatId": r.get("userChatId"),
+                         "text": str(txt).strip(), "score": 0.0 if pd.isna(score) else float(score)})
+    data.sort(key=lambda x: x.get("firstAskedAt") or "", reverse=True)
+    return data
+
+
+def fast_comments(df: pd.DataFrame, text_col: str, score_col_hint: str) -> list:
+    rows = comment_frame(df, text_col)
+    return frame_to_records(pd.DataFrame({
+        "firstAskedAt": pd.to_datetime(rows["firstAskedAt"], errors="coerce"),
+        "userId": rows["userId"], "personId": rows["personId"], "userChatId": rows["userChatId"],
+        "text": rows["text"], "score": pd.to_numeric(rows[score_col_hint], errors="coerce"),
+    }), datetime_format=None)
+
+
+def _bench(fn, repeat):
+    out = fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000, out
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    months = [str(p) for p in pd.period_range("2025-01", pd.Timestamp.now().strftime("%Y-%m"), freq="M")]
+    frames = list(load_month_partitions("csat", months).values())
+    if not frames:
+        print("[BENCH] csat 캐시 없음")
+        return
+    base = pd.concat(frames, ignore_index=True)
+    df = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).iloc[:rows].copy()
+    # 유형 라벨 합성 (빈 값/결측 포함)
+    rng = np.random.default_rng(0)
+    for label, k in zip(LABELS, [12, 40, 8]):
+        values = np.array([f"{label}{i}" for i in range(k)] + ["", None], dtype=object)
+        df[label] = values[rng.integers(0, len(values), len(df))]
+
+    print(f"[BENCH] {len(df)} rows, 반복 {repeat}회")
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_ms, legacy_out = _bench(lambda: legacy_type_scores(df), repeat)
+    fast_ms, fast_out = _bench(lambda: build_type_scores(df), repeat)
+    print(f"  유형별 집계  legacy {legacy_ms:9.1f} ms   fast {fast_ms:7.1f} ms   x{legacy_ms / fast_ms:.1f}"
+          f"   동일={legacy_out == fast_out}")
+
+    legacy_ms, legacy_out = _bench(lambda: legacy_comments(df, "comment_3", "A-2"), repeat)
+    fast_ms, fast_out = _bench(lambda: fast_comments(df, "comment_3", "A-2"), repeat)
+    print(f"  코멘트 패킹  legacy {legacy_ms:9.1f} ms   fast {fast_ms:7.1f} ms   x{legacy_ms / fast_ms:.1f}"
+          f"   동일={legacy_out == fast_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+period-data 응답 직렬화 비용 측정 (기본 50,000행)
+
+- legacy: 타임스탬프 ISO 변환 → to_dict → _sanitize_json 재귀 순회 → jsonable_encoder → json.dumps
+- fast:   frame_to_records(컬럼 단위 정리) → orjson (app/serialization.py)
+
+캐시된 userchats 파티션을 목표 행 수만큼 반복해 입력을 만든다.
+사용법: python benchmarks/bench_json_encoding.py [행수] [반복횟수]
+"""
+import sys
+import os
+import json
+import math
+import time
+
+# 프로젝트 루트를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from app.cs_utils import load_month_partitions
+from app.serialization import frame_to_records, dumps, ISO_MILLIS, _HAS_ORJSON
+
+
+def _sanitize_json(o):
+    """이전 main._sanitize_json (행/값마다 재귀)"""
+    if isinstance(o, float):
+        if math.isnan(o) or math.isinf(o): return 0.0
+        return float(o)
+    if isinstance(o, (np.floating,)):
+        v = float(o)
+        return 0.0 if (math.isnan(v) or math.isinf(v)) else v
+    if isinstance(o, (np.integer,)):
+        return int(o)
+    if isinstance(o, dict):
+        return {k: _sanitize_json(v) for k, v in o.items()}
+    if isinstance(o, list):
+        return [_sanitize_json(v) for v in o]
+    return o
+
+
+def legacy_encode(df: pd.DataFrame) -> bytes:
+    frame = df.copy()
+    for col in ["firstAskedAt", "createdAt", "openedAt", "closedAt"]:
+        if col in frame.columns:
+            s = pd.to_datetime(frame[col], errors="coerce")
+            frame[col] = s.dt.strftime("%Y-%m-%dT%H:%M:%S.%f").str.slice(0, 23)
+    frame = frame.replace([np.inf, -np.inf], np.nan)
+    content = jsonable_encoder(_sanitize_json(frame.to_dict(orient="records")))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_encode(df: pd.DataFrame) -> bytes:
+    return dumps(frame_to_records(df, datetime_format=ISO_MILLIS))
+
+
+def _bench(fn, df, repeat):
+    out = fn(df)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(df)
+    return (time.perf_counter() - t0) / repeat * 1000, len(out)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    months = [str(p) for p in pd.period_range("2025-01", pd.Timestamp.now().strftime("%Y-%m"), freq="M")]
+    frames = list(load_month_partitions("userchats", months).values())
+    if not frames:
+        print("[BENCH] userchats 캐시 없음")
+        return
+    base = pd.concat(frames, ignore_index=True)
+    df = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).iloc[:rows]
+
+    print(f"[BENCH] {len(df)} rows x {df.shape[1]} cols, 반복 {repeat}회, orjson={'사용' if _HAS_ORJSON else '없음(json 대체)'}")
+    legacy_ms, legacy_bytes = _bench(legacy_encode, df, repeat)
+    fast_ms, fast_bytes = _bench(fast_encode, df, repeat)
+    print(f"  legacy (to_dict + _sanitize_json + json)   {legacy_ms:9.1f} ms  {legacy_bytes / 1e6:6.1f} MB")
+    print(f"  fast   (frame_to_records + orjson)         {fast_ms:9.1f} ms  {fast_bytes / 1e6:6.1f} MB")
+    print(f"  속도 향상: x{legacy_ms / fast_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+요청마다 반복되던 타임스탬프 재파싱 비용 측정
+
+- legacy:    이전 읽기 경로처럼 firstAskedAt/createdAt/openedAt/closedAt을
+             매 요청 pd.to_datetime + tz 확인/변환
+- canonical: save_data에서 KST naive로 저장된 프레임을 dtype 검사만 하고 그대로 사용
+
+사용법: python benchmarks/bench_typed_frame.py [시작일] [종료일] [반복횟수]
+"""
+import sys
+import os
+import time
+
+# 프로젝트 루트를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app.cs_utils import load_month_partitions, normalize_frame_timestamps, _series_kst_naive
+
+TS_COLS = ["firstAskedAt", "createdAt", "openedAt", "closedAt"]
+
+
+def _months(s, e):
+    return [str(p) for p in pd.period_range(pd.to_datetime(s), pd.to_datetime(e), freq="M")]
+
+
+def legacy_parse(df: pd.DataFrame) -> pd.Series:
+    """이전 코드: 컬럼마다 to_datetime → tz-aware면 KST 변환 후 tz 제거 (요청마다 수행)"""
+    out = {}
+    for col in TS_COLS:
+        if col in df.columns:
+            dt = pd.to_datetime(df[col], errors="coerce")
+            if getattr(dt.dt, "tz", None) is not None:
+                dt = dt.dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
+            out[col] = dt
+    return out["firstAskedAt"].fillna(out["createdAt"])
+
+
+def canonical_parse(df: pd.DataFrame) -> pd.Series:
+    """현재 코드: 이미 정규화된 컬럼은 dtype 검사만"""
+    return _series_kst_naive(df["firstAskedAt"]).fillna(_series_kst_naive(df["createdAt"]))
+
+
+def _bench(fn, df, repeat):
+    fn(df)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(df)
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    start = sys.argv[1] if len(sys.argv) > 1 else "2025-04-01"
+    end = sys.argv[2] if len(sys.argv) > 2 else "2025-12-31"
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    frames = list(load_month_partitions("userchats", _months(start, end)).values())
+    if not frames:
+        print(f"[BENCH] {start} ~ {end} 캐시 없음")
+        return
+    canonical = normalize_frame_timestamps(pd.concat(frames, ignore_index=True))
+
+    # 이전 저장 형식 재현: 타임스탬프가 tz-aware(+09:00) ISO 문자열로 섞여 있던 경우
+    legacy = canonical.copy()
+    for col in TS_COLS:
+        if col in legacy.columns:
+            legacy[col] = legacy[col].dt.tz_localize("Asia/Seoul").map(
+                lambda x: x.isoformat() if pd.notna(x) else None
+            )
+
+    print(f"[BENCH] {start} ~ {end}: {len(canonical)} rows, 반복 {repeat}회")
+    rows = [
+        ("legacy (문자열 저장, 요청마다 파싱)", _bench(legacy_parse, legacy, repeat)),
+        ("legacy (datetime 저장, 요청마다 to_datetime)", _bench(legacy_parse, canonical, repeat)),
+        ("canonical (dtype 검사만)", _bench(canonical_parse, canonical, repeat)),
+    ]
+    for name, ms in rows:
+        print(f"  {name:<45} {ms:9.2f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+월별 캐시 파티션(userchats_YYYY-MM, csat_YYYY-MM) 불변식 점검 스크립트
+
+- userChatId가 저장소 전체에서 유일한지 (읽기 경로는 중복 제거를 하지 않음)
+- 각 행이 버킷 월에 맞는 파티션에 있는지
+- userChatId 인덱스가 실제 파티션 위치와 일치하는지
+
+사용법:
+    python verify_partitions.py            # 점검만 (문제가 있으면 종료 코드 1)
+    python verify_partitions.py --fix      # 중복/버킷 정리 후 인덱스 재구성
+"""
+import sys
+import os
+import json
+
+# 프로젝트 루트를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.cs_utils import (
+    PARTITION_SPECS, server_cache, verify_partitions, repair_partitions, rebuild_partition_index,
+)
+
+
+def main():
+    fix = "--fix" in sys.argv[1:]
+    print(f"캐시 디렉토리: {server_cache.cache_dir}")
+
+    all_ok = True
+    for kind in PARTITION_SPECS:
+        report = verify_partitions(kind)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if report["ok"]:
+            continue
+        if fix:
+            saved = repair_partitions(kind)
+            rebuild_partition_index(kind)
+            report = verify_partitions(kind)
+            print(f"[{kind}] 정리 완료: 재저장 {len(saved)}개 파티션 → ok={report['ok']}")
+        all_ok = all_ok and report["ok"]
+
+    if all_ok:
+        print("모든 파티션 정상")
+    else:
+        print("불일치 발견" + ("" if fix else " (--fix로 정리 가능)"))
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except Exception as e:
+        print(f"오류 발생: {e}")
+        sys.exit(1)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+naive(KST) / tz-aware 값이 섞인 타임스탬프 컬럼 정규화 점검
+
+저장된 파티션의 타임스탬프는 KST naive, 새로 수집한 CSAT 행의 csatDate는 +09:00 tz-aware라
+업서트 시 한 컬럼에 두 종류가 섞인다. 섞여도 값이 NaT가 되거나 오류가 나지 않아야 한다.
+
+사용법:
+    python check_mixed_timestamps.py      # 실패하면 종료 코드 1
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import pandas as pd
+
+from app.cs_utils import _series_kst_naive, normalize_frame_timestamps
+
+CASES = [
+    ("naive Timestamp + aware Timestamp",
+     [pd.Timestamp("2025-10-03 10:00"), pd.Timestamp("2025-10-17 09:30", tz="Asia/Seoul")],
+     ["2025-10-03 10:00", "2025-10-17 09:30"]),
+    ("naive Timestamp + 오프셋 문자열",
+     [pd.Timestamp("2025-10-03 10:00"), "2025-10-17T00:00:00+09:00"],
+     ["2025-10-03 10:00", "2025-10-17 00:00"]),
+    ("naive 문자열 + UTC(Z) 문자열",
+     ["2025-10-05 12:00:00", "2025-10-16T15:00:00Z"],
+     ["2025-10-05 12:00", "2025-10-17 00:00"]),
+    ("서로 다른 오프셋",
+     ["2025-10-17T00:00:00+09:00", "2025-10-17T00:00:00+00:00"],
+     ["2025-10-17 00:00", "2025-10-17 09:00"]),
+    ("빈 값",
+     [pd.Timestamp("2025-10-03 10:00"), "2025-10-17T00:00:00+09:00", None],
+     ["2025-10-03 10:00", "2025-10-17 00:00", None]),
+]
+
+
+def main():
+    failed = 0
+    for name, values, expected in CASES:
+        got = _series_kst_naive(pd.Series(values, dtype=object))
+        want = pd.Series(pd.to_datetime(expected), dtype="datetime64[ns]")
+        ok = (pd.api.types.is_datetime64_dtype(got.dtype)
+              and got.astype("datetime64[ns]").reset_index(drop=True).equals(want))
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: {got.tolist()}")
+        failed += not ok
+
+    # 저장 경로: 컬럼 단위 정규화에서 값을 잃지 않아야 한다
+    df = pd.DataFrame({
+        "csatDate": pd.Series([pd.Timestamp("2025-10-03 10:00"), "2025-10-17T00:00:00+09:00"], dtype=object),
+        "closedAt": pd.Series(["2025-10-03 11:00:00", "2025-10-17T00:00:00+09:00"], dtype=object),
+    })
+    normalize_frame_timestamps(df)
+    ok = all(pd.api.types.is_datetime64_dtype(df[c].dtype) and df[c].notna().all() for c in df.columns)
+    print(f"{'OK  ' if ok else 'FAIL'} normalize_frame_timestamps: {df.to_dict('list')}")
+    failed += not ok
+
+    print("모든 점검 통과" if not failed else f"실패 {failed}건")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -209,6 +209,12 @@ export function refreshCsatOnly(start, end) {
 export function fetchManagerStats(start, end) {
   return apiCall("get", "/manager-stats", { start, end });
 }
+// 대시보드 번들: widgets 배열(또는 CSV) → { widgets: {이름: payload}, timings_ms, errors }
+export function fetchDashboard(start, end, widgets = [], filterParams = {}) {
+  const params = { start, end, ...filterParams };
+  if (widgets && widgets.length) params.widgets = Array.isArray(widgets) ? widgets.join(",") : widgets;
+  return apiCall("get", "/dashboard", params);
+}
 
 // API 상태 확인 (health)
 export async function checkApiHealth() {